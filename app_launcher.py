@@ -4,13 +4,33 @@ import sys
 import logging
 import subprocess
 import os
+import re
+import json
+import shlex
+import shutil
+import difflib
 import webbrowser
 from urllib.parse import quote
 import psutil
 import asyncio
+import threading
+import time
+from typing import List, Optional
 
 logger = logging.getLogger('App_Launcher')
 
+# 窗口检测依赖 pywin32（可选）；没有时就绪检测退化为“进程已出现”
+if sys.platform == 'win32':
+    try:
+        import win32gui
+        import win32process
+    except ImportError:
+        win32gui = None
+    import winreg
+else:
+    win32gui = None
+    winreg = None
+
 # Fix UTF-8 encoding for Windows console
 if sys.platform == 'win32':
     sys.stderr.reconfigure(encoding='utf-8')
@@ -71,93 +91,693 @@ PROCESS_NAMES = {
     "cmd": "cmd.exe"
 }
 
-def find_app_path(app_name: str) -> str:
-    """查找应用程序的实际路径"""
-    if app_name not in APP_PATHS:
+# 进程索引每隔多久做一次完整核对（秒）：增量刷新只比较 PID 集合，发现不了 PID 被新进程复用的情况
+PROCESS_INDEX_FULL_REFRESH = 60
+
+class ProcessIndex:
+    """全机进程索引，跨工具调用共享
+
+    按小写可执行文件名、可执行文件路径和父进程 PID 建立字典。refresh() 只比较
+    psutil.pids() 的 PID 集合：新出现的 PID 才查询名称/路径/父进程，消失的 PID 直接移除，
+    打开/关闭程序时无需再遍历成千上万个进程的属性。
+    """
+
+    def __init__(self):
+        self.procs = {}  # pid -> {"proc", "name", "exe", "ppid", "created"}
+        self.by_name = {}  # 小写进程名 -> {pid}
+        self.by_exe = {}  # 规范化的可执行文件路径 -> {pid}
+        self.children = {}  # 父进程 pid -> {pid}
+        self.last_full_refresh = 0.0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def exe_key(path: str) -> str:
+        return os.path.normcase(os.path.normpath(path))
+
+    def add(self, pid: int):
+        try:
+            proc = psutil.Process(pid)
+            info = proc.as_dict(attrs=["name", "exe", "ppid", "create_time"], ad_value=None)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return
+        entry = {"proc": proc, "name": (info["name"] or "").lower(), "exe": info["exe"], "ppid": info["ppid"],
+                 "created": info["create_time"]}
+        self.procs[pid] = entry
+        self.by_name.setdefault(entry["name"], set()).add(pid)
+        if entry["exe"]:
+            self.by_exe.setdefault(self.exe_key(entry["exe"]), set()).add(pid)
+        if entry["ppid"] is not None:
+            self.children.setdefault(entry["ppid"], set()).add(pid)
+
+    def remove(self, pid: int):
+        entry = self.procs.pop(pid, None)
+        if entry is None:
+            return
+        for table, key in ((self.by_name, entry["name"]),
+                           (self.by_exe, entry["exe"] and self.exe_key(entry["exe"])),
+                           (self.children, entry["ppid"])):
+            pids = table.get(key)
+            if pids is not None:
+                pids.discard(pid)
+                if not pids:
+                    del table[key]
+
+    def refresh(self, full: bool = False):
+        """增量刷新；full=True 或距上次完整核对超过 PROCESS_INDEX_FULL_REFRESH 秒时重新核对所有进程"""
+        with self.lock:
+            current = set(psutil.pids())
+            if full or time.monotonic() - self.last_full_refresh > PROCESS_INDEX_FULL_REFRESH:
+                # is_running() 比较创建时间，识别被新进程复用的 PID
+                stale = [pid for pid in current & self.procs.keys() if not self.procs[pid]["proc"].is_running()]
+                for pid in stale:
+                    self.remove(pid)
+                self.last_full_refresh = time.monotonic()
+            for pid in self.procs.keys() - current:
+                self.remove(pid)
+            for pid in current - self.procs.keys():
+                self.add(pid)
+
+    def alive(self, pids) -> list:
+        """pids 中仍在运行的进程（同时剔除已退出或 PID 被复用的索引项）"""
+        found = []
+        for pid in sorted(pids):
+            entry = self.procs.get(pid)
+            if entry is None:
+                continue
+            if entry["proc"].is_running():
+                found.append(entry["proc"])
+            else:
+                self.remove(pid)
+        return found
+
+    def find_by_name(self, name: str, refresh: bool = True) -> list:
+        """按可执行文件名（不区分大小写）查找运行中的进程；refresh=False 时使用上次刷新的进程表"""
+        if refresh:
+            self.refresh()
+        with self.lock:
+            return self.alive(self.by_name.get(name.lower(), ()))
+
+    def find_by_exe(self, path: str) -> list:
+        """按可执行文件完整路径查找运行中的进程"""
+        self.refresh()
+        with self.lock:
+            return self.alive(self.by_exe.get(self.exe_key(path), ()))
+
+    def descendants(self, pid: int, refresh: bool = True) -> list:
+        """pid 的所有子孙进程（按索引中的父子关系）
+
+        与 psutil 的 children() 一样跳过创建时间早于父进程的"子进程"：它们的 ppid 指向的是
+        已退出的原父进程，只是该 PID 被复用了（Windows 上很常见）。
+        """
+        if refresh:
+            self.refresh()
+        with self.lock:
+            pids, pending = set(), [pid]
+            while pending:
+                parent = pending.pop()
+                parent_entry = self.procs.get(parent)
+                for child in self.children.get(parent, ()):
+                    child_entry = self.procs.get(child)
+                    if child in pids or child_entry is None:
+                        continue
+                    if (parent_entry and parent_entry["created"] is not None and child_entry["created"] is not None
+                            and child_entry["created"] < parent_entry["created"]):
+                        continue
+                    pids.add(child)
+                    pending.append(child)
+            return self.alive(pids)
+
+process_index = ProcessIndex()
+
+# ---------------- 应用发现 ----------------
+
+# 扫描这些目录建立可启动程序索引：快捷方式 (.lnk/.url/.desktop) 与可执行文件；
+# 环境变量 APP_LAUNCHER_ROOTS 可追加目录（多个以 os.pathsep 分隔）
+if sys.platform == 'win32':
+    APP_SEARCH_ROOTS = [
+        os.path.expandvars(r"%ProgramData%\Microsoft\Windows\Start Menu\Programs"),
+        os.path.expandvars(r"%APPDATA%\Microsoft\Windows\Start Menu\Programs"),
+        os.path.expanduser(r"~\Desktop"),
+        os.path.expandvars(r"%PUBLIC%\Desktop"),
+        os.path.expandvars(r"%ProgramFiles%"),
+        os.path.expandvars(r"%ProgramFiles(x86)%"),
+        os.path.expandvars(r"%LOCALAPPDATA%\Programs"),
+    ]
+    APP_INDEX_PATH = os.path.expandvars(r"%LOCALAPPDATA%\mcp-toolbox\app_index.json")
+else:
+    APP_SEARCH_ROOTS = [
+        "/usr/share/applications",
+        "/usr/local/share/applications",
+        os.path.expanduser("~/.local/share/applications"),
+        "/var/lib/flatpak/exports/share/applications",
+        "/var/lib/snapd/desktop/applications",
+    ]
+    APP_INDEX_PATH = os.path.expanduser("~/.cache/mcp-toolbox/app_index.json")
+APP_SEARCH_ROOTS += [root for root in os.environ.get("APP_LAUNCHER_ROOTS", "").split(os.pathsep) if root]
+APP_INDEX_PATH = os.environ.get("APP_INDEX_PATH", APP_INDEX_PATH)
+APP_SCAN_DEPTH = 3  # 子目录扫描深度，如 Program Files\厂商\产品\x.exe
+APP_INDEX_TTL = 300  # 距上次核对超过该秒数才重新检查目录修改时间
+APP_INDEX_MISS_RETRY = 5  # 查不到时立即核对一次（新装的程序），但两次之间至少间隔该秒数
+FUZZY_CUTOFF = 0.8  # 模糊匹配的相似度下限，低于该值只给出候选建议
+# 扫描可执行文件时跳过的卸载/更新/崩溃报告等辅助程序
+IGNORED_EXECUTABLES = re.compile(r"unins|uninstall|update|crash|report|helper|setup|install|elevat", re.IGNORECASE)
+# 同一别名对应多个程序时，优先级高（数值小）的胜出
+SOURCE_PRIORITY = {"manual": 0, "shortcut": 1, "desktop": 1, "exe": 2}
+DESKTOP_FIELD_CODES = {"%f", "%F", "%u", "%U", "%d", "%D", "%n", "%N", "%i", "%c", "%k", "%v", "%m"}
+
+def normalize_app_name(name: str) -> str:
+    """别名查找键：小写、去掉空白和常见分隔符"""
+    return re.sub(r"[\s\-_.·()（）]+", "", name).lower()
+
+def resolve_shortcut(path: str) -> str:
+    """Windows 快捷方式的目标路径（需要 pywin32），无法解析时返回 None"""
+    try:
+        import win32com.client
+        return win32com.client.Dispatch("WScript.Shell").CreateShortCut(path).Targetpath or None
+    except Exception:
         return None
-        
-    paths = APP_PATHS[app_name]
-    if isinstance(paths, str):
-        return paths if os.path.exists(paths) else None
-        
-    for path in paths:
-        if os.path.exists(path):
-            return path
+
+def parse_desktop_file(path: str):
+    """解析 freedesktop .desktop 文件，返回索引项；隐藏或非应用类型返回 None"""
+    fields, in_entry = {}, False
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("["):
+                    in_entry = line == "[Desktop Entry]"
+                elif in_entry and "=" in line and not line.startswith("#"):
+                    key, value = line.split("=", 1)
+                    fields.setdefault(key.strip(), value.strip())
+    except OSError:
+        return None
+    if fields.get("Type", "Application") != "Application" or "Exec" not in fields \
+            or fields.get("NoDisplay") == "true" or fields.get("Hidden") == "true":
+        return None
+    try:
+        command = [arg.replace("%%", "%") for arg in shlex.split(fields["Exec"]) if arg not in DESKTOP_FIELD_CODES]
+    except ValueError:
+        return None
+    if not command:
+        return None
+    names = [value for key, value in fields.items() if key == "Name" or key.startswith("Name[") or key == "GenericName"]
+    executable = shutil.which(command[0]) or command[0]
+    return {
+        "name": fields.get("Name") or os.path.splitext(os.path.basename(path))[0],
+        "aliases": names + [os.path.splitext(os.path.basename(path))[0], os.path.basename(command[0])],
+        "path": executable,
+        "command": command,
+        "source": "desktop",
+    }
+
+def app_entry(path: str):
+    """由目录中的单个文件生成索引项，不是可启动程序时返回 None"""
+    stem, ext = os.path.splitext(os.path.basename(path))
+    ext = ext.lower()
+    if ext == ".desktop":
+        return parse_desktop_file(path)
+    if sys.platform == 'win32':
+        if ext in (".lnk", ".url"):
+            target = resolve_shortcut(path) if ext == ".lnk" else None
+            aliases = [stem] + ([os.path.splitext(os.path.basename(target))[0]] if target else [])
+            return {"name": stem, "aliases": aliases, "path": target or path, "shortcut": path, "source": "shortcut"}
+        if ext == ".exe" and not IGNORED_EXECUTABLES.search(stem):
+            return {"name": stem, "aliases": [stem], "path": path, "source": "exe"}
+        return None
+    if ext in ("", ".sh", ".appimage") and not IGNORED_EXECUTABLES.search(stem) and os.access(path, os.X_OK):
+        return {"name": stem, "aliases": [stem], "path": path, "source": "exe"}
     return None
 
+class AppIndex:
+    """可启动程序索引：扫描 roots 下的快捷方式与可执行文件，按别名 O(1) 查找，支持模糊匹配
+
+    扫描结果按目录保存到 index_path（JSON），记录每个目录的修改时间；之后只重新列出
+    修改时间变化了的目录（增删文件会改变所在目录的修改时间），其余目录沿用缓存。
+    APP_PATHS 中手工配置的路径优先于扫描结果。
+    """
+
+    VERSION = 1
+
+    def __init__(self, roots, index_path=None, depth=APP_SCAN_DEPTH, manual=None):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.index_path = index_path
+        self.depth = depth
+        self.manual = manual or {}  # 别名 -> 候选路径（APP_PATHS 格式）
+        self.dirs = {}  # 目录 -> {"mtime_ns", "depth", "entries", "subdirs"}
+        self.aliases = {}  # 规范化别名 -> 索引项
+        self.names = {}  # 规范化别名 -> 显示名称，用于候选建议
+        self.checked_at = None  # 上次核对目录的时间 (monotonic)
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.index_path:
+            return
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == self.VERSION and data.get("depth") == self.depth:
+            self.dirs = data.get("dirs", {})
+
+    def save(self):
+        if not self.index_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            temp = self.index_path + ".tmp"
+            with open(temp, "w", encoding="utf-8") as f:
+                json.dump({"version": self.VERSION, "depth": self.depth, "dirs": self.dirs}, f, ensure_ascii=False)
+            os.replace(temp, self.index_path)
+        except OSError as e:
+            logger.warning(f"Failed to save app index: {e}")
+
+    def scan_dir(self, path: str, depth: int, seen: set) -> bool:
+        """核对目录 path（及其子目录）；返回是否有目录被重新扫描"""
+        if path in seen:
+            return False
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return False
+        seen.add(path)
+        record = self.dirs.get(path)
+        changed = record is None or record["mtime_ns"] != mtime_ns or record["depth"] != depth
+        if changed:
+            entries, subdirs = [], []
+            try:
+                with os.scandir(path) as listing:
+                    for item in listing:
+                        try:
+                            if item.is_dir(follow_symlinks=False):
+                                if depth > 0:
+                                    subdirs.append(item.path)
+                            elif item.is_file():
+                                entry = app_entry(item.path)
+                                if entry is not None:
+                                    entries.append(entry)
+                        except OSError:
+                            continue
+            except OSError:
+                return False
+            record = self.dirs[path] = {"mtime_ns": mtime_ns, "depth": depth, "entries": entries, "subdirs": subdirs}
+        for subdir in record["subdirs"]:
+            changed = self.scan_dir(subdir, depth - 1, seen) or changed
+        return changed
+
+    def refresh(self):
+        """核对所有目录，只重新扫描修改时间变化的目录，然后重建别名表"""
+        with self.lock:
+            seen = set()
+            changed = False
+            for root in self.roots:
+                changed = self.scan_dir(root, self.depth, seen) or changed
+            removed = set(self.dirs) - seen
+            for path in removed:
+                del self.dirs[path]
+            if changed or removed or not self.aliases:
+                self.rebuild()
+            if changed or removed:
+                self.save()
+            self.checked_at = time.monotonic()
+
+    def rebuild(self):
+        entries = [entry for record in self.dirs.values() for entry in record["entries"]]
+        for alias, paths in self.manual.items():
+            path = next((p for p in ([paths] if isinstance(paths, str) else paths)
+                         if os.path.exists(p) or (os.path.basename(p) == p and shutil.which(p))), None)
+            if path is not None:
+                if os.path.basename(path) == path:  # 如 "cmd.exe"：在 PATH 中查找
+                    path = shutil.which(path)
+                entries.append({"name": alias, "aliases": [alias, os.path.splitext(os.path.basename(path))[0]],
+                                "path": path, "source": "manual"})
+        aliases, names = {}, {}
+        for entry in sorted(entries, key=lambda e: SOURCE_PRIORITY.get(e["source"], 9)):
+            for alias in entry["aliases"]:
+                key = normalize_app_name(alias)
+                if key and key not in aliases:
+                    aliases[key] = entry
+                    names[key] = entry["name"]
+        self.aliases, self.names = aliases, names
+
+    def ensure_fresh(self, on_miss=False):
+        age = None if self.checked_at is None else time.monotonic() - self.checked_at
+        if age is None or age > APP_INDEX_TTL or (on_miss and age > APP_INDEX_MISS_RETRY):
+            self.refresh()
+
+    def get(self, name: str):
+        """按别名精确查找（不区分大小写和空格），找不到返回 None"""
+        key = normalize_app_name(name)
+        self.ensure_fresh()
+        entry = self.aliases.get(key)
+        if entry is None:
+            self.ensure_fresh(on_miss=True)
+            entry = self.aliases.get(key)
+        return entry
+
+    def lookup(self, name: str):
+        """精确查找，失败时模糊匹配；返回 (索引项或 None, 候选名称列表)"""
+        entry = self.get(name)
+        if entry is not None:
+            return entry, []
+        key = normalize_app_name(name)
+        if not key:
+            return None, []
+        aliases = self.aliases
+        close = difflib.get_close_matches(key, aliases.keys(), n=5, cutoff=0.6)
+        if close and difflib.SequenceMatcher(None, key, close[0]).ratio() >= FUZZY_CUTOFF:
+            return aliases[close[0]], []
+        containing = {id(aliases[alias]): alias for alias in aliases if key in alias} if len(key) >= 3 else {}
+        if len(containing) == 1:
+            return aliases[next(iter(containing.values()))], []
+        suggestions = list(dict.fromkeys(self.names[alias] for alias in close + list(containing.values())[:5]))
+        return None, suggestions
+
+app_index = AppIndex(APP_SEARCH_ROOTS, APP_INDEX_PATH, manual=APP_PATHS)
+
+def find_app_path(app_name: str) -> str:
+    """查找应用程序的实际路径"""
+    entry = app_index.get(app_name)
+    return entry["path"] if entry is not None else None
+
+def launch_app(entry: dict):
+    """启动索引中的程序：.desktop 按其 Exec 命令，Windows 快捷方式交给 shell，其余直接运行"""
+    if entry.get("command"):
+        subprocess.Popen(entry["command"])
+    elif entry.get("shortcut") and sys.platform == 'win32' and not entry["path"].lower().endswith(".exe"):
+        os.startfile(entry["shortcut"])
+    else:
+        subprocess.Popen(entry["path"])
+
+# ---------------- 启动并等待就绪 ----------------
+
+READY_TIMEOUT = 60  # 等待应用就绪的默认上限（秒）
+READY_POLL_INITIAL = 0.1  # 首次轮询间隔（秒），之后逐次放大 …
+READY_POLL_FACTOR = 1.5
+READY_POLL_MAX = 1.0  # … 直到该上限
+
+# 需要先启动并就绪的“启动器”，如 Dota 2 依赖 Steam（键为规范化的应用名）
+APP_DEPENDENCIES = {
+    "dota2": "steam",
+}
+
+def process_running(process_name: str):
+    """就绪检测：进程已出现"""
+    return lambda: bool(process_index.find_by_name(process_name))
+
+def window_visible(process_name: str):
+    """就绪检测：进程已有可见的带标题顶层窗口（无 pywin32 时退化为进程已出现）"""
+    if win32gui is None:
+        return process_running(process_name)
+
+    def check():
+        pids = {proc.pid for proc in process_index.find_by_name(process_name)}
+        if not pids:
+            return False
+        found = []
+
+        def visit(hwnd, _):
+            if win32gui.IsWindowVisible(hwnd) and win32gui.GetWindowText(hwnd) \
+                    and win32process.GetWindowThreadProcessId(hwnd)[1] in pids:
+                found.append(hwnd)
+            return not found  # 找到后停止枚举
+
+        try:
+            win32gui.EnumWindows(visit, None)
+        except Exception:
+            pass  # 回调返回 False 时 EnumWindows 会报错
+        return bool(found)
+    return check
+
+def steam_ready() -> bool:
+    """就绪检测：Steam 客户端已启动并登录，可以接受 steam:// 请求
+
+    Windows 上 Steam 把当前进程与登录用户写入注册表 ActiveProcess（IPC 状态），
+    其他系统看 ~/.steam/steam.pid 与 steamwebhelper 进程。
+    """
+    if winreg is not None:
+        try:
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Valve\Steam\ActiveProcess") as key:
+                pid = winreg.QueryValueEx(key, "pid")[0]
+                user = winreg.QueryValueEx(key, "ActiveUser")[0]
+        except OSError:
+            return False
+        return bool(pid and user and psutil.pid_exists(pid))
+    try:
+        with open(os.path.expanduser("~/.steam/steam.pid")) as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        return False
+    return psutil.pid_exists(pid) and bool(process_index.find_by_name("steamwebhelper"))
+
+# 自定义就绪检测（键为规范化的应用名）；未列出的应用等待其主窗口出现
+APP_READY_CHECKS = {
+    "steam": steam_ready,
+}
+
+def readiness_check(app_name: str, entry: dict = None):
+    key = normalize_app_name(app_name)
+    if key in APP_READY_CHECKS:
+        return APP_READY_CHECKS[key]
+    process_name = PROCESS_NAMES.get(key) or os.path.basename(entry["path"] if entry else app_name)
+    return window_visible(process_name)
+
+async def wait_until(predicate, timeout: float = READY_TIMEOUT):
+    """轮询 predicate（可为同步或异步函数）直到为真，间隔逐步放大；返回耗时秒数，超时返回 None"""
+    started = time.monotonic()
+    interval = READY_POLL_INITIAL
+    while True:
+        result = predicate() if asyncio.iscoroutinefunction(predicate) else asyncio.to_thread(predicate)
+        if await result:
+            return time.monotonic() - started
+        remaining = timeout - (time.monotonic() - started)
+        if remaining <= 0:
+            return None
+        await asyncio.sleep(min(interval, remaining))
+        interval = min(interval * READY_POLL_FACTOR, READY_POLL_MAX)
+
+async def launch_and_wait(app_name: str, ready=None, timeout: float = READY_TIMEOUT) -> dict:
+    """确保应用已启动并就绪：已就绪立即返回，否则启动它并等待 ready（默认按应用选择就绪检测）
+
+    返回 {"success", "message", "launched", "elapsed"}；ready 可为任意同步/异步无参函数。
+    """
+    entry = await asyncio.to_thread(app_index.get, app_name)
+    check = ready or readiness_check(app_name, entry)
+    if await wait_until(check, 0) is not None:
+        return {"success": True, "message": f"{app_name} 已在运行", "launched": False, "elapsed": 0.0}
+    if entry is None:
+        return {"success": False, "message": f"找不到应用程序: {app_name}", "launched": False, "elapsed": 0.0}
+    launch_app(entry)
+    logger.info(f"Launched {app_name}, waiting until it is ready (timeout {timeout}s)")
+    elapsed = await wait_until(check, timeout)
+    if elapsed is None:
+        return {"success": False, "message": f"{app_name} 在 {timeout:g} 秒内未就绪", "launched": True, "elapsed": timeout}
+    logger.info(f"{app_name} ready after {elapsed:.1f}s")
+    return {"success": True, "message": f"{app_name} 已就绪，用时 {elapsed:.1f} 秒", "launched": True,
+            "elapsed": round(elapsed, 1)}
+
 @mcp.tool()
-def open_application(app_name: str):
-    """Open a Windows application.打开Windows应用程序
+async def open_application(app_name: str):
+    """Open an installed application.打开已安装的应用程序
     
     Args:
-        app_name: 应用程序名称 (wechat/qqmusic/cursor/chrome/wps/wemeet/steam/dota2/cmd)
+        app_name: 应用程序名称，如 wechat/qqmusic/cursor/chrome/wps/wemeet/steam/dota2/cmd，
+            或开始菜单/桌面快捷方式中的任意程序名（支持模糊匹配）
     """
+    return await open_app(app_name)
+
+async def open_app(app_name: str, dependencies: dict = None) -> dict:
+    """打开单个应用；dependencies 为 启动器名 -> 等待任务，批量打开时共享，同一个启动器只启动一次"""
     try:
-        app_name = app_name.lower()
-        app_path = find_app_path(app_name)
+        entry, suggestions = await asyncio.to_thread(app_index.lookup, app_name)
         
-        if not app_path:
-            return {"success": False, "message": f"找不到应用程序: {app_name}"}
+        if entry is None:
+            hint = f"，你是不是要找: {'、'.join(suggestions)}" if suggestions else ""
+            return {"success": False, "message": f"找不到应用程序: {app_name}{hint}"}
+
+        # 依赖启动器的应用（如 dota2 → steam）先等启动器就绪
+        dependency = APP_DEPENDENCIES.get(normalize_app_name(entry["name"])) or APP_DEPENDENCIES.get(normalize_app_name(app_name))
+        if dependency:
+            if dependencies is None:
+                dependencies = {}
+            if dependency not in dependencies:
+                dependencies[dependency] = asyncio.ensure_future(launch_and_wait(dependency))
+            result = await asyncio.shield(dependencies[dependency])
+            if not result["success"]:
+                return {"success": False, "message": f"无法打开 {entry['name']}: {result['message']}"}
             
-        subprocess.Popen(app_path)
-        logger.info(f"Opened application: {app_name}")
-        return {"success": True, "message": f'成功打开: {app_name}'}
+        await asyncio.to_thread(launch_app, entry)
+        logger.info(f"Opened application: {app_name} -> {entry['path']}")
+        return {"success": True, "message": f'成功打开: {entry["name"]}'}
         
     except Exception as e:
         logger.error(f"Error opening application: {str(e)}")
         return {"success": False, "message": f"打开应用程序失败: {str(e)}"}
 
+# 关闭应用：先请求退出，宽限期后仍存活的强制结束
+CLOSE_GRACE_PERIOD = 5  # 等待正常退出的秒数
+CLOSE_KILL_WAIT = 3  # 强制结束后等待确认的秒数
+
+def close_process_tree(roots: list) -> dict:
+    """结束 roots 及其全部子孙进程并确认退出（阻塞，应在线程中调用），返回各类进程数
+
+    所有进程同时 terminate，用 psutil.wait_procs 等待宽限期，仍存活的 kill 后再确认一次。
+    子孙进程在终止前一次性收集，父进程退出后它们不会漏网（如 Chrome、微信的辅助进程）。
+    """
+    procs = {proc.pid: proc for proc in roots}
+    for root in roots:
+        for child in process_index.descendants(root.pid, refresh=False):
+            procs.setdefault(child.pid, child)
+    # 不结束本进程及其祖先（如从控制台启动时关闭 cmd/python，会匹配到运行工具箱的进程链）
+    current = psutil.Process()
+    for pid in [current.pid] + [parent.pid for parent in current.parents()]:
+        procs.pop(pid, None)
+    counts = {"processes": len(procs), "exited": 0, "killed": 0, "denied": 0, "remaining": 0}
+    targets = []
+    for proc in procs.values():
+        try:
+            proc.terminate()
+            targets.append(proc)
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            counts["exited"] += 1
+        except psutil.AccessDenied:
+            counts["denied"] += 1
+    gone, alive = psutil.wait_procs(targets, timeout=CLOSE_GRACE_PERIOD)
+    alive = [proc for proc in alive if not is_zombie(proc)]  # 已退出、只等父进程回收
+    counts["exited"] += len(targets) - len(alive)
+    for proc in alive:
+        try:
+            proc.kill()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass  # 仍存活的会计入 remaining
+    killed, remaining = psutil.wait_procs(alive, timeout=CLOSE_KILL_WAIT) if alive else ([], [])
+    remaining = [proc for proc in remaining if not is_zombie(proc)]
+    counts["killed"] = len(alive) - len(remaining)
+    counts["remaining"] = len(remaining)
+    return counts
+
+def is_zombie(proc: psutil.Process) -> bool:
+    """僵尸进程已退出，但不是本进程的子进程时 wait_procs 会一直把它当作存活
+
+    无权查询状态的进程（受保护或提权运行）不能当作已退出，仍计为存活。
+    """
+    try:
+        return proc.status() == psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return True
+    except psutil.AccessDenied:
+        return False
+
 @mcp.tool()
-def close_application(app_name: str):
-    """Close a Windows application.关闭Windows应用程序
+async def close_application(app_name: str):
+    """Close a Windows application and its child processes.关闭Windows应用程序（包括其子进程）
     
     Args:
         app_name: 应用程序名称 (wechat/qqmusic/cursor/chrome/wps/wemeet/steam/dota2/cmd)
     """
+    return await close_app(app_name)
+
+async def close_app(app_name: str, refresh: bool = True) -> dict:
+    """关闭单个应用的进程树并等待确认；批量关闭时 refresh=False，共用调用方刷新过的同一份进程表"""
     try:
         app_name = app_name.lower()
         if app_name not in PROCESS_NAMES:
             return {"success": False, "message": f"不支持的应用程序: {app_name}"}
             
         process_name = PROCESS_NAMES[app_name]
-        closed = False
-        
-        for proc in psutil.process_iter(['name']):
-            try:
-                if proc.info['name'].lower() == process_name.lower():
-                    proc.terminate()
-                    closed = True
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
-                
-        if closed:
-            logger.info(f"Closed application: {app_name}")
-            return {"success": True, "message": f'成功关闭: {app_name}'}
-        else:
+        roots = await asyncio.to_thread(process_index.find_by_name, process_name, refresh)
+        if not roots:
             return {"success": False, "message": f'未找到运行中的: {app_name}'}
+
+        # 等待进程退出可能需要数秒，放到线程中，不阻塞其他工具调用
+        counts = await asyncio.to_thread(close_process_tree, roots)
+        detail = f"共 {counts['processes']} 个进程，{counts['exited']} 个正常退出，{counts['killed']} 个被强制结束"
+        if counts["remaining"] or counts["denied"]:
+            logger.warning(f"Closing {app_name} left processes running: {counts}")
+            return {"success": False, "message": f"未能完全关闭: {app_name}（{detail}，"
+                                                 f"{counts['remaining'] + counts['denied']} 个仍在运行或无权限结束）",
+                    **counts}
+        logger.info(f"Closed application: {app_name} ({counts})")
+        return {"success": True, "message": f'成功关闭: {app_name}（{detail}）', **counts}
             
     except Exception as e:
         logger.error(f"Error closing application: {str(e)}")
         return {"success": False, "message": f"关闭应用程序失败: {str(e)}"}
 
+def batch_result(action: str, results: list) -> dict:
+    """汇总批量操作的逐项结果"""
+    succeeded = sum(1 for result in results if result["success"])
+    return {
+        "success": succeeded == len(results),
+        "message": f"{action} {succeeded}/{len(results)} 项成功",
+        "results": results,
+    }
+
 @mcp.tool()
-def search_google(query: str):
+async def open_applications(app_names: List[str], google_queries: Optional[List[str]] = None,
+                            baidu_queries: Optional[List[str]] = None):
+    """Open several applications and searches at once.一次打开多个应用程序并执行搜索（如“打开我的工作环境”）
+    
+    Args:
+        app_names: 应用程序名称列表（同 open_application，支持模糊匹配）
+        google_queries: 可选，要在 Google 搜索的关键词列表（在同一个浏览器窗口中打开为多个标签页）
+        baidu_queries: 可选，要在百度搜索的关键词列表
+    """
+    dependencies = {}  # 共享的启动器等待任务
+    opened = await asyncio.gather(*(open_app(name, dependencies) for name in app_names))
+    results = [{"item": name, "action": "open", **result} for name, result in zip(app_names, opened)]
+    queries = [("google", query) for query in google_queries or []] + [("baidu", query) for query in baidu_queries or []]
+    if queries:
+        try:
+            await asyncio.to_thread(open_in_browser, [SEARCH_URLS[engine].format(quote(query)) for engine, query in queries])
+            results += [{"item": query, "action": f"search_{engine}", "success": True, "message": f"成功搜索: {query}"}
+                        for engine, query in queries]
+        except Exception as e:
+            logger.error(f"Error searching: {str(e)}")
+            results += [{"item": query, "action": f"search_{engine}", "success": False, "message": f"搜索失败: {str(e)}"}
+                        for engine, query in queries]
+    return batch_result("打开", results)
+
+@mcp.tool()
+async def close_applications(app_names: List[str]):
+    """Close several applications at once.一次关闭多个应用程序
+    
+    Args:
+        app_names: 应用程序名称列表 (wechat/qqmusic/cursor/chrome/wps/wemeet/steam/dota2/cmd)
+    """
+    await asyncio.to_thread(process_index.refresh)  # 所有应用共用这一次刷新后的进程表
+    closed = await asyncio.gather(*(close_app(name, refresh=False) for name in app_names))
+    return batch_result("关闭", [{"item": name, "action": "close", **result} for name, result in zip(app_names, closed)])
+
+# 搜索引擎 URL 模板
+SEARCH_URLS = {
+    "google": "https://www.google.com/search?q={}",
+    "baidu": "https://www.baidu.com/s?wd={}",
+}
+
+def open_in_browser(urls: list):
+    """用 Chrome 打开 urls（一次调用，多个标签页），找不到 Chrome 时使用默认浏览器
+
+    查找 Chrome 可能触发应用索引重新扫描，需在线程中调用。
+    """
+    chrome_path = find_app_path("chrome")
+    if chrome_path:
+        subprocess.Popen([chrome_path, *urls])
+    else:
+        for url in urls:
+            webbrowser.open(url)
+
+@mcp.tool()
+async def search_google(query: str):
     """Search Google in Chrome browser.使用Chrome浏览器搜索Google
     
     Args:
         query: 搜索关键词
     """
     try:
-        # 构建Google搜索URL
-        search_url = f"https://www.google.com/search?q={quote(query)}"
-        
-        # 尝试使用Chrome打开
-        chrome_path = find_app_path("chrome")
-        if chrome_path:
-            subprocess.Popen([chrome_path, search_url])
-        else:
-            # 如果找不到Chrome，使用默认浏览器
-            webbrowser.open(search_url)
+        # 构建Google搜索URL，尝试使用Chrome打开
+        await asyncio.to_thread(open_in_browser, [SEARCH_URLS["google"].format(quote(query))])
             
         logger.info(f"Searched Google for: {query}")
         return {"success": True, "message": f'成功搜索: {query}'}
@@ -167,23 +787,15 @@ def search_google(query: str):
         return {"success": False, "message": f"搜索失败: {str(e)}"}
 
 @mcp.tool()
-def search_baidu(query: str):
+async def search_baidu(query: str):
     """Search Baidu in Chrome browser.使用Chrome浏览器搜索百度
     
     Args:
         query: 搜索关键词
     """
     try:
-        # 构建百度搜索URL
-        search_url = f"https://www.baidu.com/s?wd={quote(query)}"
-        
-        # 尝试使用Chrome打开
-        chrome_path = find_app_path("chrome")
-        if chrome_path:
-            subprocess.Popen([chrome_path, search_url])
-        else:
-            # 如果找不到Chrome，使用默认浏览器
-            webbrowser.open(search_url)
+        # 构建百度搜索URL，尝试使用Chrome打开
+        await asyncio.to_thread(open_in_browser, [SEARCH_URLS["baidu"].format(quote(query))])
             
         logger.info(f"Searched Baidu for: {query}")
         return {"success": True, "message": f'成功搜索: {query}'}
@@ -200,32 +812,18 @@ async def launch_dota2():
         dict: 包含操作结果的字典
     """
     try:
-        # 首先检查Steam是否运行
-        steam_running = False
-        for proc in psutil.process_iter(['name']):
-            try:
-                if proc.info['name'].lower() == 'steam.exe':
-                    steam_running = True
-                    break
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
-
-        # 如果Steam没有运行，先启动Steam
-        if not steam_running:
-            steam_path = find_app_path("steam")
-            if not steam_path:
-                return {"success": False, "message": "找不到Steam程序"}
-            
-            subprocess.Popen(steam_path)
-            # 等待Steam启动
-            await asyncio.sleep(10)  # 给Steam一些启动时间
+        # 确保Steam已启动并登录：已就绪立即继续，否则启动并等到就绪为止
+        steam = await launch_and_wait("steam")
+        if not steam["success"]:
+            return {"success": False, "message": steam["message"]}
 
         # 使用Steam协议启动Dota 2
         dota2_url = "steam://rungameid/570"  # Dota 2的Steam App ID是570
         webbrowser.open(dota2_url)
         
         logger.info("Launched Dota 2 through Steam")
-        return {"success": True, "message": "成功启动Dota 2"}
+        waited = f"（等待Steam就绪 {steam['elapsed']} 秒）" if steam["launched"] else ""
+        return {"success": True, "message": f"成功启动Dota 2{waited}"}
         
     except Exception as e:
         logger.error(f"Error launching Dota 2: {str(e)}")
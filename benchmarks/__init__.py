@@ -0,0 +1,8 @@
+"""
+Offline benchmarks for mcp_pipe.py and the FastMCP tool servers.
+
+`python -m benchmarks` starts a local WebSocket server standing in for the cloud
+endpoint, launches `mcp_pipe.py` against it with a synthetic tool script, drives a
+configurable mix of `tools/list` / `tools/call` requests and prints a JSON report
+(throughput, latency percentiles, pipe CPU and RSS). See `benchmarks/__main__.py`.
+"""
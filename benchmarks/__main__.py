@@ -0,0 +1,397 @@
+"""
+Benchmark mcp_pipe.py against a local stand-in for the cloud endpoint.
+
+Usage:
+
+python -m benchmarks [options] [-- <mcp_pipe.py options>]
+
+Examples:
+
+# closed loop: 16 concurrent callers, default mix, 2000 requests
+python -m benchmarks --concurrency 16
+
+# open loop: fixed 200 requests/sec for 30 seconds, mostly sleep_ms, against a 4-worker pool
+python -m benchmarks --rate 200 --duration 30 --mix tools/list=1,sleep_ms=8,busy_ms=1 -- --workers 4
+
+# compare with another version of the pipe (e.g. `git show HEAD~1:mcp_pipe.py > /tmp/old_pipe.py`)
+python -m benchmarks --pipe-script /tmp/old_pipe.py --output old.json
+
+The report is JSON (stdout, and --output if given) so runs can be diffed and tracked.
+Latency is measured from the moment a request was due to be sent, so open-loop runs
+are not flattered when the pipe falls behind.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import psutil
+import websockets
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PIPE_SCRIPT = os.path.join(BASE_DIR, "mcp_pipe.py")
+TOOL_SCRIPT = os.path.join(BASE_DIR, "benchmarks", "synthetic_tool.py")
+
+DEFAULT_MIX = "tools/list=1,echo=6,sleep_ms=2,payload=1"
+DEFAULT_TOOL_ARGS = {
+    "echo": {"text": "hello"},
+    "sleep_ms": {"ms": 10},
+    "busy_ms": {"ms": 5},
+    "payload": {"size": 16384},
+}
+CONNECT_TIMEOUT = 60  # seconds for the pipe to start and dial in
+REQUEST_TIMEOUT = 120  # seconds before a request counts as failed
+SAMPLE_INTERVAL = 0.2  # seconds between RSS samples
+
+
+def parse_mix(text):
+    """Parse "tools/list=1,echo=6" into [(entry, weight), ...]; tools/call entries are tool names"""
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name:
+            mix.append((name, float(weight) if weight else 1.0))
+    if not mix:
+        raise argparse.ArgumentTypeError("empty mix")
+    return mix
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+class Client:
+    """JSON-RPC client on the endpoint side of the WebSocket"""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.pending = {}
+        self.ids = itertools.count(1)
+
+    async def read_loop(self):
+        async for raw in self.websocket:
+            message = json.loads(raw)
+            future = self.pending.pop(message.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(message)
+
+    async def request(self, method, params=None):
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        await self.websocket.send(json.dumps(message))
+        try:
+            return await asyncio.wait_for(future, REQUEST_TIMEOUT)
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def notify(self, method, params=None):
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        await self.websocket.send(json.dumps(message))
+
+
+class ResourceSampler:
+    """CPU time and RSS of the pipe process and of its children (the tool servers)"""
+
+    def __init__(self, pid):
+        self.process = psutil.Process(pid)
+        self.pipe_rss = []
+        self.children_rss = []
+        self._task = None
+
+    def _children(self):
+        try:
+            return self.process.children(recursive=True)
+        except psutil.Error:
+            return []
+
+    def _cpu(self):
+        pipe = self.process.cpu_times()
+        children = 0.0
+        for child in self._children():
+            try:
+                times = child.cpu_times()
+                children += times.user + times.system
+            except psutil.Error:
+                pass
+        return pipe.user + pipe.system, children
+
+    async def _sample(self):
+        while True:
+            try:
+                self.pipe_rss.append(self.process.memory_info().rss)
+            except psutil.Error:
+                return
+            total = 0
+            for child in self._children():
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            self.children_rss.append(total)
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.cpu_start = self._cpu()
+        self._task = asyncio.create_task(self._sample())
+
+    def stop(self):
+        wall = time.perf_counter() - self.started
+        cpu_end = self._cpu()
+        self._task.cancel()
+        mb = 1024 * 1024
+        return {
+            "pipe_cpu_percent": round((cpu_end[0] - self.cpu_start[0]) / wall * 100, 1),
+            "children_cpu_percent": round((cpu_end[1] - self.cpu_start[1]) / wall * 100, 1),
+            "pipe_rss_mb_max": round(max(self.pipe_rss, default=0) / mb, 1),
+            "pipe_rss_mb_mean": round(sum(self.pipe_rss) / max(len(self.pipe_rss), 1) / mb, 1),
+            "children_rss_mb_max": round(max(self.children_rss, default=0) / mb, 1),
+            "children": len(self._children()),
+        }
+
+
+class LoadGenerator:
+    """Issues the request mix and records (entry, latency, ok) per request"""
+
+    def __init__(self, client, mix, tool_args, seed):
+        self.client = client
+        self.entries = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.tool_args = tool_args
+        self.random = random.Random(seed)
+        self.records = []
+
+    def next_entry(self):
+        return self.random.choices(self.entries, self.weights)[0]
+
+    async def issue(self, entry, due):
+        """Send one request of `entry`; latency is counted from `due`"""
+        ok = True
+        try:
+            if entry == "tools/list":
+                response = await self.client.request("tools/list", {})
+            else:
+                response = await self.client.request("tools/call", {
+                    "name": entry, "arguments": self.tool_args.get(entry, {})})
+            result = response.get("result")
+            ok = "error" not in response and not (isinstance(result, dict) and result.get("isError"))
+        except Exception:
+            ok = False
+        self.records.append((entry, time.perf_counter() - due, ok))
+
+    async def closed_loop(self, concurrency, requests, duration):
+        """`concurrency` callers, each sending its next request as soon as the last one returns"""
+        deadline = time.perf_counter() + duration if duration else None
+        remaining = itertools.count()
+
+        async def caller():
+            while True:
+                if deadline is not None:
+                    if time.perf_counter() >= deadline:
+                        return
+                elif next(remaining) >= requests:
+                    return
+                await self.issue(self.next_entry(), time.perf_counter())
+
+        await asyncio.gather(*(caller() for _ in range(concurrency)))
+
+    async def open_loop(self, rate, requests, duration):
+        """Requests due at a fixed `rate` per second, whether or not earlier ones have returned"""
+        total = int(rate * duration) if duration else requests
+        start = time.perf_counter()
+        tasks = []
+        for i in range(total):
+            due = start + i / rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self.issue(self.next_entry(), due)))
+        await asyncio.gather(*tasks)
+
+    def report(self, wall):
+        latencies = [latency for _, latency, _ in self.records]
+        errors = sum(1 for _, _, ok in self.records if not ok)
+        per_entry = {}
+        for entry in self.entries:
+            samples = [latency for name, latency, _ in self.records if name == entry]
+            if samples:
+                per_entry[entry] = percentiles(samples)
+                per_entry[entry]["errors"] = sum(1 for name, _, ok in self.records if name == entry and not ok)
+        return {
+            "requests": len(self.records),
+            "errors": errors,
+            "duration_s": round(wall, 3),
+            "requests_per_s": round(len(self.records) / wall, 1) if wall else 0.0,
+            "latency": percentiles(latencies),
+            "per_entry": per_entry,
+        }
+
+
+async def run(args):
+    loop = asyncio.get_running_loop()
+    connected = loop.create_future()
+
+    async def handler(websocket, *_):
+        if connected.done():
+            await websocket.close()  # Only the first connection is benchmarked
+            return
+        connected.set_result(websocket)
+        await websocket.wait_closed()
+
+    server = await websockets.serve(handler, "127.0.0.1", 0, max_size=None)
+    port = server.sockets[0].getsockname()[1]
+    env = dict(os.environ, MCP_ENDPOINT=f"ws://127.0.0.1:{port}")
+
+    timings = {}
+    started = time.perf_counter()
+    stderr = open(args.pipe_log, "w", encoding="utf-8") if args.pipe_log else asyncio.subprocess.DEVNULL
+    pipe = await asyncio.create_subprocess_exec(
+        sys.executable, args.pipe_script, *args.tool_scripts, *args.pipe_args,
+        stdout=asyncio.subprocess.DEVNULL, stderr=stderr, env=env)
+    try:
+        websocket = await asyncio.wait_for(connected, CONNECT_TIMEOUT)
+        timings["connect_s"] = round(time.perf_counter() - started, 3)
+
+        client = Client(websocket)
+        reader = asyncio.create_task(client.read_loop())
+        init = await client.request("initialize", {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {"name": "mcp_pipe_benchmark", "version": "0.1.0"},
+        })
+        timings["initialize_s"] = round(time.perf_counter() - started, 3)
+        await client.notify("notifications/initialized")
+        tools = await client.request("tools/list", {})
+        timings["ready_s"] = round(time.perf_counter() - started, 3)
+        tool_names = [tool["name"] for tool in tools.get("result", {}).get("tools", [])]
+        unknown = [name for name, _ in args.mix if name != "tools/list" and name not in tool_names]
+        if unknown:
+            raise SystemExit(f"tools not provided by {args.tool_scripts}: {unknown} (available: {tool_names})")
+
+        generator = LoadGenerator(client, args.mix, args.tool_args, args.seed)
+        if args.warmup:
+            await generator.closed_loop(min(args.concurrency, args.warmup), args.warmup, None)
+            generator.records.clear()
+
+        sampler = ResourceSampler(pipe.pid)
+        sampler.start()
+        load_started = time.perf_counter()
+        if args.rate:
+            await generator.open_loop(args.rate, args.requests, args.duration)
+        else:
+            await generator.closed_loop(args.concurrency, args.requests, args.duration)
+        wall = time.perf_counter() - load_started
+        resources = sampler.stop()
+        reader.cancel()
+
+        return {
+            "label": args.label,
+            "timestamp": time.time(),
+            "config": {
+                "pipe_script": args.pipe_script,
+                "tool_scripts": args.tool_scripts,
+                "pipe_args": args.pipe_args,
+                "mode": "open" if args.rate else "closed",
+                "rate": args.rate,
+                "concurrency": None if args.rate else args.concurrency,
+                "requests": args.requests,
+                "duration": args.duration,
+                "mix": dict(args.mix),
+                "seed": args.seed,
+            },
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "websockets": getattr(websockets, "__version__", "unknown"),
+            },
+            "server": init.get("result", {}).get("serverInfo"),
+            "startup": timings,
+            "results": generator.report(wall),
+            "resources": resources,
+        }
+    finally:
+        if pipe.returncode is None:
+            pipe.terminate()
+            try:
+                await asyncio.wait_for(pipe.wait(), 10)
+            except asyncio.TimeoutError:
+                pipe.kill()
+        server.close()
+        if stderr is not asyncio.subprocess.DEVNULL:
+            stderr.close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    pipe_args = []
+    if "--" in argv:
+        index = argv.index("--")
+        argv, pipe_args = argv[:index], argv[index + 1:]
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("tool_scripts", nargs="*", default=[TOOL_SCRIPT],
+                        help="tool script(s) for the pipe (default: benchmarks/synthetic_tool.py)")
+    parser.add_argument("--pipe-script", default=PIPE_SCRIPT, help="mcp_pipe.py to benchmark")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"weighted request mix of tools/list and tool names (default: {DEFAULT_MIX})")
+    parser.add_argument("--args", action="append", default=[], metavar="TOOL=JSON",
+                        help="arguments for a tool, e.g. 'sleep_ms={\"ms\": 50}' (repeatable)")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=8, help="closed loop: concurrent callers (default)")
+    load.add_argument("--rate", type=float, help="open loop: requests per second")
+    parser.add_argument("--requests", type=int, default=2000, help="requests to send (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="run for this many seconds instead of --requests")
+    parser.add_argument("--warmup", type=int, default=50, help="requests sent before measuring")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the request mix")
+    parser.add_argument("--label", default="", help="free-form label stored in the report")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--pipe-log", help="write the pipe's log output to this file")
+    args = parser.parse_args(argv)
+    args.pipe_args = pipe_args
+
+    args.tool_args = dict(DEFAULT_TOOL_ARGS)
+    for item in args.args:
+        name, _, raw = item.partition("=")
+        try:
+            args.tool_args[name] = json.loads(raw)
+        except ValueError:
+            parser.error(f"--args {item!r}: expected TOOL=JSON")
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Restart latency and memory of tool servers: cold start vs. forked from the zygote.
+
+Usage (Linux):
+
+python -m benchmarks.restart [tool_script ...] [--runs 20] [--instances 4] [--output restart.json]
+
+For every tool script (default: benchmarks/synthetic_tool.py and work_logger.py) each
+mode starts the script `--runs` times, one after another, and measures the time from
+spawn until the server has answered `initialize`: that is what a restart costs before
+the endpoint can be served again. Then `--instances` copies run side by side and their
+RSS, USS and PSS are summed; PSS divides shared pages between the processes sharing
+them, so it shows what copy-on-write sharing with the zygote saves. The zygote's own
+memory is included in the zygote totals.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import psutil
+
+from benchmarks.__main__ import BASE_DIR, TOOL_SCRIPT, percentiles
+
+sys.path.insert(0, BASE_DIR)
+import zygote  # noqa: E402  (lives next to mcp_pipe.py)
+
+DEFAULT_SCRIPTS = [TOOL_SCRIPT, os.path.join(BASE_DIR, "work_logger.py")]
+ZYGOTE_SCRIPT = os.path.join(BASE_DIR, "zygote.py")
+READY_TIMEOUT = 60  # seconds for a tool server to answer initialize
+SETTLE_TIME = 0.5  # seconds to let side-by-side instances settle before reading memory
+
+INITIALIZE = json.dumps({
+    "jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+        "protocolVersion": "2024-11-05", "capabilities": {},
+        "clientInfo": {"name": "restart_benchmark", "version": "0.1.0"}},
+}).encode() + b"\n"
+
+
+async def spawn(script, zygote_path):
+    streams = dict(stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+    if zygote_path:
+        return await zygote.create_subprocess(zygote_path, [script], **streams)
+    return await asyncio.create_subprocess_exec(sys.executable, script, **streams)
+
+
+async def start_ready(script, zygote_path):
+    """Start `script` and wait for its initialize answer; returns (process, seconds)"""
+    started = time.perf_counter()
+    process = await spawn(script, zygote_path)
+    process.stdin.write(INITIALIZE)
+    await process.stdin.drain()
+    while True:
+        line = await asyncio.wait_for(process.stdout.readline(), READY_TIMEOUT)
+        if not line:
+            raise RuntimeError(f"{script} exited before answering initialize")
+        if json.loads(line).get("id") == 1:
+            return process, time.perf_counter() - started
+
+
+async def stop(process):
+    if process.returncode is None:
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), 10)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+
+def memory(pids):
+    """Summed RSS/USS/PSS in MB of `pids`"""
+    totals = {"rss_mb": 0.0, "uss_mb": 0.0, "pss_mb": 0.0}
+    for pid in pids:
+        info = psutil.Process(pid).memory_full_info()
+        totals["rss_mb"] += info.rss / 2 ** 20
+        totals["uss_mb"] += info.uss / 2 ** 20
+        totals["pss_mb"] += getattr(info, "pss", 0) / 2 ** 20
+    return {key: round(value, 1) for key, value in totals.items()}
+
+
+async def measure(script, zygote_path, runs, instances):
+    latencies = []
+    for _ in range(runs):
+        process, seconds = await start_ready(script, zygote_path)
+        latencies.append(seconds)
+        await stop(process)
+
+    processes = [(await start_ready(script, zygote_path))[0] for _ in range(instances)]
+    try:
+        await asyncio.sleep(SETTLE_TIME)
+        resident = memory([process.pid for process in processes])
+    finally:
+        await asyncio.gather(*(stop(process) for process in processes))
+    return {"ready": percentiles(latencies), "memory": resident}
+
+
+async def run(args):
+    results = {script: {} for script in args.scripts}
+    for script in args.scripts:
+        results[script]["cold"] = await measure(script, None, args.runs, args.instances)
+
+    socket_path = os.path.join(tempfile.gettempdir(), f"mcp-zygote-bench-{os.getpid()}.sock")
+    started = time.perf_counter()
+    server = await asyncio.create_subprocess_exec(
+        sys.executable, ZYGOTE_SCRIPT, socket_path,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+    try:
+        while not os.path.exists(socket_path):
+            if server.returncode is not None or time.perf_counter() - started > READY_TIMEOUT:
+                raise SystemExit("zygote did not start")
+            await asyncio.sleep(0.01)
+        boot = time.perf_counter() - started
+        zygote_memory = memory([server.pid])
+        for script in args.scripts:
+            entry = await measure(script, socket_path, args.runs, args.instances)
+            entry["memory_with_zygote"] = {key: round(value + zygote_memory[key], 1)
+                                           for key, value in entry["memory"].items()}
+            results[script]["zygote"] = entry
+    finally:
+        await stop(server)
+
+    for entry in results.values():
+        cold, forked = entry["cold"], entry["zygote"]
+        entry["speedup_p50"] = round(cold["ready"]["p50_ms"] / forked["ready"]["p50_ms"], 1)
+        entry["pss_saved_mb"] = round(cold["memory"]["pss_mb"] - forked["memory_with_zygote"]["pss_mb"], 1)
+
+    return {
+        "label": args.label,
+        "timestamp": time.time(),
+        "config": {"scripts": args.scripts, "runs": args.runs, "instances": args.instances},
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "zygote": {"boot_s": round(boot, 3), "memory": zygote_memory, "preload": zygote.PRELOAD_MODULES},
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.restart", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("scripts", nargs="*", default=DEFAULT_SCRIPTS,
+                        help="tool scripts to start (default: synthetic_tool.py, work_logger.py)")
+    parser.add_argument("--runs", type=int, default=20, help="sequential starts per script and mode")
+    parser.add_argument("--instances", type=int, default=4, help="side-by-side copies for the memory totals")
+    parser.add_argument("--label", default="", help="free-form label stored in the report")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args(argv)
+    if os.name != "posix":
+        parser.error("the zygote needs fork(); run this on Linux")
+    args.scripts = [os.path.abspath(script) for script in args.scripts]
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# synthetic_tool.py
+# 基准测试用的合成 MCP 工具：不依赖 Windows，可在 Linux 上离线运行
+from mcp.server.fastmcp import FastMCP
+import asyncio
+import time
+
+# Create an MCP server
+mcp = FastMCP("Synthetic_Tool")
+
+@mcp.tool()
+def echo(text: str = ""):
+    """Return `text` unchanged"""
+    return {"success": True, "message": text}
+
+@mcp.tool()
+async def sleep_ms(ms: float = 10):
+    """Wait `ms` milliseconds without blocking the server (an I/O-bound tool)"""
+    await asyncio.sleep(ms / 1000)
+    return {"success": True, "message": f"slept {ms} ms"}
+
+@mcp.tool()
+def busy_ms(ms: float = 10):
+    """Spin the CPU for `ms` milliseconds, blocking the server (a synchronous COM/UI-style tool)"""
+    deadline = time.perf_counter() + ms / 1000
+    while time.perf_counter() < deadline:
+        pass
+    return {"success": True, "message": f"busy {ms} ms"}
+
+@mcp.tool()
+def payload(size: int = 1024):
+    """Return a `size`-character string (large results, e.g. list_outlook_events with bodies)"""
+    return {"success": True, "message": "x" * size}
+
+# Start the server
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
@@ -5,18 +5,66 @@ Version: 0.1.0
 Usage:
 
 export MCP_ENDPOINT=<mcp_endpoint>
-python mcp_pipe.py <mcp_script>
+python mcp_pipe.py <mcp_script> [--keep-alive] [--buffer-size N]
+python mcp_pipe.py <mcp_script> <mcp_script> ... [--in-process <mcp_script>] ...
+python mcp_pipe.py <mcp_script> --workers 4 [--pin <tool>] ...
+python mcp_pipe.py <mcp_script> --metrics [--metrics-file metrics.json] [--metrics-interval 60]
+python mcp_pipe.py <mcp_script> --record traffic.jsonl.gz
+python mcp_pipe.py <mcp_script> [--timeout 120] [--tool-timeout list_outlook_events=30] ...
+python mcp_pipe.py <mcp_script> --keep-alive [--ping-interval 5] [--ping-timeout 5] [--standby] [--in-flight fail]
+
+With --keep-alive the tool process survives WebSocket reconnects, so a network blip
+does not cost a cold start. Either way the `initialize` and `tools/list` answers of a
+script are cached (keyed by its path and mtime) and repeats are answered by the pipe;
+a fresh child of an already known script is initialized by the pipe itself.
+
+With several scripts (or --gateway / --in-process) the pipe runs as a gateway: all tool
+servers share one endpoint connection, `tools/list` is merged and `tools/call` is routed
+to the server owning the tool. Scripts given with --in-process are imported and served
+inside the gateway process instead of a child interpreter. --workers N runs each child
+script as a pool of N processes so slow synchronous tools no longer serialize every call;
+tools given with --pin always run on the pool's first worker.
+
+With --metrics the pipe matches JSON-RPC requests with their responses and logs per-method
+latency percentiles, in-flight counts, error rates and payload sizes every interval.
+
+tools/call requests can be given a deadline (--timeout, per tool --tool-timeout); there is
+none by default. On expiry the endpoint gets a JSON-RPC error, the tool gets
+notifications/cancelled, and a tool process that then fails to answer a ping is killed
+and restarted.
+
+The endpoint link is pinged every --ping-interval seconds and dropped when a pong takes
+longer than --ping-timeout. A link that was up for a while is redialed at once instead of
+after a backoff; with --standby a second connection is kept dialed and the pipe switches
+to it immediately. tools/call requests in flight during a switch are answered on the new
+connection once done (--in-flight deliver) or failed right away (--in-flight fail).
+
+With --record every message exchanged with the endpoint is appended, timestamped, to a
+capture file that mcp_replay.py can replay against a tool script.
+
+Once the first connection is up and the tool script has completed its MCP `initialize`,
+the pipe logs one "Startup report" line (JSON wall-clock marks) that start_all_services.py
+waits for to count the service as ready and to break its startup time down.
 
 """
 
+import time
+STARTED_AT = time.time()  # Taken before the imports below so the startup report can time them
+
+import argparse
 import asyncio
+import bisect
+import gzip
+import importlib.util
+import itertools
+import json
 import websockets
-import subprocess
 import logging
 import os
 import signal
 import sys
 import random
+from collections import deque
 from dotenv import load_dotenv
 
 
@@ -29,61 +77,130 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger('MCP_PIPE')
+IMPORTED_AT = time.time()
 
 # Reconnection settings
 INITIAL_BACKOFF = 1  # Initial wait time in seconds
 MAX_BACKOFF = 600  # Maximum wait time in seconds
+PING_INTERVAL = 20  # seconds between WebSocket pings (--ping-interval)
+PING_TIMEOUT = 20  # seconds to wait for a pong before the link counts as dead (--ping-timeout)
+FAST_REDIAL_AFTER = 10  # seconds a connection must have been up for the next dial to skip the backoff
+# Maximum size of a single JSON-RPC line read from the child (tools/list can be large)
+STREAM_LIMIT = 16 * 1024 * 1024
+# Messages kept from the child while the WebSocket is down (--keep-alive / gateway)
+OUTPUT_BUFFER_SIZE = 1000
+# Gateway handshake with its tool servers
+PROTOCOL_VERSION = "2024-11-05"
+GATEWAY_NAME = "MCP_Gateway"
+HANDSHAKE_TIMEOUT = 60  # seconds to wait for a tool server to answer initialize/tools/list
+RESTART_DELAY = 5  # seconds before a crashed gateway backend is restarted
+# tools/call deadlines (--timeout / --tool-timeout)
+DEFAULT_CALL_TIMEOUT = None  # seconds; None or 0 means no deadline
+PROBE_TIMEOUT = 10  # seconds a backend gets to answer a ping after a timeout before it is recycled
+
+# Metrics settings (--metrics)
+METRICS_INTERVAL = 60  # seconds between summaries
+METRICS_STALE_AFTER = 3600  # seconds before an unanswered request is counted as lost
+
+# Traffic capture (--record)
+RECORD_FLUSH_INTERVAL = 1  # seconds between flushes of the capture file
+
+# Startup report (start_all_services.py matches this prefix)
+READY_MARKER = "Startup report:"
+
+# JSON-RPC error codes
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+REQUEST_TIMEOUT = -32001
+
 reconnect_attempt = 0
 backoff = INITIAL_BACKOFF
+router = None
+outbox = None
+metrics = None
+recorder = None
+handshakes = None
+standby = None
+connected_at = None
+options = argparse.Namespace(keep_alive=False, buffer_size=OUTPUT_BUFFER_SIZE, gateway=False, in_process=[],
+                             workers=1, pin=[], timeout=DEFAULT_CALL_TIMEOUT, tool_timeouts={},
+                             ping_interval=PING_INTERVAL, ping_timeout=PING_TIMEOUT, standby=False,
+                             in_flight='deliver')
+
+async def main(uri):
+    """Run the pipe, plus the metrics reporter when enabled"""
+    if metrics is not None:
+        asyncio.create_task(metrics.report_forever())
+    if recorder is not None:
+        asyncio.create_task(recorder.flush_forever())
+    await connect_with_retry(uri)
 
 async def connect_with_retry(uri):
     """Connect to WebSocket server with retry mechanism"""
-    global reconnect_attempt, backoff
+    global reconnect_attempt, backoff, connected_at
     while True:  # Infinite reconnection
         try:
             if reconnect_attempt > 0:
                 wait_time = backoff * (1 + random.random() * 0.1)  # Add some random jitter
                 logger.info(f"Waiting {wait_time:.2f} seconds before reconnection attempt {reconnect_attempt}...")
                 await asyncio.sleep(wait_time)
-                
+
             # Attempt to connect
             await connect_to_server(uri)
-        
+
         except Exception as e:
-            reconnect_attempt += 1
-            logger.warning(f"Connection closed (attempt: {reconnect_attempt}): {e}")            
-            # Calculate wait time for next reconnection (exponential backoff)
-            backoff = min(backoff * 2, MAX_BACKOFF)
+            if connected_at is not None and time.monotonic() - connected_at >= FAST_REDIAL_AFTER:
+                # A healthy link dropped: redial (or switch to the standby) right away
+                logger.warning(f"Connection closed: {e}")
+            else:
+                reconnect_attempt += 1
+                logger.warning(f"Connection closed (attempt: {reconnect_attempt}): {e}")
+                # Calculate wait time for next reconnection (exponential backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+            connected_at = None
 
 async def connect_to_server(uri):
     """Connect to WebSocket server and establish bidirectional communication with `mcp_script`"""
-    global reconnect_attempt, backoff
+    global reconnect_attempt, backoff, router, outbox, handshakes, standby, connected_at
+    if outbox is None:
+        outbox = Outbox(options.buffer_size)
+    if handshakes is None:
+        handshakes = HandshakeCache()
+    if standby is None and options.standby:
+        standby = Standby(uri)
     try:
-        logger.info(f"Connecting to WebSocket server...")
-        async with websockets.connect(uri) as websocket:
+        websocket, backlog = await standby.take() if standby is not None else (None, [])
+        if websocket is not None:
+            logger.info(f"Switched to the standby connection ({len(backlog)} messages waiting)")
+        else:
+            logger.info(f"Connecting to WebSocket server...")
+            startup.mark('connecting', again=True)
+            websocket = await websockets.connect(uri, **connect_options())
+            startup.mark('connected', again=True)
             logger.info(f"Successfully connected to WebSocket server")
-            
+        if standby is not None:
+            standby.start()
+        try:
             # Reset reconnection counter if connection closes normally
             reconnect_attempt = 0
             backoff = INITIAL_BACKOFF
-            
-            # Start mcp_script process
-            process = subprocess.Popen(
-                [sys.executable, mcp_script],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                encoding='utf-8',
-                text=True  # Use text mode
-            )
-            logger.info(f"Started {mcp_script} process")
-            
-            # Create two tasks: read from WebSocket and write to process, read from process and write to WebSocket
-            await asyncio.gather(
-                pipe_websocket_to_process(websocket, process),
-                pipe_process_to_websocket(process, websocket),
-                pipe_process_stderr_to_terminal(process)
-            )
+            connected_at = time.monotonic()
+            if recorder is not None:
+                recorder.session(options.mcp_scripts + options.in_process)
+
+            # Start the tool process(es), or reuse the ones that survived the last connection
+            if router is None or not router.alive:
+                router = create_router()
+                await router.start()
+            else:
+                logger.info(f"Reusing running tool processes: {router.describe()}")
+
+            # Tool output is pumped by the backends; here we only forward WebSocket -> tools
+            await outbox.attach(websocket)
+            await pipe_websocket_to_process(websocket, router, backlog)
+        finally:
+            await websocket.close()
     except websockets.exceptions.ConnectionClosed as e:
         logger.error(f"WebSocket connection closed: {e}")
         raise  # Re-throw exception to trigger reconnection
@@ -91,77 +208,1209 @@ async def connect_to_server(uri):
         logger.error(f"Connection error: {e}")
         raise  # Re-throw exception
     finally:
-        # Ensure the child process is properly terminated
-        if 'process' in locals():
-            logger.info(f"Terminating {mcp_script} process")
-            try:
-                process.terminate()
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                process.kill()
-            logger.info(f"{mcp_script} process terminated")
-
-async def pipe_websocket_to_process(websocket, process):
-    """Read data from WebSocket and write to process stdin"""
+        outbox.detach()
+        if router is not None:
+            router.on_disconnect()
+            if router.calls and router.persistent:
+                logger.info(f"{len(router.calls)} tools/call in flight across the reconnect "
+                            f"({'answering on the next connection' if options.in_flight == 'deliver' else 'failing them'})")
+                if options.in_flight == 'fail':
+                    await router.fail_in_flight("Endpoint connection was lost while the tool was running")
+            # Without --keep-alive, ensure the child process is properly terminated
+            if not router.persistent:
+                logger.info(f"Terminating {router.describe()}")
+                await router.stop()
+                logger.info(f"{router.describe()} terminated")
+                router = None
+                outbox.clear()
+
+def connect_options():
+    """websockets.connect() keyword arguments for the endpoint link"""
+    kwargs = {
+        'ping_interval': options.ping_interval or None,
+        'ping_timeout': options.ping_timeout or None,
+    }
+    if options.ping_timeout:
+        # A dead link never acknowledges the close frame either: give up on it as fast as on a ping
+        kwargs['close_timeout'] = options.ping_timeout
+    return kwargs
+
+def create_router():
+    """Build the message router for the configured scripts"""
+    if options.gateway or len(options.mcp_scripts) > 1 or options.in_process or options.workers > 1:
+        return Gateway(options.mcp_scripts, options.in_process, options.workers, options.pin)
+    return Pipe(options.mcp_scripts[0])
+
+async def pipe_websocket_to_process(websocket, router, backlog=()):
+    """Read data from WebSocket and write to process stdin, starting with messages already received in `backlog`"""
+    backlog = deque(backlog)
     try:
         while True:
             # Read message from WebSocket
-            message = await websocket.recv()
+            message = backlog.popleft() if backlog else await websocket.recv()
             logger.debug(f"<< {message[:120]}...")
-            
-            # Write to process stdin (in text mode)
-            if isinstance(message, bytes):
-                message = message.decode('utf-8')
-            process.stdin.write(message + '\n')
-            process.stdin.flush()
+            if recorder is not None:
+                recorder.record('in', message)
+            if metrics is None:
+                await router.handle_message(message)
+            else:
+                request = metrics.on_request(message)
+                await router.handle_message(message)
+                metrics.on_dispatched(request)
     except Exception as e:
         logger.error(f"Error in WebSocket to process pipe: {e}")
         raise  # Re-throw exception to trigger reconnection
-    finally:
-        # Close process stdin
-        if not process.stdin.closed:
-            process.stdin.close()
 
-async def pipe_process_to_websocket(process, websocket):
-    """Read data from process stdout and send to WebSocket"""
+def call_timeout(tool_name):
+    """Deadline in seconds for a tools/call of `tool_name` (0 = unbounded)"""
+    return options.tool_timeouts.get(tool_name, options.timeout) or 0
+
+def timeouts_enabled():
+    return (options.timeout or 0) > 0 or any(seconds > 0 for seconds in options.tool_timeouts.values())
+
+def parse_tool_timeout(value):
+    """argparse type for --tool-timeout NAME=SECONDS"""
+    name, sep, seconds = value.partition('=')
     try:
-        while True:
-            # Read data from process stdout
-            data = await asyncio.get_event_loop().run_in_executor(
-                None, process.stdout.readline
-            )
-            
-            if not data:  # If no data, the process may have ended
-                logger.info("Process has ended output")
-                break
-                
-            # Send data to WebSocket
-            logger.debug(f">> {data[:120]}...")
-            # In text mode, data is already a string, no need to decode
-            await websocket.send(data)
-    except Exception as e:
-        logger.error(f"Error in process to WebSocket pipe: {e}")
-        raise  # Re-throw exception to trigger reconnection
+        if not sep or not name:
+            raise ValueError
+        return name, float(seconds)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected NAME=SECONDS, got {value!r}")
 
-async def pipe_process_stderr_to_terminal(process):
-    """Read data from process stderr and print to terminal"""
+def parse_message(data):
+    """Parse a JSON-RPC message, returning None for anything that is not a JSON object"""
     try:
+        message = json.loads(data)
+    except ValueError:
+        return None
+    return message if isinstance(message, dict) else None
+
+def make_result(request_id, result):
+    return json.dumps({'jsonrpc': '2.0', 'id': request_id, 'result': result}, ensure_ascii=False)
+
+def make_error(request_id, code, message):
+    return json.dumps({'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}})
+
+# ---------------------------------------------------------------------
+# WebSocket side
+# ---------------------------------------------------------------------
+
+class Outbox:
+    """Messages on their way to the WebSocket.
+
+    While no connection is attached, messages go into a bounded buffer (oldest dropped
+    first) that is flushed in order on the next ``attach``.
+    """
+
+    def __init__(self, size):
+        self.websocket = None
+        self.buffer = deque(maxlen=size)
+        self.dropped = 0
+
+    @property
+    def connected(self):
+        return self.websocket is not None
+
+    async def attach(self, websocket):
+        """Route output to `websocket`, flushing anything buffered while disconnected"""
+        if self.buffer:
+            logger.info(f"Flushing {len(self.buffer)} buffered messages"
+                        + (f" ({self.dropped} dropped on overflow)" if self.dropped else ""))
+        while self.buffer:
+            await websocket.send(self.buffer[0])
+            self.buffer.popleft()
+        self.dropped = 0
+        self.websocket = websocket
+
+    def detach(self):
+        """Stop routing output to the WebSocket; later output is buffered"""
+        self.websocket = None
+
+    def clear(self):
+        """Discard buffered output that belongs to a session which will not be resumed"""
+        self.buffer.clear()
+        self.dropped = 0
+
+    async def send(self, data):
+        """Send `data` to the attached WebSocket, or buffer it while disconnected"""
+        if metrics is not None:
+            metrics.on_response(data)
+        if recorder is not None:
+            recorder.record('out', data)
+        websocket = self.websocket
+        if websocket is not None:
+            try:
+                await websocket.send(data)
+                return
+            except websockets.exceptions.ConnectionClosed:
+                self.detach()
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(data)
+
+    async def close(self):
+        """Close the attached connection so the endpoint reconnects and re-handshakes"""
+        if self.websocket is not None:
+            await self.websocket.close()
+
+class Standby:
+    """A second endpoint connection, dialed ahead of time (--standby).
+
+    Until the active connection dies and ``take`` hands it over, whatever the endpoint
+    sends on it is queued (keeping the link responsive to pings) and processed right
+    after the switch. A new standby is dialed after every switch and whenever the
+    current one closes.
+    """
+
+    def __init__(self, uri):
+        self.uri = uri
+        self.websocket = None
+        self.backlog = []
+        self.task = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.dial_forever())
+
+    async def dial_forever(self):
+        delay = INITIAL_BACKOFF
         while True:
-            # Read data from process stderr
-            data = await asyncio.get_event_loop().run_in_executor(
-                None, process.stderr.readline
+            try:
+                websocket = await websockets.connect(self.uri, **connect_options())
+            except Exception as e:
+                logger.warning(f"Standby connection failed, retrying in {delay} seconds: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_BACKOFF)
+                continue
+            logger.info("Standby connection ready")
+            self.websocket, self.backlog = websocket, []
+            dialed_at = time.monotonic()
+            try:
+                async for message in websocket:
+                    self.backlog.append(message)
+            except websockets.exceptions.ConnectionClosed:
+                pass
+            self.websocket = None
+            if time.monotonic() - dialed_at >= FAST_REDIAL_AFTER:
+                delay = INITIAL_BACKOFF
+            # An endpoint that allows one connection per token closes the standby at once: back off
+            logger.warning(f"Standby connection closed, redialing in {delay} seconds")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_BACKOFF)
+
+    async def take(self):
+        """Hand over the standby connection and what it received so far; (None, []) if it is down"""
+        websocket = self.websocket
+        if websocket is None or websocket.close_code is not None:
+            return None, []
+        self.task.cancel()  # Stop reading from it; start() dials the next standby
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+        self.websocket, backlog, self.backlog = None, self.backlog, []
+        return websocket, backlog
+
+# ---------------------------------------------------------------------
+# Tool side: backends speak newline-delimited JSON-RPC
+# ---------------------------------------------------------------------
+
+class ToolProcess:
+    """An `mcp_script` child process and its stdio pumps.
+
+    Every line the child prints is handed to ``on_line(backend, data)``; ``on_exit(backend)``
+    is awaited once its stdout closes, unless the process is being stopped on purpose.
+    """
+
+    def __init__(self, script, on_line, on_exit, name=None):
+        self.script = script
+        self.name = name or os.path.basename(script)
+        self.on_line = on_line
+        self.on_exit = on_exit
+        self.tools = []
+        self.process = None
+        self._tasks = []
+        self._stopping = False
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.returncode is None
+
+    def describe(self):
+        return f"{self.name} process" + (f" (PID={self.process.pid})" if self.process else "")
+
+    async def start(self):
+        """Start `script` with asyncio StreamReader/StreamWriter pipes, forked from the zygote when there is one"""
+        self._stopping = False
+        self.process = None
+        if os.environ.get("MCP_ZYGOTE") and os.name == "posix":
+            import zygote
+            try:
+                self.process = await zygote.create_subprocess(
+                    os.environ["MCP_ZYGOTE"], [self.script],
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    limit=STREAM_LIMIT
+                )
+            except OSError as e:
+                logger.warning(f"Zygote unavailable, cold-starting {self.name}: {e}")
+        if self.process is None:
+            self.process = await asyncio.create_subprocess_exec(
+                sys.executable, self.script,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=STREAM_LIMIT
             )
-            
-            if not data:  # If no data, the process may have ended
-                logger.info("Process has ended stderr output")
-                break
-                
-            # Print stderr data to terminal (in text mode, data is already a string)
-            sys.stderr.write(data)
-            sys.stderr.flush()
-    except Exception as e:
-        logger.error(f"Error in process stderr pipe: {e}")
-        raise  # Re-throw exception to trigger reconnection
+        self._tasks = [
+            asyncio.create_task(self.pipe_process_to_websocket()),
+            asyncio.create_task(self.pipe_process_stderr_to_terminal()),
+        ]
+        logger.info(f"Started {self.describe()}")
+
+    async def stop(self, timeout=5):
+        """Terminate the child process, escalating to kill after `timeout` seconds"""
+        self._stopping = True
+        if self.alive:
+            try:
+                self.process.terminate()
+                await asyncio.wait_for(self.process.wait(), timeout)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+            except ProcessLookupError:
+                pass  # Already exited
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def kill(self):
+        """Kill a hung child; its stdout closing then triggers ``on_exit`` as for a crash"""
+        if self.alive:
+            self.process.kill()
+
+    async def write(self, message):
+        """Write one line to the child stdin; drain() applies backpressure without blocking the loop"""
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+        self.process.stdin.write(message + b'\n')
+        await self.process.stdin.drain()
+
+    async def pipe_process_to_websocket(self):
+        """Read data from process stdout and hand it to the router"""
+        try:
+            while True:
+                # Read data from process stdout
+                data = await self.process.stdout.readline()
+
+                if not data:  # If no data, the process may have ended
+                    logger.info(f"{self.name} has ended output")
+                    break
+
+                data = data.decode('utf-8', errors='replace')
+                logger.debug(f">> {data[:120]}...")
+                await self.on_line(self, data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in process to WebSocket pipe: {e}")
+        if not self._stopping:
+            await self.on_exit(self)
+
+    async def pipe_process_stderr_to_terminal(self):
+        """Read data from process stderr and print to terminal"""
+        try:
+            while True:
+                # Read data from process stderr
+                data = await self.process.stderr.readline()
+
+                if not data:  # If no data, the process may have ended
+                    logger.info(f"{self.name} has ended stderr output")
+                    break
+
+                # Print stderr data to terminal
+                sys.stderr.write(data.decode('utf-8', errors='replace'))
+                sys.stderr.flush()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in process stderr pipe: {e}")
+
+class InProcessTool:
+    """A FastMCP tool script imported and served inside the pipe process.
+
+    Speaks the same newline-delimited JSON-RPC as ``ToolProcess`` over in-memory streams,
+    which saves an interpreter per script. Synchronous tools run on the pipe's event loop,
+    so only scripts whose tools are quick or async should be hosted this way.
+    """
+
+    def __init__(self, script, on_line, on_exit):
+        self.script = script
+        self.name = os.path.basename(script)
+        self.on_line = on_line
+        self.on_exit = on_exit
+        self.tools = []
+        self._writer = None
+        self._tasks = []
+        self._stopping = False
+
+    @property
+    def alive(self):
+        return bool(self._tasks) and not any(task.done() for task in self._tasks)
+
+    def describe(self):
+        return f"{self.script} (in-process)"
+
+    async def start(self):
+        import anyio
+        from mcp.shared.message import SessionMessage
+        from mcp.types import JSONRPCMessage
+
+        self._stopping = False
+        self._message_types = (SessionMessage, JSONRPCMessage)
+        module_name = f"mcp_tool_{os.path.splitext(self.name)[0]}"
+        spec = importlib.util.spec_from_file_location(module_name, self.script)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        server = module.mcp._mcp_server
+
+        self._writer, read_stream = anyio.create_memory_object_stream(0)
+        write_stream, write_reader = anyio.create_memory_object_stream(0)
+
+        async def serve():
+            try:
+                await server.run(read_stream, write_stream, server.create_initialization_options())
+            except Exception as e:
+                logger.error(f"{self.name} in-process server failed: {e}")
+            if not self._stopping:
+                await self.on_exit(self)
+
+        async def pump():
+            async for session_message in write_reader:
+                await self.on_line(self, session_message.message.model_dump_json(by_alias=True, exclude_none=True))
+
+        self._tasks = [asyncio.create_task(serve()), asyncio.create_task(pump())]
+        logger.info(f"Started {self.describe()}")
+
+    async def stop(self, timeout=5):
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def kill(self):
+        """Tear down the in-process server (only effective if its tools yield to the loop)"""
+        for task in self._tasks:
+            task.cancel()
+        asyncio.create_task(self.on_exit(self))
+
+    async def write(self, message):
+        SessionMessage, JSONRPCMessage = self._message_types
+        try:
+            parsed = JSONRPCMessage.model_validate_json(message)
+        except Exception as e:
+            await self._writer.send(e)
+            return
+        await self._writer.send(SessionMessage(parsed))
+
+# ---------------------------------------------------------------------
+# Routers: decide what happens to each WebSocket message and tool output line
+# ---------------------------------------------------------------------
+
+def initialize_params(protocol_version=PROTOCOL_VERSION):
+    """Params of an `initialize` the pipe sends to a backend on its own behalf"""
+    return {
+        'protocolVersion': protocol_version,
+        'capabilities': {},
+        'clientInfo': {'name': GATEWAY_NAME, 'version': '0.1.0'},
+    }
+
+class HandshakeCache:
+    """`initialize` and `tools/list` results per tool script version.
+
+    A script's tool schemas cannot change while its code does not, so the answers are keyed
+    by (absolute path, mtime) and shared by every process ever started from that file:
+    reconnects, restarts and pool workers. Editing the script changes the key, and the next
+    child started from it goes through the full handshake again.
+    """
+
+    def __init__(self):
+        self.entries = {}  # (path, mtime_ns) -> {'protocol': requested version, 'initialize': result, 'tools/list': result}
+
+    @staticmethod
+    def key(script):
+        """Cache key for the current version of `script`; None if it cannot be stat'ed"""
+        path = os.path.abspath(script)
+        try:
+            return path, os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self, key, method):
+        return self.entries.get(key, {}).get(method)
+
+    def protocol(self, key):
+        return self.entries.get(key, {}).get('protocol')
+
+    def learn(self, key, method, result, protocol=None):
+        if key is None:
+            return
+        entry = self.entries.setdefault(key, {})
+        entry[method] = result
+        if protocol is not None:
+            entry['protocol'] = protocol
+        if method == 'tools/list':
+            logger.info(f"Cached tools/list of {os.path.basename(key[0])} ({len(result.get('tools', []))} tools)")
+
+class Router:
+    """Bookkeeping shared by ``Pipe`` and ``Gateway``.
+
+    Tracks the router's own requests to a backend (handshake, liveness pings) and the
+    endpoint's ``tools/call`` requests in flight, each with its deadline. When a call
+    outlives its deadline the endpoint gets a JSON-RPC error, the backend gets
+    ``notifications/cancelled``, and a backend that no longer answers a ping is recycled.
+    """
+
+    id_prefix = "pipe"
+
+    def __init__(self):
+        self.internal = {}  # our id -> (backend, future), for the router's own requests
+        self.calls = {}  # backend-side id -> (backend, endpoint id, tool name, deadline handle)
+        self.abandoned = set()  # backend-side ids of timed-out calls whose late answer must be dropped
+        self.timeouts = 0
+        self.load = {}  # backend -> tools/call in flight
+        self._probing = set()
+        self.ids = itertools.count(1)
+
+    def next_id(self):
+        return f"{self.id_prefix}-{next(self.ids)}"
+
+    async def request(self, backend, method, params, timeout=HANDSHAKE_TIMEOUT):
+        """Send a request of the router's own to `backend` and wait for its result"""
+        request_id = self.next_id()
+        future = asyncio.get_running_loop().create_future()
+        self.internal[request_id] = (backend, future)
+        try:
+            await backend.write(json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}))
+            response = await asyncio.wait_for(future, timeout)
+        finally:
+            self.internal.pop(request_id, None)
+        if 'error' in response:
+            raise RuntimeError(f"{method}: {response['error'].get('message')}")
+        return response.get('result', {})
+
+    async def prime(self, backend, protocol_version):
+        """Initialize a fresh `backend` without waiting for it: its answer is already cached.
+
+        Both messages are written before anything else reaches the backend's stdin, so
+        requests forwarded afterwards queue behind the handshake instead of racing it.
+        """
+        request_id = self.next_id()
+        future = asyncio.get_running_loop().create_future()
+        self.internal[request_id] = (backend, future)
+
+        def primed(future):
+            self.internal.pop(request_id, None)
+            if future.exception() is not None:
+                logger.warning(f"Initializing {backend.name} failed: {future.exception()}")
+            elif 'error' in future.result():
+                logger.warning(f"Initializing {backend.name} failed: {future.result()['error'].get('message')}")
+            else:
+                startup.mark('handshake')
+
+        future.add_done_callback(primed)
+        await backend.write(json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': 'initialize',
+                                        'params': initialize_params(protocol_version)}))
+        await backend.write(json.dumps({'jsonrpc': '2.0', 'method': 'notifications/initialized'}))
+        logger.info(f"Initialized {backend.name} from the handshake cache")
+
+    def resolve_internal(self, response):
+        """Complete one of our own requests; False if `response` belongs to someone else"""
+        entry = self.internal.get(response.get('id'))
+        if entry is None:
+            return False
+        future = entry[1]
+        if not future.done():
+            future.set_result(response)
+        return True
+
+    def track_call(self, backend, backend_id, endpoint_id, tool_name):
+        """Remember a forwarded tools/call and arm its deadline"""
+        seconds = call_timeout(tool_name)
+        handle = None
+        if seconds > 0:
+            handle = asyncio.get_running_loop().call_later(
+                seconds, lambda: asyncio.create_task(self.expire_call(backend_id, seconds)))
+        self.abandoned.discard(backend_id)
+        self.calls[backend_id] = (backend, endpoint_id, tool_name, handle)
+        self.load[backend] = self.load.get(backend, 0) + 1
+
+    def finish_call(self, backend_id):
+        """Forget a call that was answered or cancelled; returns its entry, if any"""
+        call = self.calls.pop(backend_id, None)
+        if call is not None:
+            self.load[call[0]] -= 1
+            if call[3] is not None:
+                call[3].cancel()
+        return call
+
+    async def expire_call(self, backend_id, seconds):
+        call = self.calls.pop(backend_id, None)
+        if call is None:
+            return
+        backend, endpoint_id, tool_name, _ = call
+        self.load[backend] -= 1
+        self.abandoned.add(backend_id)
+        self.timeouts += 1
+        logger.warning(f"tools/call {tool_name} (id={endpoint_id}) on {backend.name} timed out "
+                       f"after {seconds:g} seconds ({self.timeouts} timeouts so far)")
+        await outbox.send(make_error(endpoint_id, REQUEST_TIMEOUT,
+                                     f"Tool {tool_name} timed out after {seconds:g} seconds"))
+        if await self.cancel(backend, backend_id, f"Timed out after {seconds:g} seconds"):
+            if backend not in self._probing:
+                asyncio.create_task(self.probe(backend))
+
+    async def cancel(self, backend, backend_id, reason):
+        """Send `notifications/cancelled` for a request to `backend`; False if it is not running"""
+        if not backend.alive:
+            return False
+        try:
+            await backend.write(json.dumps({'jsonrpc': '2.0', 'method': 'notifications/cancelled', 'params': {
+                'requestId': backend_id, 'reason': reason}}))
+        except Exception as e:
+            logger.warning(f"Could not cancel request on {backend.name}: {e}")
+        return True
+
+    async def fail_in_flight(self, reason):
+        """Answer every tools/call in flight with an error now and drop their late results"""
+        for backend_id in list(self.calls):
+            backend, endpoint_id, _, _ = self.finish_call(backend_id)
+            self.abandoned.add(backend_id)
+            await outbox.send(make_error(endpoint_id, INTERNAL_ERROR, reason))
+            await self.cancel(backend, backend_id, reason)
+
+    async def probe(self, backend):
+        """Recycle `backend` if it no longer answers a ping"""
+        self._probing.add(backend)
+        try:
+            await self.request(backend, 'ping', {}, timeout=PROBE_TIMEOUT)
+        except Exception:
+            if backend.alive:
+                logger.error(f"{backend.name} did not answer a ping within {PROBE_TIMEOUT} seconds, recycling it")
+                backend.kill()
+        finally:
+            self._probing.discard(backend)
+
+    async def fail_backend(self, backend, reason):
+        """Fail everything in flight on a backend that exited"""
+        for owner, future in list(self.internal.values()):
+            if owner is backend and not future.done():
+                future.set_exception(RuntimeError(reason))
+        for backend_id, call in list(self.calls.items()):
+            if call[0] is backend:
+                self.finish_call(backend_id)
+                await outbox.send(make_error(call[1], INTERNAL_ERROR, reason))
+        self.abandoned.clear()
+
+class Pipe(Router):
+    """One tool script, forwarded line by line.
+
+    ``initialize`` and ``tools/list`` are answered from the handshake cache once the script
+    has answered them, without touching the child's stdin; a child started for a script
+    that is already cached is initialized by the pipe itself right after it starts.
+    With --keep-alive the child also outlives the connection. ``tools/call`` requests are
+    only parsed for their deadlines.
+    """
+
+    def __init__(self, script):
+        super().__init__()
+        self.tool = ToolProcess(script, self.on_line, self.on_exit)
+        self.script_key = None
+        self.child_initialized = False
+        self.swallow_initialized = False
+        self.handshake_ids = {}  # JSON-RPC id -> (method, requested protocol version), for handshake requests in flight
+
+    @property
+    def persistent(self):
+        return options.keep_alive
+
+    @property
+    def alive(self):
+        return self.tool.alive
+
+    def describe(self):
+        return self.tool.describe()
+
+    async def start(self):
+        self.script_key = HandshakeCache.key(self.tool.script)
+        self.child_initialized = False
+        startup.mark('spawning')
+        await self.tool.start()
+        if handshakes.get(self.script_key, 'initialize') is not None:
+            await self.prime(self.tool, handshakes.protocol(self.script_key))
+            self.child_initialized = True
+
+    async def stop(self):
+        await self.tool.stop()
+
+    def on_disconnect(self):
+        self.swallow_initialized = False
+
+    async def handle_message(self, message):
+        """Forward a WebSocket message to the child, answering the handshake from cache when possible"""
+        if self.script_key is None and not timeouts_enabled():
+            await self.tool.write(message)
+            return
+        request = parse_message(message)
+        if request is not None:
+            reply = self.replay_handshake(request)
+            if reply is not None:
+                if reply:
+                    await outbox.send(reply)
+                return
+            method = request.get('method')
+            if 'id' in request:
+                # The endpoint reuses the id of a timed-out call: its answer is no longer late
+                self.abandoned.discard(request['id'])
+            if method == 'tools/call' and 'id' in request:
+                self.track_call(self.tool, request['id'], request['id'], (request.get('params') or {}).get('name'))
+            elif method == 'notifications/cancelled':
+                self.finish_call((request.get('params') or {}).get('requestId'))
+            elif method == 'notifications/initialized':
+                self.child_initialized = True
+        await self.tool.write(message)
+
+    def replay_handshake(self, request):
+        """Return a cached reply for `request`, "" to drop it, or None to forward it to the child"""
+        method = request.get('method')
+        if method == 'initialize' and 'id' in request:
+            requested = (request.get('params') or {}).get('protocolVersion')
+            result = handshakes.get(self.script_key, 'initialize')
+            if result is not None and self.child_initialized and requested == handshakes.protocol(self.script_key):
+                # The child is already initialized; its `notifications/initialized` is already done too
+                self.swallow_initialized = True
+                logger.info("Answering initialize from cache")
+                return make_result(request['id'], result)
+            self.handshake_ids[request['id']] = (method, requested)
+        elif method == 'notifications/initialized' and self.swallow_initialized:
+            self.swallow_initialized = False
+            return ""
+        elif method == 'tools/list' and 'id' in request and not (request.get('params') or {}).get('cursor'):
+            result = handshakes.get(self.script_key, 'tools/list')
+            if result is not None:
+                logger.info("Answering tools/list from cache")
+                return make_result(request['id'], result)
+            self.handshake_ids[request['id']] = (method, None)
+        return None
+
+    def learn_handshake(self, response):
+        """Cache the child's answer to a forwarded `initialize` or `tools/list`"""
+        method, requested = self.handshake_ids.pop(response.get('id'), (None, None))
+        if method is not None and 'result' in response:
+            handshakes.learn(self.script_key, method, response['result'], requested)
+            if method == 'initialize':
+                startup.mark('handshake')
+
+    async def on_line(self, tool, data):
+        if self.handshake_ids or self.internal or self.calls or self.abandoned:
+            response = parse_message(data)
+            if response is not None and 'method' not in response:
+                if self.resolve_internal(response):
+                    return
+                response_id = response.get('id')
+                if response_id in self.abandoned:
+                    self.abandoned.discard(response_id)
+                    logger.info(f"Dropping late response to timed-out request {response_id}")
+                    return
+                self.finish_call(response_id)
+                if self.handshake_ids:
+                    self.learn_handshake(response)
+        await outbox.send(data)
+
+    async def on_exit(self, tool):
+        await self.fail_backend(tool, f"{tool.name} exited")
+        # The child is gone: drop the connection so the endpoint re-handshakes with a fresh one
+        await outbox.close()
+
+class Gateway(Router):
+    """Several tool servers behind one endpoint connection.
+
+    The gateway performs the MCP handshake with every backend itself, answers the
+    endpoint's ``initialize`` and ``tools/list`` with the merged view, and routes each
+    ``tools/call`` to the backend owning the tool. Request ids are rewritten on the way
+    in, so ids from the endpoint can never collide between backends. Backends outlive
+    WebSocket connections and are restarted if they crash.
+
+    With ``workers`` > 1 every child script runs as a pool of identical processes: each
+    one is initialized, and calls go to the worker with the fewest calls in flight.
+    Tools listed in ``pinned`` always go to the first worker of their pool, which keeps
+    UI automation serialized on one process.
+    """
+
+    persistent = True
+    id_prefix = "gw"
+
+    def __init__(self, scripts, in_process_scripts=(), workers=1, pinned=()):
+        super().__init__()
+        self.backends = []
+        for script in scripts:
+            for worker in range(workers):
+                name = os.path.basename(script) + (f"#{worker}" if workers > 1 else "")
+                self.backends.append(ToolProcess(script, self.on_line, self.on_exit, name=name))
+        self.backends += [InProcessTool(script, self.on_line, self.on_exit) for script in in_process_scripts]
+        self.pinned = set(pinned)
+        self.rotation = itertools.count()
+        self.tools = []
+        self.tool_owner = {}  # tool name -> backends of the script providing it (the worker pool)
+        self.server_info = {}  # backend -> initialize result
+        self.protocol_version = PROTOCOL_VERSION
+        self._stopping = False
+
+    @property
+    def alive(self):
+        return not self._stopping
+
+    def describe(self):
+        return ", ".join(backend.describe() for backend in self.backends)
+
+    async def start(self):
+        self._stopping = False
+        startup.mark('spawning')
+        await asyncio.gather(*(self.start_backend(backend) for backend in self.backends))
+        self.rebuild_tools()
+        startup.mark('handshake')
+
+    async def stop(self):
+        self._stopping = True
+        await asyncio.gather(*(backend.stop() for backend in self.backends))
+
+    def on_disconnect(self):
+        pass
+
+    async def start_backend(self, backend):
+        """Start `backend` and perform the MCP handshake with it, or prime it from the handshake cache"""
+        try:
+            key = HandshakeCache.key(backend.script)
+            await backend.start()
+            result = handshakes.get(key, 'initialize')
+            cached_tools = handshakes.get(key, 'tools/list')
+            if result is not None and cached_tools is not None:
+                await self.prime(backend, PROTOCOL_VERSION)
+                tools = cached_tools['tools']
+            else:
+                result = await self.request(backend, 'initialize', initialize_params())
+                await backend.write(json.dumps({'jsonrpc': '2.0', 'method': 'notifications/initialized'}))
+                handshakes.learn(key, 'initialize', result, PROTOCOL_VERSION)
+
+                tools, cursor = [], None
+                while True:
+                    page = await self.request(backend, 'tools/list', {'cursor': cursor} if cursor else {})
+                    tools.extend(page.get('tools', []))
+                    cursor = page.get('nextCursor')
+                    if not cursor:
+                        break
+                handshakes.learn(key, 'tools/list', {'tools': tools})
+            self.server_info[backend] = result
+            self.protocol_version = result.get('protocolVersion', self.protocol_version)
+            backend.tools = tools
+            logger.info(f"{backend.name}: {len(tools)} tools")
+        except Exception as e:
+            logger.error(f"Handshake with {backend.name} failed: {e}")
+            backend.tools = []
+
+    def rebuild_tools(self):
+        """Merge the backends' tool lists; on a name clash the first script wins"""
+        self.tools, self.tool_owner = [], {}
+        for backend in self.backends:
+            for tool in backend.tools:
+                owners = self.tool_owner.get(tool['name'])
+                if owners is None:
+                    self.tool_owner[tool['name']] = [backend]
+                    self.tools.append(tool)
+                elif owners[0].script == backend.script:
+                    owners.append(backend)  # Another worker of the same pool
+                else:
+                    logger.warning(f"Tool {tool['name']} of {backend.name} is shadowed by {owners[0].name}")
+        for name in self.pinned - set(self.tool_owner):
+            logger.warning(f"Pinned tool {name} is not provided by any script")
+
+    def pick_backend(self, name):
+        """Choose the worker for a call to tool `name`; None if the tool is unknown"""
+        owners = self.tool_owner.get(name)
+        if not owners:
+            return None
+        if name in self.pinned or len(owners) == 1:
+            return owners[0]
+        # Least calls in flight; start the scan at a rotating offset so ties are spread out
+        start = next(self.rotation) % len(owners)
+        candidates = [backend for backend in owners[start:] + owners[:start] if backend.alive] or owners
+        return min(candidates, key=lambda backend: self.load.get(backend, 0))
+
+    async def forward(self, backend, message):
+        """Forward an endpoint tools/call to `backend` under a gateway-unique id"""
+        gateway_id = self.next_id()
+        self.track_call(backend, gateway_id, message['id'], message['params'].get('name'))
+        message['id'] = gateway_id
+        await backend.write(json.dumps(message))
+
+    async def handle_message(self, data):
+        message = parse_message(data)
+        if message is None:
+            logger.warning(f"Ignoring malformed message: {data[:120]}")
+            return
+        method = message.get('method')
+        if method is None:
+            return  # A response to a server-initiated request; backends never see the endpoint's ids
+        if 'id' not in message:
+            await self.handle_notification(message)
+            return
+
+        request_id = message['id']
+        if method == 'initialize':
+            await outbox.send(make_result(request_id, {
+                'protocolVersion': self.protocol_version,
+                'capabilities': {'tools': {'listChanged': False}},
+                'serverInfo': {'name': GATEWAY_NAME, 'version': '0.1.0'},
+            }))
+        elif method == 'ping':
+            await outbox.send(make_result(request_id, {}))
+        elif method == 'tools/list':
+            await outbox.send(make_result(request_id, {'tools': self.tools}))
+        elif method == 'tools/call':
+            name = (message.get('params') or {}).get('name')
+            backend = self.pick_backend(name)
+            if backend is None:
+                await outbox.send(make_error(request_id, INVALID_PARAMS, f"Unknown tool: {name}"))
+            elif not backend.alive:
+                await outbox.send(make_error(request_id, INTERNAL_ERROR, f"{backend.name} is restarting"))
+            else:
+                await self.forward(backend, message)
+        elif method in ('resources/list', 'resources/templates/list', 'prompts/list'):
+            key = {'resources/list': 'resources', 'resources/templates/list': 'resourceTemplates',
+                   'prompts/list': 'prompts'}[method]
+            await outbox.send(make_result(request_id, {key: []}))
+        else:
+            await outbox.send(make_error(request_id, METHOD_NOT_FOUND, f"Method not found: {method}"))
+
+    async def handle_notification(self, message):
+        if message['method'] == 'notifications/cancelled':
+            params = message.get('params') or {}
+            for gateway_id, (backend, endpoint_id, _, _) in list(self.calls.items()):
+                if endpoint_id == params.get('requestId'):
+                    self.finish_call(gateway_id)
+                    params['requestId'] = gateway_id
+                    await backend.write(json.dumps(message))
+                    break
+        # notifications/initialized and the like: the gateway already initialized its backends
+
+    async def on_line(self, backend, data):
+        message = parse_message(data)
+        if message is None:
+            logger.warning(f"Ignoring malformed output from {backend.name}: {data[:120]}")
+            return
+        message_id = message.get('id')
+        if 'method' not in message and self.resolve_internal(message):
+            pass
+        elif 'method' not in message and message_id in self.calls:
+            message['id'] = self.finish_call(message_id)[1]
+            await outbox.send(json.dumps(message, ensure_ascii=False))
+        elif 'method' not in message and message_id in self.abandoned:
+            self.abandoned.discard(message_id)
+            logger.info(f"Dropping late response to timed-out request {message_id}")
+        elif 'method' in message and 'id' not in message:
+            await outbox.send(data)  # Backend notifications (logging, progress) pass through
+        else:
+            logger.debug(f"Dropping unroutable message from {backend.name}: {data[:120]}")
+
+    async def on_exit(self, backend):
+        """Fail the crashed backend's requests and bring it back"""
+        if self._stopping:
+            return
+        logger.warning(f"{backend.name} exited, restarting in {RESTART_DELAY} seconds")
+        await self.fail_backend(backend, f"{backend.name} exited")
+        asyncio.create_task(self.restart_backend(backend))
+
+    async def restart_backend(self, backend):
+        await asyncio.sleep(RESTART_DELAY)
+        if self._stopping:
+            return
+        await backend.stop()
+        await self.start_backend(backend)
+        self.rebuild_tools()
+
+# ---------------------------------------------------------------------
+# JSON-RPC metrics (--metrics)
+# ---------------------------------------------------------------------
+
+class LatencyHistogram:
+    """Fixed log-scale buckets (x1.25 from 0.1 ms up to ~10 min); constant memory however long the pipe runs"""
+
+    BOUNDS = [0.0001 * 1.25 ** i for i in range(71)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the `fraction` quantile, in seconds"""
+        if not self.total:
+            return 0.0
+        rank = fraction * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.BOUNDS[index], self.max) if index < len(self.BOUNDS) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.total,
+            'mean_ms': round(self.sum / self.total * 1000, 3) if self.total else 0.0,
+            'p50_ms': round(self.percentile(0.50) * 1000, 3),
+            'p95_ms': round(self.percentile(0.95) * 1000, 3),
+            'p99_ms': round(self.percentile(0.99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+class MethodStats:
+    """Counters for one JSON-RPC method (tools/call is split per tool name)"""
+
+    def __init__(self):
+        self.requests = 0
+        self.responses = 0
+        self.errors = 0  # JSON-RPC error responses
+        self.tool_errors = 0  # tools/call results flagged isError
+        self.lost = 0  # never answered within METRICS_STALE_AFTER
+        self.timeouts = 0  # answered by the pipe's deadline instead of the tool
+        self.in_flight = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency = LatencyHistogram()  # received from WebSocket -> response handed to WebSocket
+        self.dispatch = LatencyHistogram()  # received from WebSocket -> written to the tool (stdin backpressure)
+
+    def snapshot(self):
+        return {
+            'requests': self.requests,
+            'responses': self.responses,
+            'in_flight': self.in_flight,
+            'errors': self.errors,
+            'tool_errors': self.tool_errors,
+            'lost': self.lost,
+            'timeouts': self.timeouts,
+            'error_rate': round((self.errors + self.tool_errors) / self.responses, 4) if self.responses else 0.0,
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'latency': self.latency.snapshot(),
+            'dispatch': self.dispatch.snapshot(),
+        }
+
+class Metrics:
+    """Matches requests from the endpoint with the responses sent back to it.
+
+    Latency is measured inside the pipe, from the moment a request is read off the
+    WebSocket until its response is handed back to it; comparing it with the latency the
+    endpoint sees separates network time from pipe + tool time, and ``dispatch`` shows how
+    long requests waited on a slow tool's stdin.
+    """
+
+    def __init__(self, path=None, interval=METRICS_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.started = time.time()
+        self.methods = {}
+        self.pending = {}  # request id -> (method key, received at)
+        self.notifications_in = 0
+        self.messages_out = 0
+        self._last_logged = None
+
+    def stats(self, key):
+        stats = self.methods.get(key)
+        if stats is None:
+            stats = self.methods[key] = MethodStats()
+        return stats
+
+    def on_request(self, data):
+        """Record a message read from the WebSocket; returns the request key for `on_dispatched`"""
+        message = parse_message(data)
+        if message is None or 'method' not in message:
+            return None
+        if 'id' not in message:
+            self.notifications_in += 1
+            return None
+        key = message['method']
+        if key == 'tools/call':
+            key = f"tools/call:{(message.get('params') or {}).get('name')}"
+        stats = self.stats(key)
+        stats.requests += 1
+        stats.in_flight += 1
+        stats.request_bytes += len(data)
+        now = time.perf_counter()
+        request_id = message['id']
+        if request_id in self.pending:
+            self.stats(self.pending[request_id][0]).in_flight -= 1  # Reused id: the old request is gone
+        self.pending[request_id] = (key, now)
+        return key, now
+
+    def on_dispatched(self, request):
+        if request is not None:
+            key, received = request
+            self.stats(key).dispatch.add(time.perf_counter() - received)
+
+    def on_response(self, data):
+        """Record a message on its way to the WebSocket"""
+        self.messages_out += 1
+        message = parse_message(data)
+        if message is None or 'method' in message or message.get('id') not in self.pending:
+            return
+        key, received = self.pending.pop(message['id'])
+        stats = self.stats(key)
+        stats.in_flight -= 1
+        stats.responses += 1
+        stats.response_bytes += len(data)
+        stats.latency.add(time.perf_counter() - received)
+        if 'error' in message:
+            stats.errors += 1
+            if isinstance(message['error'], dict) and message['error'].get('code') == REQUEST_TIMEOUT:
+                stats.timeouts += 1
+        elif isinstance(message.get('result'), dict) and message['result'].get('isError'):
+            stats.tool_errors += 1
+
+    def expire_stale(self):
+        """Forget requests that were never answered (e.g. lost with a dropped connection)"""
+        deadline = time.perf_counter() - METRICS_STALE_AFTER
+        for request_id, (key, received) in list(self.pending.items()):
+            if received < deadline:
+                del self.pending[request_id]
+                stats = self.stats(key)
+                stats.in_flight -= 1
+                stats.lost += 1
+
+    def snapshot(self):
+        return {
+            'timestamp': time.time(),
+            'uptime': round(time.time() - self.started, 1),
+            'in_flight': len(self.pending),
+            'notifications_in': self.notifications_in,
+            'messages_out': self.messages_out,
+            'methods': {key: stats.snapshot() for key, stats in sorted(self.methods.items())},
+        }
+
+    def log_summary(self):
+        activity = (sum(stats.requests for stats in self.methods.values()), self.messages_out)
+        if activity == self._last_logged:
+            return  # Nothing new since the last summary
+        self._last_logged = activity
+        for key, stats in sorted(self.methods.items()):
+            latency = stats.latency.snapshot()
+            logger.info(
+                f"[metrics] {key}: {stats.requests} req, {stats.in_flight} in flight, "
+                f"{stats.errors + stats.tool_errors} errors ({stats.timeouts} timeouts), "
+                f"p50={latency['p50_ms']}ms p95={latency['p95_ms']}ms p99={latency['p99_ms']}ms, "
+                f"{stats.request_bytes}B in / {stats.response_bytes}B out"
+            )
+
+    def write_file(self):
+        """Atomically replace the metrics file with the current snapshot"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    async def report_forever(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.expire_stale()
+            self.log_summary()
+            if self.path:
+                try:
+                    self.write_file()
+                except OSError as e:
+                    logger.warning(f"Could not write metrics file {self.path}: {e}")
+
+# ---------------------------------------------------------------------
+# Traffic capture (--record), replayed with mcp_replay.py
+# ---------------------------------------------------------------------
+
+class Recorder:
+    """Append-only capture of the endpoint traffic, one JSON object per line.
+
+    ``{"t": <unix time>, "d": "in", "m": <raw message>}`` for messages from the endpoint,
+    ``"d": "out"`` for messages sent to it, and ``"d": "session"`` (with ``"scripts"``)
+    at the start of each connection. A ``.gz`` path is written gzip-compressed; appending
+    to an existing capture adds a new gzip member, which readers handle transparently.
+    """
+
+    def __init__(self, path):
+        opener = gzip.open if path.endswith('.gz') else open
+        self.path = path
+        self.file = opener(path, 'at', encoding='utf-8')
+        self._dirty = False
+
+    def _write(self, entry):
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._dirty = True
+
+    def session(self, scripts):
+        self._write({'t': round(time.time(), 6), 'd': 'session', 'scripts': scripts})
+
+    def record(self, direction, message):
+        if isinstance(message, bytes):
+            message = message.decode('utf-8', errors='replace')
+        self._write({'t': round(time.time(), 6), 'd': direction, 'm': message.rstrip('\n')})
+
+    def flush(self):
+        if self._dirty:
+            self.file.flush()
+            self._dirty = False
+
+    async def flush_forever(self):
+        while True:
+            await asyncio.sleep(RECORD_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning(f"Could not write capture file {self.path}: {e}")
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+# ---------------------------------------------------------------------
+# Startup report
+# ---------------------------------------------------------------------
+
+class StartupReport:
+    """Wall-clock marks of this process's first startup, logged once as a single JSON line.
+
+    started/imported are module-level; connecting/connected frame the successful endpoint
+    dial; spawning/handshake frame the tool script's start up to its answered `initialize`.
+    Wall-clock time so a supervisor can line the marks up with the moment it spawned us.
+    """
+
+    def __init__(self):
+        self.marks = {'started': STARTED_AT, 'imported': IMPORTED_AT}
+        self.reported = False
+
+    def mark(self, name, again=False):
+        """Record `name` now (the first time only, unless `again`); report once connected and handshaken"""
+        if self.reported or (name in self.marks and not again):
+            return
+        self.marks[name] = time.time()
+        if 'connected' in self.marks and 'handshake' in self.marks:
+            self.reported = True
+            self.marks['ready'] = time.time()
+            logger.info(f"{READY_MARKER} {json.dumps({key: round(value, 3) for key, value in self.marks.items()})}")
+
+startup = StartupReport()
 
 def signal_handler(sig, frame):
     """Handle interrupt signals"""
@@ -171,24 +1420,67 @@ def signal_handler(sig, frame):
 if __name__ == "__main__":
     # Register signal handler
     signal.signal(signal.SIGINT, signal_handler)
-    
-    # mcp_script
-    if len(sys.argv) < 2:
-        logger.error("Usage: mcp_pipe.py <mcp_script>")
-        sys.exit(1)
-    
-    mcp_script = sys.argv[1]
-    
+    if os.name != "nt":  # Also shut down cleanly when a supervisor terminates us
+        signal.signal(signal.SIGTERM, signal_handler)
+
+    parser = argparse.ArgumentParser(description="Pipe MCP stdio servers to the WebSocket endpoint")
+    parser.add_argument('mcp_scripts', nargs='*', metavar='mcp_script', help="MCP tool script(s) to run")
+    parser.add_argument('--keep-alive', action='store_true',
+                        help="keep the tool process running across WebSocket reconnects")
+    parser.add_argument('--buffer-size', type=int, default=OUTPUT_BUFFER_SIZE,
+                        help="max messages buffered from the tool process while disconnected")
+    parser.add_argument('--gateway', action='store_true',
+                        help="serve the scripts through one merged MCP server, even if there is only one")
+    parser.add_argument('--in-process', action='append', default=[], metavar='mcp_script',
+                        help="host this script inside the gateway process (repeatable)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="run N identical processes per script and spread tools/call across them")
+    parser.add_argument('--pin', action='append', default=[], metavar='TOOL',
+                        help="always run this tool on the first worker, e.g. send_message_to_wechat (repeatable)")
+    parser.add_argument('--ping-interval', type=float, default=PING_INTERVAL,
+                        help="seconds between WebSocket pings to the endpoint (0 disables)")
+    parser.add_argument('--ping-timeout', type=float, default=PING_TIMEOUT,
+                        help="seconds without a pong before the endpoint link is dropped (0 disables)")
+    parser.add_argument('--standby', action='store_true',
+                        help="keep a second endpoint connection dialed and switch to it when the active one dies")
+    parser.add_argument('--in-flight', choices=('deliver', 'fail'), default='deliver',
+                        help="tools/call in flight when the link drops: answer on the next connection, or fail now")
+    parser.add_argument('--record', metavar='PATH',
+                        help="append all endpoint traffic with timestamps to PATH (.gz to compress), see mcp_replay.py")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_CALL_TIMEOUT,
+                        help="default tools/call deadline in seconds (default: none)")
+    parser.add_argument('--tool-timeout', action='append', default=[], type=parse_tool_timeout,
+                        metavar='NAME=SECONDS', help="deadline for one tool, e.g. list_outlook_events=30 (repeatable)")
+    parser.add_argument('--metrics', action='store_true',
+                        help="track per-method JSON-RPC latency, errors and payload sizes")
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help="also write the metrics snapshot to this JSON file (implies --metrics)")
+    parser.add_argument('--metrics-interval', type=float, default=METRICS_INTERVAL,
+                        help="seconds between metrics summaries")
+    options = parser.parse_args()
+    if not options.mcp_scripts and not options.in_process:
+        parser.error("at least one mcp_script is required")
+    options.tool_timeouts = dict(options.tool_timeout)
+    if options.workers < 1:
+        parser.error("--workers must be at least 1")
+    if options.metrics or options.metrics_file:
+        metrics = Metrics(options.metrics_file, options.metrics_interval)
+    if options.record:
+        recorder = Recorder(options.record)
+
     # Get token from environment variable or command line arguments
-    endpoint_url = "替换为你的小智智能体的MCP接入点地址（wss开头）"
+    endpoint_url = os.environ.get("MCP_ENDPOINT") or "替换为你的小智智能体的MCP接入点地址（wss开头）"
     if not endpoint_url:
         logger.error("Please set the `MCP_ENDPOINT` environment variable")
         sys.exit(1)
-    
+
     # Start main loop
     try:
-        asyncio.run(connect_with_retry(endpoint_url))
+        asyncio.run(main(endpoint_url))
     except KeyboardInterrupt:
         logger.info("Program interrupted by user")
     except Exception as e:
-        logger.error(f"Program execution error: {e}")
\ No newline at end of file
+        logger.error(f"Program execution error: {e}")
+    finally:
+        if recorder is not None:
+            recorder.close()
@@ -0,0 +1,272 @@
+"""
+Replay endpoint traffic captured with `mcp_pipe.py --record` against a tool script and
+diff the responses with the recorded ones.
+Version: 0.1.0
+
+Usage:
+
+python mcp_replay.py <capture> <mcp_script> [--speed 1] [--session N] [--skip-tool NAME] [--report out.json]
+
+--speed 1 replays at the original pace, --speed 10 ten times faster, --speed 0 as fast as
+possible. Each recorded connection (session) is replayed in order against one tool
+process; a session that starts without `initialize` (e.g. answered from the pipe's cache)
+gets a synthetic handshake first. Tool calls have side effects (work log entries, Outlook
+items, WeChat messages): use --skip-tool for tools that must not run again.
+"""
+
+import argparse
+import asyncio
+import difflib
+import gzip
+import json
+import logging
+import sys
+import time
+
+from mcp_pipe import ToolProcess, parse_message, PROTOCOL_VERSION
+
+logger = logging.getLogger('MCP_REPLAY')
+
+RESPONSE_TIMEOUT = 30  # seconds to wait for outstanding responses at the end of a session
+MAX_DIFF_LINES = 40  # per mismatching response in the printed report
+
+
+def read_lines(f):
+    """Iterate over lines, stopping quietly at the truncated tail of a capture from a killed pipe"""
+    try:
+        for line in f:
+            yield line
+    except EOFError:
+        logger.warning("Capture ends with a truncated block (pipe killed?); using what was flushed")
+
+
+def load_capture(path):
+    """Read a capture file into sessions: lists of (timestamp, direction, raw message)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    sessions = [[]]
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in read_lines(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping corrupt capture line: {line[:80]}")
+                continue
+            if entry.get('d') == 'session':
+                if sessions[-1]:
+                    sessions.append([])
+                continue
+            sessions[-1].append((entry['t'], entry['d'], entry['m']))
+    return [session for session in sessions if session]
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+
+
+def method_key(request):
+    if request.get('method') == 'tools/call':
+        return f"tools/call:{(request.get('params') or {}).get('name')}"
+    return request.get('method')
+
+
+def comparable(response):
+    """The part of a response that should be reproducible"""
+    if response is None:
+        return None
+    return {key: response[key] for key in ('result', 'error') if key in response}
+
+
+class Replayer:
+    """Feeds recorded requests to one tool process and collects its responses by id"""
+
+    def __init__(self, script, speed, skip_tools):
+        self.tool = ToolProcess(script, self.on_line, self.on_exit)
+        self.speed = speed
+        self.skip_tools = set(skip_tools)
+        self.waiting = {}  # request id -> future resolved with (response, received at)
+        self.initialized = False
+
+    async def on_line(self, tool, data):
+        message = parse_message(data)
+        if message is None or 'method' in message:
+            return  # Server notifications/requests are not part of the comparison
+        future = self.waiting.pop(message.get('id'), None)
+        if future is not None and not future.done():
+            future.set_result((message, time.perf_counter()))
+
+    async def on_exit(self, tool):
+        logger.error(f"{tool.name} exited during replay")
+        for future in self.waiting.values():
+            if not future.done():
+                future.set_exception(RuntimeError(f"{tool.name} exited"))
+        self.waiting.clear()
+
+    async def request(self, request_id, raw):
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request_id] = future
+        await self.tool.write(raw)
+        return future
+
+    async def handshake(self):
+        """Initialize the tool for a session recorded without its handshake"""
+        future = await self.request('replay-init', json.dumps({
+            'jsonrpc': '2.0', 'id': 'replay-init', 'method': 'initialize', 'params': {
+                'protocolVersion': PROTOCOL_VERSION, 'capabilities': {},
+                'clientInfo': {'name': 'mcp_replay', 'version': '0.1.0'}}}))
+        await asyncio.wait_for(future, RESPONSE_TIMEOUT)
+        await self.tool.write(json.dumps({'jsonrpc': '2.0', 'method': 'notifications/initialized'}))
+        self.initialized = True
+
+    async def replay_session(self, session):
+        """Replay one recorded connection; returns per-request outcomes"""
+        incoming = [(t, raw, parse_message(raw)) for t, direction, raw in session if direction == 'in']
+        incoming = [(t, raw, message) for t, raw, message in incoming if message is not None]
+        recorded = {}  # request id -> (response, recorded latency)
+        sent_at = {}
+        for t, direction, raw in session:
+            message = parse_message(raw)
+            if message is None:
+                continue
+            if direction == 'in' and 'id' in message and 'method' in message:
+                sent_at[json.dumps(message['id'])] = t
+            elif direction == 'out' and 'method' not in message:
+                key = json.dumps(message.get('id'))
+                if key in sent_at and key not in recorded:
+                    recorded[key] = (message, t - sent_at[key])
+        if not incoming:
+            return []
+
+        first = incoming[0][2]
+        if first.get('method') == 'initialize':
+            self.initialized = True  # The session brings its own handshake
+        elif not self.initialized:
+            await self.handshake()
+
+        outcomes = []
+        pending = []
+        origin = incoming[0][0]
+        start = time.perf_counter()
+        for t, raw, message in incoming:
+            if self.speed > 0:
+                delay = start + (t - origin) / self.speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if message.get('method') == 'tools/call' and (message.get('params') or {}).get('name') in self.skip_tools:
+                continue
+            if 'id' not in message or 'method' not in message:
+                await self.tool.write(raw)  # Notifications (initialized, cancelled) keep their place
+                continue
+            future = await self.request(message['id'], raw)
+            pending.append((message, time.perf_counter(), future))
+
+        for message, sent, future in pending:
+            key = json.dumps(message['id'])
+            expected, recorded_latency = recorded.get(key, (None, None))
+            try:
+                response, received = await asyncio.wait_for(future, max(0.0, sent + RESPONSE_TIMEOUT - time.perf_counter()))
+            except (asyncio.TimeoutError, RuntimeError):
+                response, received = None, None
+            outcome = {
+                'id': message['id'],
+                'method': method_key(message),
+                'latency': received - sent if received is not None else None,
+                'recorded_latency': recorded_latency,
+            }
+            if response is None:
+                outcome['status'] = 'missing'
+            elif expected is None:
+                outcome['status'] = 'unrecorded'
+            elif comparable(response) == comparable(expected):
+                outcome['status'] = 'match'
+            else:
+                outcome['status'] = 'diff'
+                outcome['diff'] = list(difflib.unified_diff(
+                    json.dumps(comparable(expected), ensure_ascii=False, indent=1, sort_keys=True).splitlines(),
+                    json.dumps(comparable(response), ensure_ascii=False, indent=1, sort_keys=True).splitlines(),
+                    'recorded', 'replayed', lineterm=''))
+            outcomes.append(outcome)
+        return outcomes
+
+
+def summarize(outcomes, wall):
+    by_method = {}
+    for outcome in outcomes:
+        by_method.setdefault(outcome['method'], []).append(outcome)
+    summary = {
+        'requests': len(outcomes),
+        'duration_s': round(wall, 3),
+        'statuses': {},
+        'methods': {},
+    }
+    for outcome in outcomes:
+        summary['statuses'][outcome['status']] = summary['statuses'].get(outcome['status'], 0) + 1
+    for method, items in sorted(by_method.items()):
+        replayed = [item['latency'] for item in items if item['latency'] is not None]
+        recorded = [item['recorded_latency'] for item in items if item['recorded_latency'] is not None]
+        summary['methods'][method] = {
+            'requests': len(items),
+            'diffs': sum(1 for item in items if item['status'] == 'diff'),
+            'missing': sum(1 for item in items if item['status'] == 'missing'),
+            'replayed_p50_ms': percentile(replayed, 0.50),
+            'replayed_p99_ms': percentile(replayed, 0.99),
+            'recorded_p50_ms': percentile(recorded, 0.50),
+            'recorded_p99_ms': percentile(recorded, 0.99),
+        }
+    return summary
+
+
+async def replay(args):
+    sessions = load_capture(args.capture)
+    if args.session is not None:
+        if not 0 <= args.session < len(sessions):
+            raise SystemExit(f"capture has {len(sessions)} sessions, no session {args.session}")
+        sessions = [sessions[args.session]]
+    replayer = Replayer(args.mcp_script, args.speed, args.skip_tool)
+    await replayer.tool.start()
+    outcomes = []
+    start = time.perf_counter()
+    try:
+        for index, session in enumerate(sessions):
+            logger.info(f"Replaying session {index + 1}/{len(sessions)} ({len(session)} messages)")
+            outcomes.extend(await replayer.replay_session(session))
+    finally:
+        await replayer.tool.stop()
+    return outcomes, time.perf_counter() - start
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Replay a `mcp_pipe.py --record` capture against a tool script")
+    parser.add_argument('capture', help="capture file written by mcp_pipe.py --record")
+    parser.add_argument('mcp_script', help="MCP tool script to replay against")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="1 = original pace, N = N times faster, 0 = as fast as possible")
+    parser.add_argument('--session', type=int, help="replay only this session (0-based)")
+    parser.add_argument('--skip-tool', action='append', default=[], metavar='NAME',
+                        help="do not replay calls of this tool (repeatable)")
+    parser.add_argument('--report', metavar='PATH', help="write the summary and all outcomes as JSON")
+    args = parser.parse_args()
+
+    outcomes, wall = asyncio.run(replay(args))
+    summary = summarize(outcomes, wall)
+
+    for outcome in outcomes:
+        if outcome['status'] in ('diff', 'missing'):
+            print(f"--- {outcome['method']} id={outcome['id']}: {outcome['status']}")
+            for line in outcome.get('diff', [])[:MAX_DIFF_LINES]:
+                print(line)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'outcomes': outcomes}, f, ensure_ascii=False, indent=2)
+    sys.exit(1 if summary['statuses'].get('diff') or summary['statuses'].get('missing') else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,501 @@
+# outlook_fake.py
+# 内存中的 Outlook 对象模型替身，供 outlook_manager.py 在没有 Outlook/pywin32 的环境（如 Linux）下运行与验证
+# 用法：OUTLOOK_BACKEND=fake python outlook_manager.py
+#
+# 只实现 outlook_manager 用到的那部分对象模型（Application/Namespace/Folder/Items/Item），
+# 语义尽量与 COM 一致：每次访问 Folder.Items 得到新的集合，Restrict 返回过滤后的集合，
+# 集合是活的（遍历中删除条目会跳过下一条），IncludeRecurrences 的集合把周期约会展开为各次实例，
+# Outlook "重启"（disconnect）后旧的 Application/Namespace/Folder 句柄调用即抛出 RPC_E_DISCONNECTED。
+# FakeStore.round_trips 统计跨进程调用次数（每读写一次条目属性、每调用一次方法记 1 次），用于比较不同读取方式的开销。
+
+import itertools
+import re
+import threading
+from datetime import datetime, timezone
+
+RPC_E_DISCONNECTED = -2147417848  # 0x80010108，对象已与其客户端断开连接
+
+OL_MAIL_ITEM = 0
+OL_APPOINTMENT_ITEM = 1
+OL_CONTACT_ITEM = 2
+OL_FOLDER_CALENDAR = 9
+OL_FOLDER_CONTACTS = 10
+OL_APPT_MASTER = 1  # RecurrenceState
+OL_APPT_OCCURRENCE = 2
+
+ITEM_FOLDERS = {OL_APPOINTMENT_ITEM: OL_FOLDER_CALENDAR, OL_CONTACT_ITEM: OL_FOLDER_CONTACTS}
+ITEM_DEFAULTS = {
+    OL_MAIL_ITEM: {"Subject": "", "Body": "", "Importance": 1},
+    OL_APPOINTMENT_ITEM: {"Subject": "", "Body": "", "Start": None, "End": None, "Importance": 1,
+                          "ReminderSet": False, "ReminderMinutesBeforeStart": 15, "Location": "",
+                          "Organizer": "", "Categories": "", "BusyStatus": 2, "AllDayEvent": False,
+                          "IsRecurring": False, "RecurrenceState": 0},
+    OL_CONTACT_ITEM: {"FullName": "", "Email1Address": "", "Email2Address": "", "Email3Address": "",
+                      "NickName": "", "FileAs": "", "CompanyName": "", "JobTitle": "",
+                      "BusinessTelephoneNumber": "", "BusinessAddress": "", "MailingAddress": ""},
+}
+
+JET_DATE_FORMAT = "%m/%d/%Y %I:%M %p"
+JET_CLAUSE = re.compile(r"^\[(\w+)\]\s*(>=|<=|<>|=|>|<)\s*(?:'(.*)'|(\w+))$")
+JET_LITERALS = {"true": True, "false": False}
+DASL_CLAUSE = re.compile(r'^"([^"]+)"\s*(>=|<=|<>|=|>|<|LIKE)\s*\'(.*)\'$', re.I)
+DASL_PROPERTIES = {
+    "urn:schemas:calendar:dtstart": "Start",
+    "urn:schemas:calendar:dtend": "End",
+    "urn:schemas:httpmail:subject": "Subject",
+}
+COMPARATORS = {
+    "=": lambda a, b: a == b, "<>": lambda a, b: a != b,
+    ">": lambda a, b: a > b, ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b, "<=": lambda a, b: a <= b,
+}
+
+
+class FakeComError(Exception):
+    """与 pywintypes.com_error 一样带 hresult 属性"""
+
+    def __init__(self, hresult, message):
+        super().__init__(hresult, message)
+        self.hresult = hresult
+
+
+class FakeTime(datetime):
+    """pywintypes.datetime 的替身：datetime 子类，Format 与之相同使用 strftime 格式"""
+
+    def Format(self, fmt="%c"):
+        return self.strftime(fmt)
+
+
+def to_time(value):
+    if isinstance(value, datetime) and not isinstance(value, FakeTime):
+        return FakeTime(value.year, value.month, value.day, value.hour, value.minute, value.second)
+    return value
+
+
+class FakeStore:
+    """Outlook 进程中的数据：跨重连保留；generation 变化即代表 Outlook 重启过"""
+
+    def __init__(self):
+        self.folders = {OL_FOLDER_CALENDAR: [], OL_FOLDER_CONTACTS: []}
+        self.sent = []
+        self.generation = 0
+        self.version = 0  # 每次增删改条目加 1，集合据此判断缓存的视图是否过期
+        self.round_trips = 0
+        self.ids = itertools.count(1)
+        self.lock = threading.RLock()
+        self.listeners = {}  # folder id -> 事件回调列表（ItemAdd/ItemChange/ItemRemove）
+
+    def notify(self, folder_id):
+        for callback in list(self.listeners.get(folder_id, ())):
+            callback()
+
+
+class FakeObject:
+    def __init__(self, store):
+        self.store = store
+        self.generation = store.generation
+
+    def check(self):
+        if self.generation != self.store.generation:
+            raise FakeComError(RPC_E_DISCONNECTED, "The object invoked has disconnected from its clients.")
+
+
+class FakeItem:
+    def __init__(self, store, item_type, **props):
+        self.__dict__.update(ITEM_DEFAULTS[item_type])
+        self.__dict__.update(store=store, item_type=item_type, EntryID=None)
+        for key, value in props.items():
+            setattr(self, key, value)
+        if item_type == OL_MAIL_ITEM:
+            self.Recipients = FakeRecipients(store)
+            self.Attachments = FakeAttachments()
+
+    def __getattribute__(self, name):
+        if name[:1].isupper():
+            object.__getattribute__(self, "store").round_trips += 1
+        return object.__getattribute__(self, name)
+
+    def __setattr__(self, name, value):
+        if name[:1].isupper():
+            self.store.round_trips += 1
+        if name in ("Start", "End"):
+            value = to_time(value)
+        self.__dict__[name] = value
+
+    def get(self, name):
+        """替身内部读取属性，不计入 round_trips"""
+        return self.__dict__.get(name)
+
+    def folder(self):
+        return self.store.folders[ITEM_FOLDERS[self.item_type]]
+
+    def Save(self):
+        with self.store.lock:
+            self.LastModificationTime = FakeTime.now()
+            if self.EntryID is None:
+                self.EntryID = f"{next(self.store.ids):08X}"
+                self.folder().append(self)
+            self.store.version += 1
+        self.store.notify(ITEM_FOLDERS[self.item_type])
+
+    def Delete(self):
+        with self.store.lock:
+            items = self.folder()
+            if self not in items:
+                raise FakeComError(-2147221233, "The item has been moved or deleted.")
+            items.remove(self)
+            self.store.version += 1
+        self.store.notify(ITEM_FOLDERS[self.item_type])
+
+    def occurrences(self):
+        """周期约会（主约会）展开出的各次实例，已删除的实例除外"""
+        interval, count = self.__dict__["pattern"]
+        start, end = self.get("Start"), self.get("End")
+        return [FakeOccurrence(self, start + interval * index, end + interval * index) for index in range(count)
+                if start + interval * index not in self.__dict__["deleted"]]
+
+    def Send(self):
+        unresolved = [recipient.Name for recipient in self.Recipients if not recipient.Resolved]
+        if not self.Recipients.items or unresolved:
+            raise FakeComError(-2147467259, f"Outlook does not recognize one or more names: {unresolved}")
+        self.store.sent.append(self)
+
+
+class FakeOccurrence(FakeItem):
+    """周期约会的一次实例：EntryID 与主约会相同，Delete 只删除这一次（记为例外并修改主约会）"""
+
+    def __init__(self, master, start, end):
+        self.__dict__.update({key: value for key, value in master.__dict__.items() if key[:1].isupper()})
+        self.__dict__.update(store=master.store, item_type=OL_APPOINTMENT_ITEM, master=master,
+                             Start=to_time(start), End=to_time(end), RecurrenceState=OL_APPT_OCCURRENCE)
+
+    def Delete(self):
+        master = self.master
+        with self.store.lock:
+            if master not in master.folder() or self.get("Start") in master.deleted:
+                raise FakeComError(-2147221233, "The item has been moved or deleted.")
+            master.deleted.add(self.get("Start"))
+            master.__dict__["LastModificationTime"] = FakeTime.now()
+            self.store.version += 1
+        self.store.notify(OL_FOLDER_CALENDAR)
+
+
+def expand_recurrences(items):
+    expanded = []
+    for item in items:
+        if item.get("RecurrenceState") == OL_APPT_MASTER:
+            expanded.extend(item.occurrences())
+        else:
+            expanded.append(item)
+    return expanded
+
+
+class FakeRecipient:
+    def __init__(self, name):
+        self.Name = name
+        self.Resolved = False
+
+
+class FakeRecipients:
+    def __init__(self, store):
+        self.store = store
+        self.items = []
+
+    def __iter__(self):
+        return iter(list(self.items))
+
+    @property
+    def Count(self):
+        return len(self.items)
+
+    def Add(self, name):
+        recipient = FakeRecipient(name)
+        self.items.append(recipient)
+        return recipient
+
+    def ResolveAll(self):
+        """邮箱地址或通讯录中的姓名/邮箱视为可解析"""
+        known = set()
+        for contact in self.store.folders[OL_FOLDER_CONTACTS]:
+            known.update(value.lower() for value in (contact.FullName, contact.Email1Address) if value)
+        for recipient in self.items:
+            recipient.Resolved = "@" in recipient.Name or recipient.Name.lower() in known
+        return all(recipient.Resolved for recipient in self.items)
+
+
+class FakeAttachments:
+    def __init__(self):
+        self.paths = []
+
+    @property
+    def Count(self):
+        return len(self.paths)
+
+    def Add(self, path):
+        self.paths.append(path)
+
+
+class FakeItems(FakeObject):
+    """Items 集合：与 COM 一样是活的视图，按下标遍历，遍历中删除条目会跳过其后一条
+
+    `source` 返回底层条目（文件夹的条目列表，或 Restrict 前集合的当前视图），
+    集合在其上叠加周期约会展开（IncludeRecurrences）、过滤与排序；与 COM 一样，
+    IncludeRecurrences 需在 Restrict 之前设置，对 Restrict 得到的集合生效。
+    """
+
+    def __init__(self, store, source, folder_id=None, restriction=""):
+        super().__init__(store)
+        self.source = source
+        self.folder_id = folder_id  # 仅文件夹的 Items 集合可订阅事件
+        self.restriction = restriction
+        self.sort = None
+        self.IncludeRecurrences = False
+        self.cached = (None, None)
+
+    def view(self):
+        with self.store.lock:
+            state = (self.store.version, self.sort, self.IncludeRecurrences)
+            if self.cached[0] != state:
+                items = self.source()
+                if self.IncludeRecurrences:
+                    items = expand_recurrences(items)
+                items = filter_items(items, self.restriction)
+                if self.sort:
+                    sort_items(items, *self.sort)
+                self.cached = (state, items)
+            return self.cached[1]
+
+    def __iter__(self):
+        self.check()
+        index = 0
+        while index < len(self.view()):
+            yield self.view()[index]
+            index += 1
+
+    @property
+    def Count(self):
+        self.check()
+        return len(self.view())
+
+    def Sort(self, prop, descending=False):
+        self.check()
+        self.sort = (prop, descending)
+
+    def Restrict(self, restriction):
+        self.check()
+        restricted = FakeItems(self.store, self.view, restriction=restriction)
+        restricted.generation = self.generation
+        return restricted
+
+
+def sort_items(items, prop, descending=False):
+    key = prop.strip("[]")
+    items.sort(key=lambda item: (item.get(key) is None, item.get(key)), reverse=descending)
+
+
+def filter_items(items, restriction):
+    if not restriction:
+        return list(items)
+    if restriction.startswith("@SQL="):
+        parse, restriction = parse_dasl_clause, restriction[len("@SQL="):]
+    else:
+        parse = parse_clause
+    clauses = [parse(clause) for clause in re.split(r"\s+AND\s+", restriction.strip(), flags=re.I)]
+    return [item for item in items if all(compare(item.get(prop), value) for prop, compare, value in clauses)]
+
+
+def parse_clause(clause):
+    """解析一条 Jet 过滤条件 "[Prop] op 'value'"；日期值按 Outlook 的 MM/DD/YYYY HH:MM AM/PM 解析"""
+    match = JET_CLAUSE.match(clause.strip())
+    if not match:
+        raise FakeComError(-2147352567, f"Cannot parse condition: {clause}")
+    prop, op, value, literal = match.groups()
+    if literal is not None:
+        value = JET_LITERALS[literal.lower()] if literal.lower() in JET_LITERALS else int(literal)
+    else:
+        try:
+            value = datetime.strptime(value, JET_DATE_FORMAT)
+        except ValueError:
+            pass
+    compare = COMPARATORS[op]
+
+    def check(actual, expected):
+        if actual is None:
+            return False
+        if isinstance(actual, str) and isinstance(expected, str):
+            return compare(actual.lower(), expected.lower())  # Jet 文本比较不区分大小写
+        return compare(actual, expected)
+
+    return prop, check, value
+
+
+def like_pattern(value):
+    """把 LIKE 模式转换为不区分大小写的正则：% 任意字符串，_ 任意单个字符，[x] 为字面字符 x"""
+    parts = []
+    for escaped, wildcard, literal in re.findall(r"\[(.)\]|([%_])|(.)", value, flags=re.S):
+        if wildcard:
+            parts.append(".*" if wildcard == "%" else ".")
+        else:
+            parts.append(re.escape(escaped or literal))
+    return re.compile("".join(parts), re.I | re.S)
+
+
+def parse_dasl_clause(clause):
+    """解析一条 DASL 条件 "schema:name" op 'value'；DASL 日期为 UTC，LIKE 支持 % _ 通配符与 [x] 转义"""
+    match = DASL_CLAUSE.match(clause.strip())
+    if not match or match.group(1) not in DASL_PROPERTIES:
+        raise FakeComError(-2147352567, f"Cannot parse condition: {clause}")
+    name, op, value = match.groups()
+    prop = DASL_PROPERTIES[name]
+    if op.upper() == "LIKE":
+        pattern = like_pattern(value.replace("''", "'"))
+        return prop, lambda actual, expected: actual is not None and expected.fullmatch(actual) is not None, pattern
+    value = value.replace("''", "'")
+    try:
+        value = datetime.strptime(value, JET_DATE_FORMAT).replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    except ValueError:
+        pass
+    compare = COMPARATORS[op]
+    return prop, lambda actual, expected: actual is not None and compare(actual, expected), value
+
+
+class FakeFolder(FakeObject):
+    def __init__(self, store, folder_id):
+        super().__init__(store)
+        self.folder_id = folder_id
+
+    @property
+    def Items(self):
+        self.check()
+        return FakeItems(self.store, lambda: self.store.folders[self.folder_id], self.folder_id)
+
+    def GetTable(self, restriction="", table_contents=0):
+        self.check()
+        self.store.round_trips += 1
+        with self.store.lock:
+            return FakeTable(self.store, filter_items(self.store.folders[self.folder_id], restriction))
+
+
+class FakeColumns:
+    def __init__(self, store):
+        self.store = store
+        self.names = ["EntryID", "Subject", "CreationTime", "LastModificationTime", "MessageClass"]
+
+    def RemoveAll(self):
+        self.store.round_trips += 1
+        self.names = []
+
+    def Add(self, name):
+        self.store.round_trips += 1
+        self.names.append(name)
+
+
+class FakeTable(FakeObject):
+    """Table 对象：只读行集，GetArray 一次调用取回多行的所选列"""
+
+    def __init__(self, store, items):
+        super().__init__(store)
+        self.items = items
+        self.position = 0
+        self.Columns = FakeColumns(store)
+
+    @property
+    def EndOfTable(self):
+        self.check()
+        return self.position >= len(self.items)
+
+    def Sort(self, prop, descending=False):
+        self.check()
+        self.store.round_trips += 1
+        sort_items(self.items, prop, descending)
+
+    def MoveToStart(self):
+        self.position = 0
+
+    def GetArray(self, max_rows):
+        self.check()
+        self.store.round_trips += 1
+        rows = self.items[self.position:self.position + max_rows]
+        self.position += len(rows)
+        return tuple(tuple(item.get(name) for name in self.Columns.names) for item in rows)
+
+
+class FakeNamespace(FakeObject):
+    def GetItemFromID(self, entry_id):
+        self.check()
+        self.store.round_trips += 1
+        for items in self.store.folders.values():
+            for item in items:
+                if item.get("EntryID") == entry_id:
+                    return item
+        raise FakeComError(-2147221233, "The operation failed. An object could not be found.")
+
+    def GetDefaultFolder(self, folder_id):
+        self.check()
+        if folder_id not in self.store.folders:
+            raise FakeComError(-2147221233, f"Folder {folder_id} is not available.")
+        return FakeFolder(self.store, folder_id)
+
+
+class FakeApplication(FakeObject):
+    def GetNamespace(self, name):
+        self.check()
+        return FakeNamespace(self.store)
+
+    def CreateItem(self, item_type):
+        self.check()
+        return FakeItem(self.store, item_type)
+
+
+class FakeBackend:
+    """outlook_manager 的 COM 后端替身：dispatch 返回连接同一份 FakeStore 的 Application"""
+
+    def __init__(self, store=None):
+        self.store = store or FakeStore()
+        self.dispatches = 0
+        self.running = True  # "Outlook" 进程是否在运行；dispatch 会启动它，attach 不会
+
+    def initialize(self):
+        pass
+
+    def uninitialize(self):
+        pass
+
+    def pump(self):
+        pass
+
+    def dispatch(self):
+        self.dispatches += 1
+        self.running = True
+        return FakeApplication(self.store)
+
+    def attach(self):
+        """GetActiveObject 的替身：Outlook 未运行时返回 None"""
+        return FakeApplication(self.store) if self.running else None
+
+    def watch(self, items, callback):
+        """订阅文件夹 Items 的增删改事件；与真实 COM 不同，回调在修改条目的线程中同步触发"""
+        items.check()
+        self.store.listeners.setdefault(items.folder_id, []).append(callback)
+        return callback
+
+    def disconnect(self):
+        """模拟 Outlook 被关闭后重新打开：已有句柄全部失效、事件订阅丢失，数据保留"""
+        self.store.generation += 1
+        self.store.listeners.clear()
+
+    def add(self, item_type, **props):
+        """直接向"Outlook"中添加条目（相当于用户在 Outlook 界面里操作）"""
+        item = FakeItem(self.store, item_type, **props)
+        item.Save()
+        return item
+
+    def add_recurring(self, interval, count, **props):
+        """添加周期约会：Start/End 为第一次实例，此后每隔 interval（timedelta）重复，共 count 次
+
+        Folder.Items 与 GetTable 中只出现主约会；设置 IncludeRecurrences 的集合才展开各次实例。
+        """
+        item = FakeItem(self.store, OL_APPOINTMENT_ITEM, IsRecurring=True, RecurrenceState=OL_APPT_MASTER, **props)
+        item.__dict__.update(pattern=(interval, count), deleted=set())
+        item.Save()
+        return item
@@ -3,13 +3,21 @@
 # 主要功能：通过 Outlook COM 接口提供日历、邮件、联系人等 MCP 工具
 
 # 以下代码除名称替换外保持一致
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+import asyncio
+import base64
+import concurrent.futures
+import difflib
+import queue
 import sys
 import logging
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 import os
 import json
 import re
+import sqlite3
 from typing import Optional, List
 
 # --- Outlook 依赖 ---
@@ -55,45 +63,244 @@ async def list_reminders(*args, **kwargs):
 OL_FOLDER_CALENDAR = 9  # olFolderCalendar
 OL_FOLDER_CONTACTS = 10  # olFolderContacts
 
-# --- Outlook 实用函数 ---
+OL_MAIL_ITEM = 0  # olMailItem
+OL_APPOINTMENT_ITEM = 1  # olAppointmentItem
+OL_CONTACT_ITEM = 2  # olContactItem
+
+# --- Outlook 工作线程 ---
+# 所有 COM 调用都在同一个 STA 线程中执行：它只初始化一次 COM、只创建一次 Outlook.Application，
+# 并缓存 MAPI 命名空间与默认文件夹；异步工具把任务提交给它后 await 结果，不再阻塞事件循环。
+# OUTLOOK_BACKEND=fake 时使用 outlook_fake.py 中的内存替身，便于在 Linux 上运行与验证。
+
+OUTLOOK_BACKEND = os.environ.get("OUTLOOK_BACKEND", "com")
+OUTLOOK_PUMP_INTERVAL = 0.1  # 秒，空闲时处理 COM 消息（事件回调）的间隔
+OUTLOOK_RECONNECT_ATTEMPTS = 1  # 连接失效时重连并重试任务的次数
+
+# Outlook 被关闭/重启或 RPC 服务不可用时 COM 返回的错误码，遇到这些错误即重连
+OUTLOOK_DISCONNECTED_HRESULTS = {
+    -2147417848,  # RPC_E_DISCONNECTED
+    -2147417851,  # RPC_E_SERVERFAULT
+    -2147023174,  # RPC_S_SERVER_UNAVAILABLE
+    -2147023170,  # RPC_S_CALL_FAILED
+    -2147220995,  # CO_E_OBJNOTCONNECTED
+}
+
+
+class ComBackend:
+    """真实的 pywin32 COM 后端"""
+
+    def initialize(self):
+        if win32com is None:
+            raise RuntimeError("pywin32 未安装或当前系统不支持 Outlook")
+        pythoncom.CoInitialize()
+
+    def uninitialize(self):
+        if win32com is not None:
+            pythoncom.CoUninitialize()
+
+    def pump(self):
+        if win32com is not None:
+            pythoncom.PumpWaitingMessages()
+
+    def dispatch(self):
+        """尝试创建 Outlook.Application COM 对象，兼容不同版本注册名"""
+        progids = [
+            "Outlook.Application",
+            "Outlook.Application.16",
+            "Outlook.Application.15",
+            "Outlook.Application.14",
+        ]
+        last_err = None
+        for progid in progids:
+            try:
+                return win32com.client.Dispatch(progid)
+            except com_error as e:
+                last_err = e
+                continue
+
+        raise RuntimeError(f"无法启动 Outlook，可能未安装或 COM 注册损坏: {last_err}")
+
+    def attach(self):
+        """返回正在运行的 Outlook.Application，Outlook 未运行时返回 None（不会启动它）"""
+        try:
+            return win32com.client.GetActiveObject("Outlook.Application")
+        except com_error:
+            return None
 
-def _dispatch_outlook_application():
-    """尝试创建 Outlook.Application COM 对象，兼容不同版本注册名"""
-    if win32com is None:
-        raise RuntimeError("pywin32 未安装或当前系统不支持 Outlook")
+    def watch(self, items, callback):
+        """订阅 Items 集合的 ItemAdd/ItemChange/ItemRemove 事件（在工作线程 pump 消息时回调）
 
-    # 确保线程已初始化 COM
-    pythoncom.CoInitialize()
+        返回值需保持引用，否则事件订阅随之失效。
+        """
+        class ItemsEvents:
+            def OnItemAdd(self, item):
+                callback()
 
-    progids = [
-        "Outlook.Application",
-        "Outlook.Application.16",
-        "Outlook.Application.15",
-        "Outlook.Application.14",
-    ]
-    last_err = None
-    for progid in progids:
-        try:
-            outlook = win32com.client.Dispatch(progid)
-            return outlook
-        except com_error as e:
-            last_err = e
-            continue
+            def OnItemChange(self, item):
+                callback()
+
+            def OnItemRemove(self):
+                callback()
+
+        return items, win32com.client.WithEvents(items, ItemsEvents)
+
+
+def _create_backend(name: str):
+    if name == "fake":
+        from outlook_fake import FakeBackend
+        return FakeBackend()
+    return ComBackend()
+
+
+def _is_disconnected(error: Exception) -> bool:
+    return getattr(error, "hresult", None) in OUTLOOK_DISCONNECTED_HRESULTS
+
+
+class OutlookSession:
+    """工作线程持有的长连接：Application、MAPI 命名空间和默认文件夹句柄只获取一次
+
+    COM 在第一次连接时初始化；初始化失败则让当次调用报错，下次再试。
+    """
 
-    raise RuntimeError(f"无法启动 Outlook，可能未安装或 COM 注册损坏: {last_err}")
+    def __init__(self, backend):
+        self.backend = backend
+        self.initialized = False
+        self.application = None
+        self.namespace = None
+        self.folders = {}
+
+    def initialize(self):
+        if not self.initialized:
+            self.backend.initialize()
+            self.initialized = True
+
+    def connect(self):
+        """连接 Outlook，未运行时启动它"""
+        self.initialize()
+        self.use(self.backend.dispatch())
+
+    def attach(self) -> bool:
+        """只连接已在运行的 Outlook；未运行时返回 False，不会启动它"""
+        self.initialize()
+        application = self.backend.attach()
+        if application is None:
+            return False
+        self.use(application)
+        return True
+
+    def use(self, application):
+        self.application = application
+        self.namespace = application.GetNamespace("MAPI")
+        self.folders = {}
+
+    def reset(self):
+        self.application = None
+        self.namespace = None
+        self.folders = {}
+
+    def close(self):
+        self.reset()
+        if self.initialized:
+            self.backend.uninitialize()
+            self.initialized = False
+
+    def folder(self, folder_id: int):
+        if folder_id not in self.folders:
+            self.folders[folder_id] = self.namespace.GetDefaultFolder(folder_id)
+        return self.folders[folder_id]
+
+    def create_item(self, item_type: int):
+        return self.application.CreateItem(item_type)
+
+
+class OutlookWorker:
+    """专用 STA 线程：按提交顺序执行任务，COM 对象不离开该线程
+
+    任务是 job(session, *args) 形式的普通函数，只应返回纯 Python 数据。
+    连接失效（Outlook 被关闭或重启）时丢弃旧句柄、重新连接并重试一次。
+    空闲任务不会为自己启动 Outlook：只使用已有连接，或连接已在运行的 Outlook。
+    """
 
+    def __init__(self, backend):
+        self.backend = backend
+        self.jobs = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.reconnects = 0
+        self.idle_tasks = []  # 空闲时执行的后台任务：需提供 due() 与 sync(session)
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.loop, name="outlook-com", daemon=True)
+                self.thread.start()
+
+    def submit(self, job, *args) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        self.start()
+        self.jobs.put((job, args, future))
+        return future
+
+    async def run(self, job, *args):
+        """在工作线程中执行 job 并等待结果（异常原样抛出）"""
+        return await asyncio.wrap_future(self.submit(job, *args))
+
+    def stop(self, timeout: float = 5):
+        if self.thread is not None:
+            self.jobs.put(None)
+            self.thread.join(timeout)
+
+    def loop(self):
+        session = OutlookSession(self.backend)
+        try:
+            while True:
+                try:
+                    item = self.jobs.get(timeout=OUTLOOK_PUMP_INTERVAL)
+                except queue.Empty:
+                    if session.initialized:
+                        self.backend.pump()
+                    self.run_idle(session)
+                    continue
+                if item is None:
+                    break
+                job, args, future = item
+                if not future.set_running_or_notify_cancel():
+                    continue  # 调用方已取消
+                try:
+                    result = self.execute(session, job, args)
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            session.close()
+
+    def run_idle(self, session: OutlookSession):
+        """执行到期的空闲任务；任务自行决定未连接时是否 attach，这里不会 connect（启动 Outlook）"""
+        for task in self.idle_tasks:
+            if task.due():
+                try:
+                    task.sync(session)
+                except Exception as e:
+                    if _is_disconnected(e):
+                        session.reset()  # 下一个任务或空闲同步时重新连接
+                    logger.warning(f"Outlook 后台任务失败: {e}")
 
-def _get_outlook_calendar_folder():
-    """返回 Outlook 默认日历文件夹；若不可用抛出异常"""
-    outlook = _dispatch_outlook_application()
-    namespace = outlook.GetNamespace("MAPI")
-    return outlook, namespace.GetDefaultFolder(OL_FOLDER_CALENDAR)
+    def execute(self, session: OutlookSession, job, args):
+        for attempt in range(OUTLOOK_RECONNECT_ATTEMPTS + 1):
+            try:
+                if session.application is None:
+                    session.connect()
+                return job(session, *args)
+            except Exception as e:
+                if attempt == OUTLOOK_RECONNECT_ATTEMPTS or not _is_disconnected(e):
+                    raise
+                logger.warning(f"Outlook 连接已失效，重新连接: {e}")
+                session.reset()
+                self.reconnects += 1
 
 
-def _get_outlook_contacts_folder():
-    outlook = _dispatch_outlook_application()
-    namespace = outlook.GetNamespace("MAPI")
-    return outlook, namespace.GetDefaultFolder(OL_FOLDER_CONTACTS)
+outlook = OutlookWorker(_create_backend(OUTLOOK_BACKEND))
 
 
 @mcp.tool()
@@ -174,21 +381,25 @@ async def add_outlook_event(title: str, start_time: str, end_time: str | None =
 
         end_dt = datetime.strptime(end_time, "%Y-%m-%d %H:%M") if end_time else start_dt + timedelta(minutes=30)
 
-        outlook, _ = _get_outlook_calendar_folder()
-        appt = outlook.CreateItem(1)  # 1 = olAppointmentItem
-        appt.Subject = title
-        appt.Body = description
-        appt.Start = start_dt
-        appt.End = end_dt
+        def _save(session):
+            appt = session.create_item(OL_APPOINTMENT_ITEM)
+            appt.Subject = title
+            appt.Body = description
+            appt.Start = start_dt
+            appt.End = end_dt
 
-        # ---- 重要性 ----
-        importance_map = {"low": 0, "normal": 1, "high": 2, "低": 0, "普通": 1, "高": 2}
-        appt.Importance = importance_map.get(importance.lower(), 1)
+            # ---- 重要性 ----
+            importance_map = {"low": 0, "normal": 1, "high": 2, "低": 0, "普通": 1, "高": 2}
+            appt.Importance = importance_map.get(importance.lower(), 1)
 
-        appt.ReminderSet = True
-        appt.ReminderMinutesBeforeStart = reminder_minutes
+            appt.ReminderSet = True
+            appt.ReminderMinutesBeforeStart = reminder_minutes
 
-        appt.Save()
+            appt.Save()
+            if calendar_mirror:
+                calendar_mirror.apply(appt)
+
+        await outlook.run(_save)
 
         return {"success": True, "message": f"已添加 Outlook 日历事件: {title}"}
     except Exception as e:
@@ -202,22 +413,27 @@ async def delete_outlook_event(title: str, start_time: str):
     try:
         target_dt = datetime.strptime(start_time, "%Y-%m-%d %H:%M")
 
-        _, calendar_folder = _get_outlook_calendar_folder()
-
-        # Outlook 需要先排序后 Restrict 才能保证日期过滤正常
-        items = calendar_folder.Items
-        items.Sort("[Start]")
-        items.IncludeRecurrences = True
-
         # Outlook Restrict 日期格式为 MM/DD/YYYY HH:MM AM/PM
         dt_str = target_dt.strftime("%m/%d/%Y %I:%M %p")
         restriction = f"[Subject] = '{title}' AND [Start] = '{dt_str}'"
-        matches = items.Restrict(restriction)
 
-        delete_count = 0
-        for item in list(matches):
-            item.Delete()
-            delete_count += 1
+        def _delete(session):
+            # Outlook 需要先排序后 Restrict 才能保证日期过滤正常
+            items = session.folder(OL_FOLDER_CALENDAR).Items
+            items.Sort("[Start]")
+            items.IncludeRecurrences = True
+            matches = items.Restrict(restriction)
+
+            deleted = 0
+            for item in list(matches):
+                forget = calendar_mirror.remove_item(item) if calendar_mirror else None
+                item.Delete()
+                if forget:
+                    forget()
+                deleted += 1
+            return deleted
+
+        delete_count = await outlook.run(_delete)
 
         if delete_count:
             return {"success": True, "message": f"已删除 {delete_count} 条事件"}
@@ -228,9 +444,368 @@ async def delete_outlook_event(title: str, start_time: str):
         return {"success": False, "message": f"删除 Outlook 事件失败: {str(e)}"}
 
 
+# --- 日历事件批量读取 ---
+# 非周期事件通过 Folder.GetTable 读取：只取所需列，GetArray 一次调用返回一批行，
+# 不再逐条、逐属性跨进程读取。Table 不展开周期性约会，所以周期事件的实例仍用
+# Items.Restrict + IncludeRecurrences 读取（通常只占少数）。结果按开始时间分页，
+# cursor 记录上一页最后一条的 (开始时间, EntryID)，下一页从该时间点起查询。
+
+EVENT_COLUMNS = {
+    "subject": "Subject",
+    "start": "Start",
+    "end": "End",
+    "location": "Location",
+    "organizer": "Organizer",
+    "categories": "Categories",
+    "busy_status": "BusyStatus",
+    "all_day": "AllDayEvent",
+    "is_recurring": "IsRecurring",
+    "entry_id": "EntryID",
+}
+DEFAULT_EVENT_FIELDS = ["subject", "start", "end", "location"]
+EVENT_PAGE_SIZE = 50  # 每页默认事件数
+EVENT_PAGE_MAX = 500
+EVENT_BODY_MAX = 2000  # body_chars 上限
+TABLE_BATCH = 100  # 每次 GetArray 取回的行数
+EVENT_TIME_FORMAT = "%Y-%m-%d %H:%M"
+EVENT_KEY_FORMAT = "%Y-%m-%d %H:%M:%S"
+JET_TIME_FORMAT = "%m/%d/%Y %I:%M %p"  # Outlook Restrict 日期格式
+
+
+def _event_key(row: dict) -> tuple:
+    """分页排序键；用格式化后的字符串比较，避免 pywintypes 时间带时区与 naive datetime 无法比较"""
+    return (row["Start"].strftime(EVENT_KEY_FORMAT), row["EntryID"])
+
+
+def _encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        start, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        datetime.strptime(start, EVENT_KEY_FORMAT)
+        return start, entry_id
+    except Exception:
+        raise ValueError("cursor 无效，请使用上一次返回的 next_cursor") from None
+
+
+def _read_table(folder, restriction: str, columns: list, batch: int = TABLE_BATCH):
+    """用 Table 按列批量读取 folder 中符合 restriction 的全部行，逐行产出 {列名: 值}"""
+    table = folder.GetTable(restriction)
+    table.Columns.RemoveAll()
+    for column in columns:
+        table.Columns.Add(column)  # 内置属性名返回本地时间
+    while not table.EndOfTable:
+        for values in table.GetArray(batch):
+            yield dict(zip(columns, values))
+
+
+def _read_event_table(folder, restriction: str, columns: list, after, need: int) -> list:
+    """用 Table 读取非周期事件，按开始时间排序，取 after 之后的至多 need 行"""
+    table = folder.GetTable(f"{restriction} AND [IsRecurring] = False")
+    table.Columns.RemoveAll()
+    for column in columns:
+        table.Columns.Add(column)  # 内置属性名返回本地时间
+    table.Sort("[Start]")
+    rows = []
+    while len(rows) < need and not table.EndOfTable:
+        for values in table.GetArray(TABLE_BATCH):
+            row = dict(zip(columns, values))
+            if after is None or _event_key(row) > after:
+                rows.append(row)
+    return rows
+
+
+def _read_event_occurrences(folder, restriction: str, columns: list, after, need: int, body_chars: int) -> list:
+    """周期事件在时间范围内展开的实例，逐条读取"""
+    items = folder.Items
+    items.Sort("[Start]")
+    items.IncludeRecurrences = True
+    rows = []
+    for item in items.Restrict(f"{restriction} AND [IsRecurring] = True"):
+        row = {column: getattr(item, column) for column in columns}
+        if after is not None and _event_key(row) <= after:
+            continue
+        if body_chars:
+            row["Body"] = item.Body
+        rows.append(row)
+        if len(rows) >= need:
+            break
+    return rows
+
+
+def _event_value(value):
+    if isinstance(value, datetime):
+        return value.strftime(EVENT_TIME_FORMAT)
+    return value
+
+
+# --- 本地日历镜像 ---
+# 在 SQLite 中保存滚动时间窗口（默认前 30 天到后 180 天）内的事件，list_outlook_events 直接从镜像读取，
+# 不经过 COM。镜像由工作线程在空闲时同步：日历文件夹的增删改事件（或每 MIRROR_SYNC_INTERVAL 秒）触发
+# 增量同步——只读取 LastModificationTime 之后改动的条目；非周期事件数量与 Outlook 不一致（有事件被删除）
+# 时重新读取非周期事件；周期事件有改动或系列数量变化时重新展开其实例。窗口随日期滚动时整体重建。
+# 本进程内完成第一次同步之后才从镜像读取；写入类工具在同一任务中同步更新镜像。
+# 同步只使用已有连接或已在运行的 Outlook，不会为同步而启动 Outlook。
+
+if sys.platform == 'win32':
+    OUTLOOK_MIRROR_PATH = os.path.expandvars(r"%LOCALAPPDATA%\mcp-toolbox\outlook_calendar.db")
+else:
+    OUTLOOK_MIRROR_PATH = os.path.expanduser("~/.cache/mcp-toolbox/outlook_calendar.db")
+OUTLOOK_MIRROR_PATH = os.environ.get("OUTLOOK_MIRROR_PATH", OUTLOOK_MIRROR_PATH)  # 设为空字符串可关闭镜像
+MIRROR_DAYS_BEFORE = 30
+MIRROR_DAYS_AFTER = 180
+MIRROR_SYNC_INTERVAL = 60  # 秒，未订阅到事件时的同步间隔；订阅了事件时也按此间隔兜底检查
+MIRROR_RETRY_INTERVAL = 30  # 秒，同步失败（如 Outlook 未运行）后的重试间隔
+MIRROR_CLOCK_SKEW = timedelta(minutes=5)  # 增量同步多读的时间余量，容忍 Outlook/Exchange 时钟偏差
+MIRROR_COLUMNS = list(EVENT_COLUMNS.values())
+OL_APPT_OCCURRENCE = 2  # olApptOccurrence
+OL_APPT_EXCEPTION = 3  # olApptException
+
+MIRROR_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    entry_id TEXT NOT NULL,
+    start TEXT NOT NULL,
+    "end" TEXT NOT NULL,
+    subject TEXT,
+    location TEXT,
+    organizer TEXT,
+    categories TEXT,
+    busy_status INTEGER,
+    all_day INTEGER,
+    is_recurring INTEGER,
+    PRIMARY KEY (entry_id, start)
+);
+CREATE INDEX IF NOT EXISTS events_start ON events (start, entry_id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+MIRROR_FIELDS = list(EVENT_COLUMNS)  # SQLite 列名与 list_outlook_events 的字段名一致
+MIRROR_BOOLEAN_FIELDS = {"all_day", "is_recurring"}
+MIRROR_TIME_FIELDS = {"start", "end"}
+MIRROR_COLUMN_LIST = ", ".join(f'"{field}"' for field in MIRROR_FIELDS)
+MIRROR_INSERT = f"INSERT OR REPLACE INTO events ({MIRROR_COLUMN_LIST}) VALUES ({', '.join('?' * len(MIRROR_FIELDS))})"
+
+
+class CalendarMirror:
+    """日历事件的本地 SQLite 镜像；写入只在 Outlook 工作线程中进行，读取可在任意线程
+
+    每个线程使用自己的 SQLite 连接（WAL 模式），读取不会被同步阻塞。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+        self.ready = False  # 本进程内是否已与 Outlook 同步过
+        self.window_start = None  # 镜像覆盖的时间窗口（EVENT_KEY_FORMAT 字符串）
+        self.window_end = None
+        self.application = None  # 订阅事件时的连接，重连后需重新订阅
+        self.watcher = None
+        self.dirty = True
+        self.checked_at = 0.0  # 上次尝试同步的时间（monotonic）
+        self.failed = False
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(MIRROR_SCHEMA)
+            self.local.conn = conn
+        return conn
+
+    def meta(self, conn: sqlite3.Connection) -> dict:
+        return dict(conn.execute("SELECT key, value FROM meta"))
+
+    @staticmethod
+    def window() -> tuple:
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        return today - timedelta(days=MIRROR_DAYS_BEFORE), today + timedelta(days=MIRROR_DAYS_AFTER)
+
+    def covers(self, start: datetime, end: datetime) -> bool:
+        return (self.ready and self.window_start <= start.strftime(EVENT_KEY_FORMAT)
+                and end.strftime(EVENT_KEY_FORMAT) <= self.window_end)
+
+    # ---- 读取 ----
+
+    def query(self, start: datetime, end: datetime, after, limit: int) -> list:
+        """与 Outlook 路径相同的条件与排序，返回以 COM 列名为键的行"""
+        # end <= ? 蕴含 start <= ?：给 start 加上上界，索引扫描只覆盖查询范围
+        sql = f'SELECT {MIRROR_COLUMN_LIST} FROM events WHERE start >= ? AND start <= ? AND "end" <= ?'
+        params = [start.strftime(EVENT_KEY_FORMAT), end.strftime(EVENT_KEY_FORMAT), end.strftime(EVENT_KEY_FORMAT)]
+        if after:
+            sql += " AND (start, entry_id) > (?, ?)"
+            params += list(after)
+        sql += " ORDER BY start, entry_id LIMIT ?"
+        params.append(limit)
+        rows = []
+        for values in self.connection().execute(sql, params):
+            row = {}
+            for field, value in zip(MIRROR_FIELDS, values):
+                if field in MIRROR_TIME_FIELDS:
+                    value = datetime.fromisoformat(value)
+                elif field in MIRROR_BOOLEAN_FIELDS:
+                    value = bool(value)
+                row[EVENT_COLUMNS[field]] = value
+            rows.append(row)
+        return rows
+
+    # ---- 写入（工作线程） ----
+
+    def record(self, row: dict) -> tuple:
+        values = []
+        for field in MIRROR_FIELDS:
+            value = row[EVENT_COLUMNS[field]]
+            if field in MIRROR_TIME_FIELDS:
+                value = value.strftime(EVENT_KEY_FORMAT)
+            elif field in MIRROR_BOOLEAN_FIELDS:
+                value = int(bool(value))
+            values.append(value)
+        return tuple(values)
+
+    def in_window(self, record: tuple, window: tuple = None) -> bool:
+        window_start, window_end = window or (self.window_start, self.window_end)
+        start, end = record[MIRROR_FIELDS.index("start")], record[MIRROR_FIELDS.index("end")]
+        return window_start is not None and start >= window_start and end <= window_end
+
+    def apply(self, item):
+        """写入类工具保存事件后调用：按条目当前属性更新镜像"""
+        record = self.record({column: getattr(item, column) for column in MIRROR_COLUMNS})
+        with self.connection() as conn:
+            conn.execute("DELETE FROM events WHERE entry_id = ?", (record[MIRROR_FIELDS.index("entry_id")],))
+            if self.in_window(record):
+                conn.execute(MIRROR_INSERT, record)
+
+    def remove(self, entry_id: str, start: str = None):
+        """删除事件后调用；start 不为空时只删除周期事件的该次实例"""
+        with self.connection() as conn:
+            if start is None:
+                conn.execute("DELETE FROM events WHERE entry_id = ?", (entry_id,))
+            else:
+                conn.execute("DELETE FROM events WHERE entry_id = ? AND start = ?", (entry_id, start))
+
+    def remove_item(self, item):
+        """取得即将删除的条目对应的镜像键，删除成功后调用返回的函数"""
+        entry_id = item.EntryID
+        start = item.Start.strftime(EVENT_KEY_FORMAT) if item.RecurrenceState in (OL_APPT_OCCURRENCE, OL_APPT_EXCEPTION) else None
+        return lambda: self.remove(entry_id, start)
+
+    # ---- 同步（工作线程空闲任务） ----
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def due(self) -> bool:
+        elapsed = time.monotonic() - self.checked_at
+        if self.failed:
+            return elapsed > MIRROR_RETRY_INTERVAL
+        return self.dirty or self.watcher is None or elapsed > MIRROR_SYNC_INTERVAL
+
+    def sync(self, session: OutlookSession):
+        self.checked_at = time.monotonic()
+        self.failed = True  # 同步成功后清除
+        if session.application is None and not session.attach():
+            return  # Outlook 未运行：不为同步而启动它，MIRROR_RETRY_INTERVAL 后再看
+        folder = session.folder(OL_FOLDER_CALENDAR)
+        if self.application is not session.application:
+            self.application = session.application
+            try:
+                self.watcher = session.backend.watch(folder.Items, self.mark_dirty)
+            except Exception as e:
+                if _is_disconnected(e):
+                    raise
+                logger.warning(f"无法订阅日历变更事件，改为每 {MIRROR_SYNC_INTERVAL} 秒同步: {e}")
+                self.watcher = None
+        self.dirty = False  # 同步期间到达的事件会再次置位
+
+        started = datetime.now()
+        window_start, window_end = self.window()
+        window = (window_start.strftime(EVENT_KEY_FORMAT), window_end.strftime(EVENT_KEY_FORMAT))
+        conn = self.connection()
+        meta = self.meta(conn)
+        restriction = (f"[Start] >= '{window_start.strftime(JET_TIME_FORMAT)}' AND "
+                       f"[End] <= '{window_end.strftime(JET_TIME_FORMAT)}'")
+        masters = folder.Items.Restrict("[IsRecurring] = True").Count
+
+        if meta.get("window_start") != window[0] or "modified_since" not in meta:
+            if self.window_start is not None:
+                # 重建期间只承诺新旧窗口的交集：提交前读到旧数据、提交后读到新数据都覆盖它
+                self.window_start = max(self.window_start, window[0])
+            with conn:
+                conn.execute("DELETE FROM events")
+                self.load(conn, folder, restriction, recurring=False)
+                self.load(conn, folder, restriction, recurring=True)
+            logger.info(f"日历镜像已重建: {conn.execute('SELECT COUNT(*) FROM events').fetchone()[0]} 条事件")
+        else:
+            self.update(conn, folder, restriction, meta, masters, window)
+
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+                ("window_start", window[0]),
+                ("window_end", window[1]),
+                ("modified_since", (started - MIRROR_CLOCK_SKEW).strftime(JET_TIME_FORMAT)),
+                ("recurring_masters", str(masters)),
+            ])
+        # 数据提交后才公布新窗口，读取方不会在重建中途按新窗口读到空结果
+        self.window_start, self.window_end = window
+        self.failed = False
+        self.ready = True
+
+    def load(self, conn: sqlite3.Connection, folder, restriction: str, recurring: bool):
+        """重新读取窗口内的全部非周期事件或全部周期事件实例"""
+        conn.execute("DELETE FROM events WHERE is_recurring = ?", (int(recurring),))
+        if recurring:
+            rows = _read_event_occurrences(folder, restriction, MIRROR_COLUMNS, None, sys.maxsize, 0)
+        else:
+            rows = _read_table(folder, f"{restriction} AND [IsRecurring] = False", MIRROR_COLUMNS)
+        conn.executemany(MIRROR_INSERT, (self.record(row) for row in rows))
+
+    def update(self, conn: sqlite3.Connection, folder, restriction: str, meta: dict, masters: int, window: tuple):
+        """增量同步：应用上次同步以来改动的条目，再用数量核对发现被删除的事件"""
+        reload_recurring = str(masters) != meta.get("recurring_masters")
+        changed = 0
+        with conn:
+            for row in _read_table(folder, f"[LastModificationTime] >= '{meta['modified_since']}'", MIRROR_COLUMNS):
+                changed += 1
+                if row["IsRecurring"]:
+                    reload_recurring = True
+                    continue
+                record = self.record(row)
+                conn.execute("DELETE FROM events WHERE entry_id = ?", (row["EntryID"],))
+                if self.in_window(record, window):
+                    conn.execute(MIRROR_INSERT, record)
+            if reload_recurring:
+                self.load(conn, folder, restriction, recurring=True)
+            outlook_count = folder.Items.Restrict(f"{restriction} AND [IsRecurring] = False").Count
+            mirror_count = conn.execute("SELECT COUNT(*) FROM events WHERE is_recurring = 0").fetchone()[0]
+            if outlook_count != mirror_count:
+                self.load(conn, folder, restriction, recurring=False)
+        if changed or reload_recurring or outlook_count != mirror_count:
+            logger.info(f"日历镜像增量同步: {changed} 条改动"
+                        + ("，重新展开周期事件" if reload_recurring else "")
+                        + ("，重新读取非周期事件" if outlook_count != mirror_count else ""))
+
+
+calendar_mirror = CalendarMirror(OUTLOOK_MIRROR_PATH) if OUTLOOK_MIRROR_PATH else None
+if calendar_mirror:
+    outlook.idle_tasks.append(calendar_mirror)
+
+
 @mcp.tool()
-async def list_outlook_events(start_date: str = "", end_date: str = ""):
-    """列出指定日期范围内的 Outlook 日历事件。若参数为空，则默认列出未来 7 天。"""
+async def list_outlook_events(start_date: str = "", end_date: str = "", fields: Optional[List[str]] = None,
+                              body_chars: int = 0, limit: int = EVENT_PAGE_SIZE, cursor: str = ""):
+    """列出指定日期范围内的 Outlook 日历事件。若参数为空，则默认列出未来 7 天。
+
+    参数
+    -----
+    start_date/end_date: YYYY-MM-DD
+    fields:     返回的字段，默认 subject/start/end/location；
+                可选 subject/start/end/location/organizer/categories/busy_status/all_day/is_recurring/entry_id
+    body_chars: 附带正文的前多少个字符，默认 0 不返回正文
+    limit:      每页最多事件数（默认 50）
+    cursor:     上一页返回的 next_cursor，用于继续读取下一页
+    """
     try:
         if not start_date:
             start_dt = datetime.now()
@@ -242,28 +817,56 @@ async def list_outlook_events(start_date: str = "", end_date: str = ""):
         else:
             end_dt = datetime.strptime(end_date, "%Y-%m-%d")
 
-        _, calendar_folder = _get_outlook_calendar_folder()
+        fields = fields or DEFAULT_EVENT_FIELDS
+        unknown = [field for field in fields if field not in EVENT_COLUMNS]
+        if unknown:
+            raise ValueError(f"未知字段: {unknown}，可选: {list(EVENT_COLUMNS)}")
+        body_chars = max(0, min(body_chars, EVENT_BODY_MAX))
+        limit = max(1, min(limit, EVENT_PAGE_MAX))
 
-        items = calendar_folder.Items
-        items.Sort("[Start]")
-        items.IncludeRecurrences = True
+        after = _decode_cursor(cursor) if cursor else None
+        if after:
+            # 从上一页最后一条的开始时间（取整到分钟）起查询，同一分钟内已返回的在读取时跳过
+            start_dt = max(start_dt, datetime.strptime(after[0], EVENT_KEY_FORMAT).replace(second=0))
 
         restriction = (
-            f"[Start] >= '{start_dt.strftime('%m/%d/%Y %I:%M %p')}' AND "
-            f"[End] <= '{(end_dt + timedelta(days=1)).strftime('%m/%d/%Y %I:%M %p')}'"
+            f"[Start] >= '{start_dt.strftime(JET_TIME_FORMAT)}' AND "
+            f"[End] <= '{(end_dt + timedelta(days=1)).strftime(JET_TIME_FORMAT)}'"
         )
-        restricted = items.Restrict(restriction)
+        columns = list(dict.fromkeys(["EntryID", "Start"] + [EVENT_COLUMNS[field] for field in fields]))
+
+        def _list(session):
+            folder = session.folder(OL_FOLDER_CALENDAR)
+            rows = _read_event_table(folder, restriction, columns, after, limit + 1)
+            rows += _read_event_occurrences(folder, restriction, columns, after, limit + 1, body_chars)
+            rows.sort(key=_event_key)
+            page = rows[:limit]
+            for row in page:
+                if body_chars and "Body" not in row:
+                    row["Body"] = session.namespace.GetItemFromID(row["EntryID"]).Body
+            next_cursor = _encode_cursor(_event_key(page[-1])) if len(rows) > limit else None
+            return page, next_cursor
+
+        # 镜像不含正文；范围在镜像窗口内时直接读取本地镜像（与 Jet 条件一样精确到分钟）
+        query_start, query_end = start_dt.replace(second=0, microsecond=0), end_dt + timedelta(days=1)
+        if calendar_mirror and not body_chars and calendar_mirror.covers(query_start, query_end):
+            rows = calendar_mirror.query(query_start, query_end, after, limit + 1)
+            page = rows[:limit]
+            next_cursor = _encode_cursor(_event_key(page[-1])) if len(rows) > limit else None
+            source = "mirror"
+        else:
+            page, next_cursor = await outlook.run(_list)
+            source = "outlook"
 
         events = []
-        for itm in restricted:
-            events.append({
-                "subject": itm.Subject,
-                "start": itm.Start.Format("yyyy-MM-dd HH:mm"),
-                "end": itm.End.Format("yyyy-MM-dd HH:mm"),
-                "body": itm.Body
-            })
-
-        return {"success": True, "message": events}
+        for row in page:
+            event = {field: _event_value(row[EVENT_COLUMNS[field]]) for field in fields}
+            if body_chars:
+                body = row["Body"] or ""
+                event["body"] = body[:body_chars] + ("…" if len(body) > body_chars else "")
+            events.append(event)
+
+        return {"success": True, "message": events, "count": len(events), "next_cursor": next_cursor, "source": source}
     except Exception as e:
         logger.exception("获取 Outlook 事件失败")
         return {"success": False, "message": f"获取 Outlook 事件失败: {str(e)}"}
@@ -296,43 +899,49 @@ async def send_outlook_mail(to: str, subject: str, body: str, cc: str = "", impo
     attachments: 附件文件路径列表
     """
     try:
-        outlook = _dispatch_outlook_application()
-        mail = outlook.CreateItem(0)  # olMailItem
-
-        # ---- 收件人解析 ----
-        def _add_recipients(addr_str:str, field:str):
-            addr_str = addr_str.strip()
-            if not addr_str:
-                return
-            for addr in addr_str.split(";"):
-                addr = addr.strip()
-                if addr:
-                    mail.Recipients.Add(addr)
-
-        _add_recipients(to, "To")
-        if cc:
-            _add_recipients(cc, "CC")
-
-        # ---- 添加统一签名 ----
-        signature = "\n\n--\n该邮件发送自MCP服务，如有疑问请回信联系。"
-        mail.Body = body + signature
-
-        importance_map = {"low": 0, "normal": 1, "high": 2, "低": 0, "普通": 1, "高": 2}
-        mail.Importance = importance_map.get(importance.lower(), 1)
-
-        if attachments:
-            for path in attachments:
-                if os.path.isfile(path):
-                    mail.Attachments.Add(os.path.abspath(path))
-                else:
-                    logger.warning(f"附件不存在: {path}")
-
-        # 尝试解析收件人名称
-        if not mail.Recipients.ResolveAll():
-            unresolved = [r.Name for r in mail.Recipients if not r.Resolved]
+        def _send(session):
+            mail = session.create_item(OL_MAIL_ITEM)
+
+            # ---- 收件人解析 ----
+            def _add_recipients(addr_str:str, field:str):
+                addr_str = addr_str.strip()
+                if not addr_str:
+                    return
+                for addr in addr_str.split(";"):
+                    addr = addr.strip()
+                    if addr:
+                        mail.Recipients.Add(addr)
+
+            _add_recipients(to, "To")
+            if cc:
+                _add_recipients(cc, "CC")
+
+            mail.Subject = subject
+
+            # ---- 添加统一签名 ----
+            signature = "\n\n--\n该邮件发送自MCP服务，如有疑问请回信联系。"
+            mail.Body = body + signature
+
+            importance_map = {"low": 0, "normal": 1, "high": 2, "低": 0, "普通": 1, "高": 2}
+            mail.Importance = importance_map.get(importance.lower(), 1)
+
+            if attachments:
+                for path in attachments:
+                    if os.path.isfile(path):
+                        mail.Attachments.Add(os.path.abspath(path))
+                    else:
+                        logger.warning(f"附件不存在: {path}")
+
+            # 尝试解析收件人名称
+            if not mail.Recipients.ResolveAll():
+                return [r.Name for r in mail.Recipients if not r.Resolved]
+
+            mail.Send()
+            return []
+
+        unresolved = await outlook.run(_send)
+        if unresolved:
             return {"success": False, "message": f"收件人无法解析: {unresolved}"}
-
-        mail.Send()
         return {"success": True, "message": "邮件已发送"}
     except Exception as e:
         logger.exception("发送邮件失败")
@@ -356,24 +965,28 @@ async def add_outlook_contact(name: str, email: str = "", company: str = "", job
     address:   地址，可省略
     """
     try:
-        outlook = _dispatch_outlook_application()
-        contact = outlook.CreateItem(2)  # 2 = olContactItem
+        def _save(session):
+            contact = session.create_item(OL_CONTACT_ITEM)
+
+            contact.FullName = name
+            if email:
+                contact.Email1Address = email
 
-        contact.FullName = name
-        if email:
-            contact.Email1Address = email
+            if company:
+                contact.CompanyName = company
+            if job_title:
+                contact.JobTitle = job_title
+            if phone:
+                contact.BusinessTelephoneNumber = phone
+            if address:
+                contact.BusinessAddress = address
+                contact.MailingAddress = address
 
-        if company:
-            contact.CompanyName = company
-        if job_title:
-            contact.JobTitle = job_title
-        if phone:
-            contact.BusinessTelephoneNumber = phone
-        if address:
-            contact.BusinessAddress = address
-            contact.MailingAddress = address
+            contact.Save()
+            if contact_index.built:
+                contact_index.upsert(_contact_row(contact))
 
-        contact.Save()
+        await outlook.run(_save)
 
         return {"success": True, "message": f"已创建联系人: {name}"}
     except Exception as e:
@@ -384,6 +997,173 @@ async def add_outlook_contact(name: str, email: str = "", company: str = "", job
 # 删除 / 更新联系人功能
 # ---------------------------------------------------------------------
 
+CONTACT_COLUMNS = ["EntryID", "FullName", "Email1Address", "Email2Address", "Email3Address",
+                   "NickName", "FileAs", "LastModificationTime"]
+CONTACT_BATCH = 1000  # 建立索引时每次 GetArray 取回的行数
+CONTACT_CHECK_INTERVAL = 300  # 秒，订阅了事件时也定期做一次变更检查，防止漏掉事件
+CONTACT_SUGGESTIONS = 5
+CONTACT_SUGGEST_CUTOFF = 0.5  # "您是不是要找"的相似度阈值
+
+
+def _normalize_contact(text: str) -> str:
+    """候选建议用的别名键：忽略大小写和空白"""
+    return "".join((text or "").split()).casefold()
+
+
+def _contact_key(text: str) -> str:
+    """删除/修改时的匹配键：姓名或 Email1Address 完全一致，只忽略大小写"""
+    return (text or "").lower()
+
+
+def _contact_row(item) -> dict:
+    return {column: getattr(item, column) for column in CONTACT_COLUMNS}
+
+
+class ContactIndex:
+    """联系人索引，只在 Outlook 工作线程中使用
+
+    lookup 只按姓名或 Email1Address 完全匹配（忽略大小写），删除/修改不会误中别名；
+    规范化的姓名、邮箱和别名（昵称、FileAs、第二/第三邮箱）只用于 suggest 给出候选。
+    首次使用时通过 Table 批量建立；之后订阅联系人文件夹的增删改事件，
+    只有收到事件（或超过 CONTACT_CHECK_INTERVAL）时才做变更检查：
+    读取 LastModificationTime 之后改动的行，条目数仍与索引不符（有联系人被删除）时整体重建。
+    无法订阅事件时每次查找前都做变更检查，代价也只是几次 COM 调用。
+    """
+
+    def __init__(self):
+        self.entries = {}  # EntryID -> {"name", "email", "exact", "keys"}
+        self.exact = {}  # 姓名/Email1Address 匹配键 -> EntryID 集合
+        self.keys = {}  # 规范化别名键 -> EntryID 集合
+        self.built = False
+        self.synced_at = None  # 已同步到的最新 LastModificationTime（EVENT_KEY_FORMAT 字符串）
+        self.application = None  # 订阅事件时的连接，重连后需重新订阅
+        self.watcher = None
+        self.dirty = True
+        self.checked_at = 0.0
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def ensure_fresh(self, session: OutlookSession):
+        folder = session.folder(OL_FOLDER_CONTACTS)
+        if self.application is not session.application:
+            # 首次使用或重连后重新订阅；断线期间的改动由变更检查补上
+            self.application = session.application
+            self.dirty = True
+            try:
+                self.watcher = session.backend.watch(folder.Items, self.mark_dirty)
+            except Exception as e:
+                if _is_disconnected(e):
+                    raise
+                logger.warning(f"无法订阅联系人变更事件，改为每次查找前检查: {e}")
+                self.watcher = None
+        if not self.built:
+            self.rebuild(folder)
+        elif self.dirty or self.watcher is None or time.monotonic() - self.checked_at > CONTACT_CHECK_INTERVAL:
+            self.check(folder)
+
+    def read(self, folder, restriction: str = "") -> list:
+        rows = list(_read_table(folder, restriction, CONTACT_COLUMNS, CONTACT_BATCH))
+        for row in rows:
+            if row["LastModificationTime"] is not None:
+                modified = row["LastModificationTime"].strftime(EVENT_KEY_FORMAT)
+                self.synced_at = max(self.synced_at or modified, modified)
+        return rows
+
+    def rebuild(self, folder):
+        self.dirty = False
+        self.checked_at = time.monotonic()
+        self.entries, self.exact, self.keys, self.synced_at = {}, {}, {}, None
+        for row in self.read(folder):
+            self.upsert(row)
+        self.built = True
+        logger.info(f"联系人索引已建立: {len(self.entries)} 个联系人")
+
+    def check(self, folder):
+        self.dirty = False  # 检查期间到达的事件会再次置位
+        self.checked_at = time.monotonic()
+        if self.synced_at:
+            # Jet 条件只精确到分钟：从该分钟起重新读取，重复的行覆盖即可
+            since = datetime.strptime(self.synced_at, EVENT_KEY_FORMAT).strftime(JET_TIME_FORMAT)
+            for row in self.read(folder, f"[LastModificationTime] >= '{since}'"):
+                self.upsert(row)
+        if folder.Items.Count != len(self.entries):
+            self.rebuild(folder)
+
+    def upsert(self, row: dict):
+        self.remove(row["EntryID"])
+        values = [row[column] for column in ("FullName", "Email1Address", "Email2Address", "Email3Address", "NickName", "FileAs")]
+        keys = {_normalize_contact(value) for value in values if value} - {""}
+        exact = {_contact_key(value) for value in values[:2] if value}
+        self.entries[row["EntryID"]] = {
+            "name": row["FullName"] or row["FileAs"] or "",
+            "email": row["Email1Address"] or "",
+            "exact": exact,
+            "keys": keys,
+        }
+        for key in exact:
+            self.exact.setdefault(key, set()).add(row["EntryID"])
+        for key in keys:
+            self.keys.setdefault(key, set()).add(row["EntryID"])
+
+    def remove(self, entry_id: str):
+        entry = self.entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for table, keys in ((self.exact, entry["exact"]), (self.keys, entry["keys"])):
+            for key in keys:
+                ids = table.get(key)
+                if ids is not None:
+                    ids.discard(entry_id)
+                    if not ids:
+                        del table[key]
+
+    def lookup(self, identifier: str) -> list:
+        """按姓名或 Email1Address 精确查找（忽略大小写），返回 EntryID 列表"""
+        return sorted(self.exact.get(_contact_key(identifier), ()))
+
+    def suggest(self, identifier: str) -> list:
+        """未找到时的候选："姓名 <邮箱>"；按别名（含昵称、FileAs 等）包含该关键字的优先，其次按相似度"""
+        key = _normalize_contact(identifier)
+        if not key:
+            return []
+        candidates = [k for k in self.keys if key in k][:CONTACT_SUGGESTIONS]
+        candidates += difflib.get_close_matches(key, self.keys, CONTACT_SUGGESTIONS, CONTACT_SUGGEST_CUTOFF)
+        suggestions = []
+        for candidate in candidates:
+            for entry_id in sorted(self.keys[candidate]):
+                entry = self.entries[entry_id]
+                label = f"{entry['name']} <{entry['email']}>" if entry["email"] else entry["name"]
+                if label not in suggestions:
+                    suggestions.append(label)
+        return suggestions[:CONTACT_SUGGESTIONS]
+
+
+contact_index = ContactIndex()
+
+
+def _contact_items(session: OutlookSession, identifier: str) -> list:
+    """通过索引找到匹配的联系人条目；索引中已失效的 EntryID 直接丢弃"""
+    contact_index.ensure_fresh(session)
+    items = []
+    for entry_id in contact_index.lookup(identifier):
+        try:
+            items.append(session.namespace.GetItemFromID(entry_id))
+        except Exception as e:
+            if _is_disconnected(e):
+                raise
+            contact_index.remove(entry_id)
+            contact_index.mark_dirty()
+    return items
+
+
+def _contact_not_found(suggestions: list) -> dict:
+    message = "未找到匹配联系人"
+    if suggestions:
+        message += f"，您是不是要找: {'、'.join(suggestions)}"
+    return {"success": False, "message": message, "suggestions": suggestions}
+
+
 @mcp.tool()
 async def delete_outlook_contact(identifier: str):
     """按姓名或邮箱删除联系人
@@ -391,21 +1171,21 @@ async def delete_outlook_contact(identifier: str):
     identifier: 联系人姓名或 Email1Address
     """
     try:
-        _, contacts_folder = _get_outlook_contacts_folder()
-        items = contacts_folder.Items
-
-        deleted = 0
-        for it in list(items):  # 转为 list 避免迭代时修改集合
-            if (it.FullName and it.FullName.lower() == identifier.lower()) or (
-                it.Email1Address and it.Email1Address.lower() == identifier.lower()
-            ):
+        def _delete(session):
+            deleted = 0
+            for it in _contact_items(session, identifier):
+                entry_id = it.EntryID
                 it.Delete()
+                contact_index.remove(entry_id)
                 deleted += 1
+            return deleted, ([] if deleted else contact_index.suggest(identifier))
+
+        deleted, suggestions = await outlook.run(_delete)
 
         if deleted:
             return {"success": True, "message": f"已删除 {deleted} 个联系人"}
         else:
-            return {"success": False, "message": "未找到匹配联系人"}
+            return _contact_not_found(suggestions)
     except Exception as e:
         logger.exception("删除联系人失败")
         return {"success": False, "message": f"删除联系人失败: {str(e)}"}
@@ -414,18 +1194,13 @@ async def delete_outlook_contact(identifier: str):
 async def update_outlook_contact(identifier: str, name: str = "", email: str = "", company: str = "", job_title: str = "", phone: str = "", address: str = ""):
     """修改联系人信息
 
-    identifier: 现有联系人姓名或邮箱（用于查找）
+    identifier: 现有联系人姓名或 Email1Address（用于查找，忽略大小写）
     其余参数：若提供则更新相应字段
     """
     try:
-        _, contacts_folder = _get_outlook_contacts_folder()
-        items = contacts_folder.Items
-
-        updated = 0
-        for it in items:
-            if (it.FullName and it.FullName.lower() == identifier.lower()) or (
-                it.Email1Address and it.Email1Address.lower() == identifier.lower()
-            ):
+        def _update(session):
+            updated = 0
+            for it in _contact_items(session, identifier):
                 if name:
                     it.FullName = name
                 if email:
@@ -440,12 +1215,16 @@ async def update_outlook_contact(identifier: str, name: str = "", email: str = "
                     it.BusinessAddress = address
                     it.MailingAddress = address
                 it.Save()
+                contact_index.upsert(_contact_row(it))
                 updated += 1
+            return updated, ([] if updated else contact_index.suggest(identifier))
+
+        updated, suggestions = await outlook.run(_update)
 
         if updated:
             return {"success": True, "message": f"已更新 {updated} 个联系人"}
         else:
-            return {"success": False, "message": "未找到匹配联系人"}
+            return _contact_not_found(suggestions)
     except Exception as e:
         logger.exception("更新联系人失败")
         return {"success": False, "message": f"更新联系人失败: {str(e)}"}
@@ -453,44 +1232,125 @@ async def update_outlook_contact(identifier: str, name: str = "", email: str = "
 # ---------------------------------------------------------------------
 # 批量删除日历事件（改进删除功能）
 # ---------------------------------------------------------------------
+# 时间范围与主题关键字组成 DASL 条件交给 Outlook 的 Restrict 在服务端过滤，只遍历匹配的事件；
+# 删除按批次提交给工作线程，每批之后重新 Restrict，批次之间其它 Outlook 工具可以执行，并上报进度。
+# 只有同时给出开始和结束日期时才展开周期事件（删除范围内的实例），否则只匹配系列本身，避免无限展开。
+
+DELETE_BATCH = 50  # 每批最多删除的事件数
+DELETE_PREVIEW = 10  # dry_run 时返回的示例事件数
+
+
+def _dasl_time(dt: datetime) -> str:
+    """DASL 条件中的时间按 UTC 比较（Jet 条件为本地时间）"""
+    return dt.astimezone(timezone.utc).strftime(JET_TIME_FORMAT)
+
+
+def _event_filter(subject_keyword: str, sd: Optional[datetime], ed: Optional[datetime]) -> str:
+    clauses = []
+    if sd:
+        clauses.append(f'"urn:schemas:calendar:dtstart" >= \'{_dasl_time(sd)}\'')
+    if ed:
+        clauses.append(f'"urn:schemas:calendar:dtstart" < \'{_dasl_time(ed)}\'')
+    if subject_keyword:
+        # LIKE 中 % _ [ 是通配符，需用方括号转义，否则关键字 "_" 会匹配所有事件
+        keyword = re.sub(r"([%_\[])", r"[\1]", subject_keyword).replace("'", "''")
+        clauses.append(f'"urn:schemas:httpmail:subject" LIKE \'%{keyword}%\'')
+    return "@SQL=" + " AND ".join(clauses) if clauses else ""
+
+
+def _matching_events(session: OutlookSession, restriction: str, expand: bool):
+    items = session.folder(OL_FOLDER_CALENDAR).Items
+    if expand:
+        items.Sort("[Start]")
+        items.IncludeRecurrences = True
+    return items.Restrict(restriction) if restriction else items
+
+
+def _count_events(session: OutlookSession, restriction: str, expand: bool):
+    """返回匹配数与前几条预览；展开周期事件时 Count 不可靠，只能逐条计数"""
+    matches = _matching_events(session, restriction, expand)
+    preview = []
+    count = 0
+    for item in matches:
+        if len(preview) < DELETE_PREVIEW:
+            preview.append({"subject": item.Subject, "start": item.Start.strftime(EVENT_TIME_FORMAT)})
+        elif not expand:
+            break
+        count += 1
+    return (count if expand else matches.Count), preview
+
+
+def _delete_event_batch(session: OutlookSession, restriction: str, expand: bool, handled: set):
+    """删除至多 DELETE_BATCH 条匹配事件；删除过或删除失败的键记入 handled，后续批次跳过
+
+    删除后仍留在结果中的条目（如周期事件的主约会）因此不会被反复“删除”。
+    """
+    # 先取出本批条目再逐条删除：COM 集合是活的，边遍历边删除会跳过每条被删事件的下一条
+    batch = []
+    for item in _matching_events(session, restriction, expand):
+        key = (item.EntryID, item.Start.strftime(EVENT_KEY_FORMAT))
+        if key not in handled:
+            batch.append((item, key))
+            if len(batch) >= DELETE_BATCH:
+                break
+    deleted = failed = 0
+    for item, key in batch:
+        handled.add(key)
+        forget = calendar_mirror.remove_item(item) if calendar_mirror else None
+        try:
+            item.Delete()
+            deleted += 1
+            if forget:
+                forget()
+        except Exception as e:
+            if _is_disconnected(e):
+                raise
+            logger.warning(f"删除事件失败，跳过: {e}")
+            failed += 1
+    return deleted, failed
+
 
 @mcp.tool()
-async def delete_outlook_events(subject_keyword: str = "", start_date: str = "", end_date: str = "", delete_all: bool = False):
+async def delete_outlook_events(subject_keyword: str = "", start_date: str = "", end_date: str = "", delete_all: bool = False,
+                                dry_run: bool = False, ctx: Context = None):
     """删除 Outlook 日历事件
 
     参数说明：
     subject_keyword  若提供，则仅删除主题包含该关键字的事件
-    start_date/end_date YYYY-MM-DD，可限定时间范围；空则不限
+    start_date/end_date YYYY-MM-DD，可限定时间范围；空则不限（两者都提供时删除范围内的周期事件实例）
     delete_all        True 时忽略其它过滤条件，直接删除全部事件（危险）
+    dry_run           True 时只统计匹配数量并预览前几条，不删除
     """
     try:
-        _, calendar_folder = _get_outlook_calendar_folder()
-        items = calendar_folder.Items
-        items.IncludeRecurrences = True
-        items.Sort("[Start]")
-
         # 构造过滤日期范围
-        if start_date:
-            sd = datetime.strptime(start_date, "%Y-%m-%d")
-        else:
-            sd = datetime(1900,1,1)
-        if end_date:
-            ed = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
-        else:
-            ed = datetime(9999,12,31)
-
-        count = 0
-
-        for it in list(items):
-            if not delete_all:
-                if not (sd <= it.Start <= ed):
-                    continue
-                if subject_keyword and subject_keyword not in it.Subject:
-                    continue
-            it.Delete()
-            count += 1
+        sd = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
+        ed = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1) if end_date else None
 
-        return {"success": True, "message": f"已删除 {count} 条事件"}
+        if delete_all:
+            restriction, expand = "", False
+        else:
+            restriction, expand = _event_filter(subject_keyword, sd, ed), bool(sd and ed)
+
+        total, preview = await outlook.run(_count_events, restriction, expand)
+        if dry_run:
+            return {"success": True, "message": f"匹配 {total} 条事件（预览，未删除）",
+                    "matched": total, "preview": preview, "dry_run": True}
+
+        deleted = failed = 0
+        handled = set()
+        while True:
+            batch_deleted, batch_failed = await outlook.run(_delete_event_batch, restriction, expand, handled)
+            deleted += batch_deleted
+            failed += batch_failed
+            logger.info(f"批量删除事件进度: {deleted + failed}/{total}")
+            if ctx is not None:
+                await ctx.report_progress(deleted + failed, max(total, deleted + failed), f"已删除 {deleted} 条事件")
+            # 结果取尽或已处理完统计到的数量即停止，删除后仍留在结果中的条目不会让循环无限进行
+            if batch_deleted + batch_failed < DELETE_BATCH or deleted + failed >= total:
+                break
+
+        message = f"已删除 {deleted} 条事件" + (f"，{failed} 条删除失败" if failed else "")
+        return {"success": not failed, "message": message, "matched": total, "deleted": deleted, "failed": failed}
     except Exception as e:
         logger.exception("批量删除事件失败")
         return {"success": False, "message": f"批量删除事件失败: {str(e)}"}
@@ -498,8 +1358,13 @@ async def delete_outlook_events(subject_keyword: str = "", start_date: str = "",
 # 启动服务器
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
+    if calendar_mirror:
+        # 启动工作线程：Outlook 已在运行时空闲同步会立即连接它并同步镜像，未运行时不会启动它
+        outlook.start()
     try:
         mcp.run(transport="stdio")
     except Exception as e:
         logger.error(f"服务启动失败: {e}")
-        sys.exit(1) 
\ No newline at end of file
+        sys.exit(1)
+    finally:
+        outlook.stop()
@@ -1,11 +1,23 @@
-import subprocess
+import argparse
+import asyncio
+import gzip
+import json
 import os
+import queue
+import shutil
 import sys
 import time
 import signal
 import logging
+import tempfile
+import threading
+from collections import deque
 from pathlib import Path
 
+import psutil
+
+import zygote
+
 """start_all_services.py
 一键启动本项目中的所有 MCP 工具脚本。
 
@@ -14,15 +26,35 @@ from pathlib import Path
 从而让它们全部通过 WebSocket 与远端 AI 保持连接。
 
 支持功能：
-1. 统一日志：stdout/stderr 重定向到 `<tool_name>.log`。
-2. 进程监控：若任一子进程意外退出，将自动尝试重启（带 5 秒延迟）。
-3. 优雅退出：捕获 Ctrl-C 或终止信号，关闭所有子进程并退出。
+1. 统一日志：stdout/stderr 经管道由后台线程批量写入 `<tool_name>.log`，按大小/时间滚动，
+   旧日志 gzip 压缩并只保留最近几份；写盘再慢也不会阻塞服务。
+2. 进程监控：基于 asyncio 等待每个子进程退出，退出后立即按该服务自己的指数退避重启，
+   各服务互不阻塞；短时间内反复崩溃会被判定为崩溃循环并放慢重启。
+3. 运行统计：记录每个服务的重启次数、累计停机时间，退出时汇总输出。
+4. 就绪探测：各服务并行启动，mcp_pipe 连上接入点且工具完成 initialize 才算就绪；
+   启动期限内汇报每个服务的耗时构成（解释器启动/导入/连接/子进程握手）。
+5. 优雅退出：捕获 Ctrl-C 或终止信号，并行关闭所有子进程并退出。
+6. 预热启动（仅 Linux，`--zygote`）：先启动一个预先导入 websockets/mcp/pydantic 等依赖的
+   zygote 进程，各服务及其工具子进程都从它 fork 出来，启动/重启免去重复导入，内存写时复制共享。
+7. 资源遥测：每隔 `--telemetry-interval` 秒用 psutil 采样每个服务（含其工具子进程）的 CPU、内存、
+   线程数和句柄数，追加写入滚动的历史文件；超出内存/CPU 上限的服务会被自动重启。
+   `--status-port`/`--status-socket` 通过本地 HTTP 提供实时状态快照。
 
 使用方法：
     python start_all_services.py
 
 如需只启动部分服务，可修改 SERVICE_SCRIPTS 列表或使用命令行参数：
     python start_all_services.py app_launcher calendar_manager
+
+网关模式（所有工具共用一个 WebSocket 连接和一个 mcp_pipe 进程，日志→ mcp_gateway.log）：
+    python start_all_services.py --gateway
+
+预热启动模式（zygote 日志→ zygote.log；重启耗时与内存对比见 `python -m benchmarks.restart`）：
+    python start_all_services.py --zygote
+
+资源上限与状态快照（内存超过 1500 MB 或 CPU 持续超过一个核的 90% 即重启该服务）：
+    python start_all_services.py --max-rss 1500 --max-cpu 90 --status-port 8765
+    curl http://127.0.0.1:8765/status
 """
 
 # 默认需要启动的工具脚本（文件名）
@@ -33,8 +65,51 @@ SERVICE_SCRIPTS = [
     "Wechat_Sender.py",
 ]
 
+# 重启策略（单位：秒）
+RESTART_BACKOFF_INITIAL = 1  # 首次重启前的等待
+RESTART_BACKOFF_MAX = 300  # 退避上限
+STABLE_UPTIME = 60  # 连续运行超过该时长视为恢复正常，退避清零
+CRASH_LOOP_WINDOW = 120  # 在该时间窗口内 …
+CRASH_LOOP_THRESHOLD = 5  # … 退出达到该次数即判定为崩溃循环，直接使用退避上限
+SHUTDOWN_TIMEOUT = 10  # 退出时等待子进程结束的时间，超时强制杀死
+ZYGOTE_READY_TIMEOUT = 30  # 等待 zygote 完成预导入的时间，超时则其余服务照常冷启动
+STARTUP_TIMEOUT = 60  # 启动期限：到期仍未就绪的服务在启动报告中列出（仍照常监管）
+
+# 就绪探测：mcp_pipe.py 连上接入点且工具脚本完成 initialize 后输出一行
+# "Startup report: {json}"，其中是各阶段的墙钟时间点
+READY_MARKER = b"Startup report:"
+STARTUP_PHASES = [  # (键, 名称, 起点, 终点)
+    ("interpreter_s", "解释器启动", "spawned", "started"),
+    ("imports_s", "导入", "started", "imported"),
+    ("connect_s", "连接", "connecting", "connected"),
+    ("handshake_s", "子进程握手", "spawning", "handshake"),
+]
+
+# 服务日志（<服务名>.log）
+LOG_MAX_BYTES = 5 * 1024 * 1024  # 日志超过该大小即滚动
+LOG_ROTATE_INTERVAL = 24 * 3600  # 日志最长使用时间（秒），到期滚动；0 表示只按大小滚动
+LOG_BACKUPS = 5  # 每个服务保留的压缩旧日志数（<服务名>.log.<时间>.gz）
+LOG_CHUNK = 64 * 1024  # 每次从子进程管道读取的最大字节数
+LOG_QUEUE_CHUNKS = 1024  # 等待写盘的输出块上限；写盘跟不上时丢弃并记录字节数，不阻塞服务
+LOG_BATCH = 256  # 后台线程每批最多合并写入的输出块数
+
+# 资源遥测
+TELEMETRY_INTERVAL = 10  # 采样间隔（秒），0 表示关闭
+TELEMETRY_HISTORY = "services_telemetry.jsonl"  # 历史文件（每次采样一行 JSON）
+TELEMETRY_HISTORY_MAX_BYTES = 5 * 1024 * 1024  # 超过该大小滚动为 .1，只保留一份旧文件
+LIMIT_SAMPLES = 3  # 连续该次采样超出上限才重启，避免瞬时峰值误杀
+EXIT_HISTORY = 20  # 每个服务在状态快照中保留的最近退出记录数
+
+# 按服务单独设置资源上限（未列出的服务使用 --max-rss/--max-cpu），例如：
+#   "outlook_manager.py": {"max_rss_mb": 1500, "max_cpu_percent": 90},
+# max_cpu_percent 以单个 CPU 核为 100%，统计范围包括 mcp_pipe 及其工具子进程
+SERVICE_LIMITS = {}
+
 # ---------------------------- 内部实现 ----------------------------
 
+logger = logging.getLogger("SERVICE_MANAGER")
+
+
 def build_cmd(base_dir: Path, script_name: str) -> list[str]:
     """构造启动命令: python mcp_pipe.py <tool_script>"""
     return [
@@ -44,83 +119,707 @@ def build_cmd(base_dir: Path, script_name: str) -> list[str]:
     ]
 
 
-def start_service(cmd: list[str], log_path: Path) -> subprocess.Popen:
-    """启动单个服务，并把输出写入 log_path"""
-    log_file = open(log_path, "a", encoding="utf-8", buffering=1)  # 行缓冲
-    process = subprocess.Popen(
-        cmd,
-        stdout=log_file,
-        stderr=subprocess.STDOUT,
-        text=True,
+def build_gateway_cmd(base_dir: Path, script_names: list[str]) -> list[str]:
+    """构造网关启动命令: python mcp_pipe.py <tool_script> <tool_script> ..."""
+    return [
+        sys.executable,
+        str(base_dir / "mcp_pipe.py"),
+        "--gateway",
+        *(str(base_dir / name) for name in script_names),
+    ]
+
+
+def build_zygote_cmd(base_dir: Path, socket_path: str) -> list[str]:
+    """构造 zygote 启动命令: python zygote.py <socket_path>"""
+    return [
+        sys.executable,
+        str(base_dir / "zygote.py"),
+        socket_path,
+    ]
+
+
+async def start_service(cmd: list[str], zygote_path: str = None):
+    """启动单个服务，stdout/stderr 合并到 process.stdout 管道；返回进程
+
+    给定 zygote_path 时从 zygote fork（cmd[0] 的解释器参数被忽略），不可用则回退为冷启动。
+    """
+    if zygote_path and os.path.exists(zygote_path):
+        try:
+            return await zygote.create_subprocess(
+                zygote_path, cmd[1:],
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                limit=LOG_CHUNK,
+            )
+        except OSError as e:
+            logger.warning(f"zygote 不可用，改为冷启动: {e}")
+    return await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        limit=LOG_CHUNK,
     )
-    return process
 
 
-def main():
-    base_dir = Path(__file__).resolve().parent
+class LogWriter:
+    """后台写日志线程：批量写入、按大小/时间滚动、gzip 压缩旧日志并限制保留份数
 
-    # 如果用户通过命令行传入服务名，则仅启动指定服务
-    requested = sys.argv[1:] if len(sys.argv) > 1 else None
-    scripts_to_run = [f"{name if name.endswith('.py') else name + '.py'}" for name in (requested or SERVICE_SCRIPTS)]
+    事件循环只把子进程输出放进有界队列（write 从不阻塞），所有文件 I/O 都在本线程完成。
+    子进程不直接持有日志文件，滚动时可以随时重命名（Windows 上被占用的文件无法改名）。
+    """
 
-    logging.basicConfig(level=logging.INFO, format="%(asctime)s [MAIN] %(levelname)s: %(message)s")
-    logger = logging.getLogger("SERVICE_MANAGER")
+    def __init__(self, max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS,
+                 rotate_interval: float = LOG_ROTATE_INTERVAL):
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.rotate_interval = rotate_interval
+        self.queue = queue.Queue(LOG_QUEUE_CHUNKS)
+        self.files = {}  # 路径 -> [文件, 当前大小, 打开时间]；仅由后台线程访问
+        self.dropped = {}  # 路径 -> 队列满时丢弃的字节数
+        self.lock = threading.Lock()  # 保护 dropped
+        self.compressing = []  # 进行中的压缩线程
+        self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+        self.thread.start()
 
-    processes: dict[str, subprocess.Popen] = {}
+    def write(self, path: Path, data: bytes):
+        """由事件循环调用，不阻塞"""
+        try:
+            self.queue.put_nowait((path, data))
+        except queue.Full:
+            with self.lock:
+                self.dropped[path] = self.dropped.get(path, 0) + len(data)
 
-    def launch_all():
-        """启动所有脚本进程"""
-        for script in scripts_to_run:
-            cmd = build_cmd(base_dir, script)
-            log_path = base_dir / f"{Path(script).stem}.log"
-            proc = start_service(cmd, log_path)
-            processes[script] = proc
-            logger.info(f"启动 {script} (PID={proc.pid})，日志→ {log_path.name}")
+    async def pump(self, stream: asyncio.StreamReader, path: Path, scan=None):
+        """把子进程输出管道中的数据转交给后台线程，直到管道关闭
 
-    def shutdown_all():
-        """尝试优雅终止所有子进程"""
-        logger.info("收到退出信号，正在关闭所有子进程 …")
-        for script, proc in processes.items():
-            if proc.poll() is None:  # 仍在运行
-                logger.info(f"终止 {script} (PID={proc.pid}) …")
-                proc.terminate()
-        # 再等待一会
-        deadline = time.time() + 10
-        for script, proc in processes.items():
-            if proc.poll() is None and time.time() < deadline:
+        scan(data) 依次查看每块输出，返回 True 后不再调用（用于就绪探测）。
+        """
+        while True:
+            data = await stream.read(LOG_CHUNK)
+            if not data:
+                return
+            if scan is not None and scan(data):
+                scan = None
+            self.write(path, data)
+
+    def close(self):
+        """写完队列中剩余的数据并关闭所有文件（阻塞）"""
+        self.queue.put(None)
+        self.thread.join()
+        for thread in self.compressing:
+            thread.join()
+
+    # -------- 后台线程 --------
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < LOG_BATCH:
                 try:
-                    proc.wait(timeout=max(0, deadline - time.time()))
-                except subprocess.TimeoutExpired:
-                    pass
-            if proc.poll() is None:  # 依旧没退出
-                logger.warning(f"强制杀死 {script} (PID={proc.pid})")
-                proc.kill()
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            grouped = {}
+            for item in batch:
+                if item is not None:
+                    grouped.setdefault(item[0], []).append(item[1])
+            with self.lock:
+                dropped, self.dropped = self.dropped, {}
+            for path, size in dropped.items():
+                grouped.setdefault(path, []).append(f"\n[SERVICE_MANAGER] 日志写入跟不上，丢弃了 {size} 字节输出\n".encode())
+            for path, chunks in grouped.items():
+                self.append(path, b"".join(chunks))
+            if None in batch:
+                for f, _, _ in self.files.values():
+                    f.close()
+                self.files.clear()
+                return
+
+    def append(self, path: Path, data: bytes):
+        try:
+            state = self.files.get(path) or self.open(path)
+            f, size, opened_at = state
+            too_old = self.rotate_interval and time.time() - opened_at >= self.rotate_interval
+            if size and (size + len(data) > self.max_bytes or too_old):
+                cut = data.find(b"\n") + 1  # 先补完当前行，滚动发生在行边界
+                if cut:
+                    f.write(data[:cut])
+                    data = data[cut:]
+                    self.rotate(path)
+                    state = self.open(path)
+                    f = state[0]
+            f.write(data)
+            f.flush()
+            state[1] += len(data)
+        except OSError as e:
+            logger.error(f"写入 {path.name} 失败: {e}")
+            stale = self.files.pop(path, None)
+            if stale is not None:
+                stale[0].close()
+
+    def open(self, path: Path) -> list:
+        if path.exists() and path.stat().st_size and self.rotate_interval \
+                and time.time() - path.stat().st_mtime >= self.rotate_interval:
+            self.rotate(path)  # 上次运行留下的过期日志
+        f = open(path, "ab")
+        self.files[path] = [f, f.tell(), time.time()]
+        return self.files[path]
+
+    def rotate(self, path: Path):
+        """把当前日志改名为 <名称>.<时间>，在单独的线程中压缩，不耽误后续写入"""
+        state = self.files.pop(path, None)
+        if state is not None:
+            state[0].close()
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f".{int(now * 1000) % 1000:03d}"
+        rolled = path.with_name(f"{path.name}.{stamp}")
+        suffix = 1
+        while rolled.exists() or rolled.with_name(rolled.name + ".gz").exists():
+            rolled = path.with_name(f"{path.name}.{stamp}-{suffix}")
+            suffix += 1
+        os.replace(path, rolled)
+        self.compressing = [thread for thread in self.compressing if thread.is_alive()]
+        thread = threading.Thread(target=self.compress, args=(path, rolled), name="log-compress", daemon=True)
+        thread.start()
+        self.compressing.append(thread)
+
+    def compress(self, path: Path, rolled: Path):
+        try:
+            with open(rolled, "rb") as src, gzip.open(rolled.with_name(rolled.name + ".gz"), "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rolled)
+        except OSError as e:
+            logger.error(f"压缩 {rolled.name} 失败: {e}")
+            return
+        # 只保留最近 backups 份（时间戳命名，按名称排序即按时间排序）
+        for old in sorted(path.parent.glob(f"{path.name}.*.gz"))[:-self.backups or None]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+class Service:
+    """一个受监管的服务：子进程本身及其重启历史"""
+
+    def __init__(self, name: str, cmd: list[str], log_path: Path, zygote_path: str = None):
+        self.name = name
+        self.cmd = cmd
+        self.log_path = log_path
+        self.zygote_path = zygote_path  # 从该 zygote fork；None 表示冷启动
+        self.process = None
+        self.started_at = None  # 本次启动时间 (monotonic)
+        self.down_since = None  # 本次停机开始时间 (monotonic)，运行中为 None
+        self.restarts = 0
+        self.downtime = 0.0  # 累计停机秒数（不含首次启动前）
+        self.last_exit_code = None
+        self.backoff = RESTART_BACKOFF_INITIAL
+        self.recent_exits = []  # 最近 CRASH_LOOP_WINDOW 秒内的退出时间
+        self.crash_looping = False
+        self.exits = deque(maxlen=EXIT_HISTORY)  # 最近的退出记录，供状态快照使用
+        self.stop_reason = None  # 由监管方主动结束时的原因（如超出内存上限）
+        self.limits = {}  # {"max_rss_mb": …, "max_cpu_percent": …}
+        self.over_limit = 0  # 连续超限的采样次数
+        self.usage = None  # 最近一次资源采样
+        self.spawned_at = None  # 本次启动的墙钟时间，与 mcp_pipe 启动报告中的时间点对齐
+        self.ready = asyncio.Event()  # 本次启动已就绪（收到 mcp_pipe 的启动报告）
+        self.startup = None  # 最近一次启动的耗时构成
+        self.scan_tail = b""  # 上一块输出的结尾，启动报告可能跨块
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        self.ready.clear()
+        self.scan_tail = b""
+        self.spawned_at = time.time()
+        self.process = await start_service(self.cmd, self.zygote_path)
+        now = time.monotonic()
+        if self.down_since is not None:
+            self.downtime += now - self.down_since
+            self.down_since = None
+        self.started_at = now
+        self.stop_reason = None
+        self.over_limit = 0
+        self.usage = None
+
+    def scan_output(self, data: bytes) -> bool:
+        """在输出中查找 mcp_pipe 的启动报告；找到则记为就绪并返回 True"""
+        text = self.scan_tail + data
+        index = text.find(READY_MARKER)
+        end = text.find(b"\n", index) if index >= 0 else -1
+        if end < 0:
+            # 保留可能被截断的标记或报告行，等下一块
+            self.scan_tail = text[index:] if 0 <= index and len(text) - index < LOG_CHUNK else text[-len(READY_MARKER):]
+            return False
+        self.scan_tail = b""
+        try:
+            marks = json.loads(text[index + len(READY_MARKER):end])
+        except ValueError:
+            return self.scan_output(text[end:])
+        marks["spawned"] = self.spawned_at
+        self.startup = {"total_s": round(marks["ready"] - self.spawned_at, 3)}
+        for key, _, begin, finish in STARTUP_PHASES:
+            if begin in marks and finish in marks:
+                self.startup[key] = round(marks[finish] - marks[begin], 3)
+        self.ready.set()
+        phases = " / ".join(f"{label} {self.startup[key]:.2f}" for key, label, _, _ in STARTUP_PHASES if key in self.startup)
+        logger.info(f"{self.name} 已就绪，用时 {self.startup['total_s']:.2f} 秒（{phases}）")
+        return True
+
+    def on_exit(self, code: int) -> float:
+        """记录一次退出，返回重启前应等待的秒数"""
+        now = time.monotonic()
+        self.last_exit_code = code
+        self.exits.append({
+            "time": round(time.time(), 3),
+            "code": code,
+            "reason": self.stop_reason or "exited",
+            "uptime_s": round(now - self.started_at, 1),
+        })
+        if self.down_since is None:
+            self.down_since = now
+
+        uptime = now - self.started_at
+        if uptime >= STABLE_UPTIME:
+            self.backoff = RESTART_BACKOFF_INITIAL  # 之前运行正常，这次从头退避
+            self.crash_looping = False
+        self.recent_exits = [t for t in self.recent_exits if now - t < CRASH_LOOP_WINDOW] + [now]
+        if len(self.recent_exits) >= CRASH_LOOP_THRESHOLD:
+            if not self.crash_looping:
+                logger.error(f"{self.name} 在 {CRASH_LOOP_WINDOW} 秒内退出 {len(self.recent_exits)} 次，"
+                             f"判定为崩溃循环，改为每 {RESTART_BACKOFF_MAX} 秒重试一次")
+            self.crash_looping = True
+            self.backoff = RESTART_BACKOFF_MAX
+
+        delay = self.backoff
+        self.backoff = min(self.backoff * 2, RESTART_BACKOFF_MAX)
+        return delay
+
+    def status(self) -> dict:
+        """状态快照中该服务的部分"""
+        now = time.monotonic()
+        downtime = self.downtime + (now - self.down_since if self.down_since is not None else 0)
+        return {
+            "name": self.name,
+            "pid": self.process.pid if self.running else None,
+            "running": self.running,
+            "uptime_s": round(now - self.started_at, 1) if self.running else None,
+            "restarts": self.restarts,
+            "downtime_s": round(downtime, 1),
+            "last_exit_code": self.last_exit_code,
+            "crash_looping": self.crash_looping,
+            "ready": self.ready.is_set(),
+            "startup": self.startup,
+            "limits": self.limits,
+            "usage": self.usage,
+            "exits": list(self.exits),
+        }
+
+    def summary(self) -> str:
+        downtime = self.downtime + (time.monotonic() - self.down_since if self.down_since is not None else 0)
+        return (f"{self.name}: 重启 {self.restarts} 次，累计停机 {downtime:.1f} 秒，"
+                f"最近退出码 {self.last_exit_code}" + ("（崩溃循环）" if self.crash_looping else ""))
+
+
+class Supervisor:
+    """为每个服务运行一个监管协程：等待退出 → 退避 → 重启，服务之间互不影响"""
+
+    def __init__(self, services: list[Service], zygote_service: Service = None, telemetry: "Telemetry" = None,
+                 log_writer: LogWriter = None, startup_timeout: float = STARTUP_TIMEOUT):
+        self.services = services
+        self.zygote_service = zygote_service  # --zygote：先于其他服务启动、最后关闭
+        self.telemetry = telemetry
+        self.log_writer = log_writer or LogWriter()
+        self.pumps = set()  # 把子进程输出转交给 log_writer 的任务
+        self.startup_timeout = startup_timeout
+        self.stopping = asyncio.Event()
+
+    @property
+    def all_services(self) -> list[Service]:
+        return ([self.zygote_service] if self.zygote_service else []) + self.services
+
+    async def run(self):
+        tasks = []
+        if self.zygote_service is not None:
+            tasks.append(asyncio.create_task(self.supervise(self.zygote_service)))
+            await self.wait_for_zygote()
+        tasks += [asyncio.create_task(self.supervise(service)) for service in self.services]
+        tasks.append(asyncio.create_task(self.report_startup()))
+        if self.telemetry is not None:
+            tasks.append(asyncio.create_task(self.telemetry.run(self)))
+        await self.stopping.wait()
+        logger.info("收到退出信号，正在关闭所有子进程 …")
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(*(self.stop_service(service) for service in self.services))
+        if self.zygote_service is not None:
+            await self.stop_service(self.zygote_service)
+        if self.pumps:  # 子进程已退出，等其最后的输出写完（孤儿子孙进程可能仍占着管道）
+            await asyncio.wait(self.pumps, timeout=SHUTDOWN_TIMEOUT)
+        await asyncio.to_thread(self.log_writer.close)
+        for service in self.all_services:
+            logger.info(service.summary())
         logger.info("已退出。")
 
-    # 注册信号处理
-    signal.signal(signal.SIGINT, lambda sig, frame: shutdown_all() or sys.exit(0))
+    async def report_startup(self):
+        """等待所有服务就绪或启动期限到达，汇报整体启动结果"""
+        started = time.monotonic()
+        waiting = [asyncio.create_task(service.ready.wait()) for service in self.services]
+        _, pending = await asyncio.wait(waiting, timeout=self.startup_timeout)
+        for task in pending:
+            task.cancel()
+        if not pending:
+            logger.info(f"全部 {len(self.services)} 个服务已就绪，用时 {time.monotonic() - started:.2f} 秒")
+        else:
+            names = ", ".join(service.name for service in self.services if not service.ready.is_set())
+            logger.warning(f"启动期限 {self.startup_timeout} 秒已到，未就绪的服务: {names}")
+
+    async def wait_for_zygote(self):
+        """等待 zygote 预导入完成（其 socket 出现）"""
+        socket_path = self.zygote_service.cmd[-1]
+        started = time.monotonic()
+        while not os.path.exists(socket_path):
+            if time.monotonic() - started > ZYGOTE_READY_TIMEOUT or self.stopping.is_set():
+                logger.warning(f"zygote 在 {ZYGOTE_READY_TIMEOUT} 秒内未就绪，服务将冷启动")
+                return
+            await asyncio.sleep(0.05)
+        logger.info(f"zygote 就绪，用时 {time.monotonic() - started:.2f} 秒")
+
+    async def supervise(self, service: Service):
+        while True:
+            try:
+                await service.start()
+            except Exception as e:
+                logger.error(f"启动 {service.name} 失败: {e}")
+                service.started_at = time.monotonic()
+                code = None
+            else:
+                pump = asyncio.create_task(
+                    self.log_writer.pump(service.process.stdout, service.log_path, service.scan_output))
+                self.pumps.add(pump)
+                pump.add_done_callback(self.pumps.discard)
+                if service.restarts:
+                    logger.info(f"已重启 {service.name} (PID={service.process.pid})，第 {service.restarts} 次重启")
+                else:
+                    logger.info(f"启动 {service.name} (PID={service.process.pid})，日志→ {service.log_path.name}")
+                code = await service.process.wait()
+
+            reason = service.stop_reason
+            delay = service.on_exit(code)
+            if reason:
+                logger.warning(f"{service.name} 已结束（{reason}），{delay} 秒后重启 …")
+            else:
+                logger.warning(f"{service.name} 意外退出 (code={code})，{delay} 秒后重启 …")
+            await asyncio.sleep(delay)
+            service.restarts += 1
+
+    async def restart_service(self, service: Service, reason: str):
+        """主动结束服务（如超出资源上限），由其监管协程按常规流程重启"""
+        if not service.running or service.stop_reason:
+            return
+        service.stop_reason = reason
+        logger.warning(f"{service.name} {reason}，重启中 …")
+        await self.stop_service(service)
+
+    async def stop_service(self, service: Service):
+        """尝试优雅终止子进程，超时后强制杀死"""
+        if not service.running:
+            return
+        logger.info(f"终止 {service.name} (PID={service.process.pid}) …")
+        try:
+            service.process.terminate()
+            await asyncio.wait_for(service.process.wait(), SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"强制杀死 {service.name} (PID={service.process.pid})")
+            service.process.kill()
+            await service.process.wait()
+        except ProcessLookupError:
+            pass  # 已经退出
+
+
+class Telemetry:
+    """定期采样各服务进程树的资源占用：写入历史文件、执行资源上限、提供状态快照"""
+
+    def __init__(self, interval: float, history_path: Path = None, status_port: int = None, status_socket: str = None):
+        self.interval = interval
+        self.history_path = history_path
+        self.status_port = status_port
+        self.status_socket = status_socket
+        self.processes = {}  # pid -> (psutil.Process, 名称)；复用对象，cpu_percent 才有上次采样可比
+        self.supervisor = None
+        self.restarting = set()  # 进行中的超限重启任务
+
+    async def run(self, supervisor: Supervisor):
+        self.supervisor = supervisor
+        servers = []
+        try:
+            if self.status_port is not None:
+                servers.append(await asyncio.start_server(self.handle_status, "127.0.0.1", self.status_port))
+                logger.info(f"状态快照: http://127.0.0.1:{self.status_port}/status")
+            if self.status_socket is not None:
+                servers.append(await asyncio.start_unix_server(self.handle_status, self.status_socket))
+                logger.info(f"状态快照: curl --unix-socket {self.status_socket} http://localhost/status")
+            while self.interval > 0:
+                await asyncio.sleep(self.interval)
+                try:
+                    await asyncio.to_thread(self.sample)
+                except Exception as e:
+                    logger.error(f"资源采样失败: {e}")
+                    continue
+                self.check_limits()
+            await asyncio.Event().wait()  # 只提供状态快照
+        finally:
+            for server in servers:
+                server.close()
+            if self.status_socket is not None and os.path.exists(self.status_socket):
+                os.unlink(self.status_socket)
+
+    # -------- 采样（在线程中运行，不阻塞事件循环） --------
+
+    def zygote_children(self) -> dict:
+        """zygote 代为 fork 的进程：pid -> {"parent", "script"}；工具子进程不是 mcp_pipe 的子进程，只能这样归属"""
+        zygote_service = self.supervisor.zygote_service
+        if zygote_service is None or not zygote_service.running:
+            return {}
+        try:
+            return zygote.children(zygote_service.cmd[-1])
+        except (OSError, ValueError):
+            return {}
+
+    def process(self, pid: int, name: str = None):
+        """取 pid 对应的 psutil.Process（缓存），进程已不存在时返回 None"""
+        cached = self.processes.get(pid)
+        if cached is not None and cached[0].is_running():  # is_running 同时比较创建时间，防止 PID 复用
+            return cached
+        try:
+            proc = psutil.Process(pid)
+            if name is None:
+                cmdline = proc.cmdline()
+                name = Path(cmdline[1]).name if len(cmdline) > 1 else proc.name()  # python <脚本> …
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            self.processes.pop(pid, None)
+            return None
+        self.processes[pid] = (proc, name)
+        return self.processes[pid]
+
+    def tree(self, pid: int, forked: dict) -> list:
+        """服务的全部进程：自身、其子孙进程，以及 zygote 为它 fork 的进程（及其子孙）
+
+        zygote fork 的进程只算在请求方名下，不算作 zygote 自己的子进程。
+        """
+        roots = [pid] + [child for child, info in forked.items() if info.get("parent") == pid]
+        found = []
+        pending = [self.process(root, forked.get(root, {}).get("script")) for root in roots]
+        while pending:
+            entry = pending.pop()
+            if entry is None:
+                continue
+            found.append(entry)
+            try:
+                pending += [self.process(child.pid) for child in entry[0].children() if child.pid not in forked]
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return found
+
+    def sample_process(self, proc: psutil.Process, name: str) -> dict:
+        with proc.oneshot():
+            return {
+                "pid": proc.pid,
+                "name": name,
+                "cpu_percent": proc.cpu_percent(None),  # 自上次采样以来的平均值，单核 = 100
+                "rss_mb": round(proc.memory_info().rss / 2 ** 20, 1),
+                "threads": proc.num_threads(),
+                "fds": proc.num_fds() if os.name == "posix" else proc.num_handles(),
+            }
+
+    def sample(self):
+        """采样所有运行中的服务，结果存入 service.usage，并追加到历史文件"""
+        forked = self.zygote_children()
+        live = set()
+        record = {"time": round(time.time(), 3), "services": {}}
+        for service in self.supervisor.all_services:
+            if not service.running:
+                service.usage = None
+                continue
+            processes = []
+            for proc, name in self.tree(service.process.pid, forked):
+                try:
+                    processes.append(self.sample_process(proc, name))
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+                live.add(proc.pid)
+            service.usage = {
+                "time": record["time"],
+                "cpu_percent": round(sum(p["cpu_percent"] for p in processes), 1),
+                "rss_mb": round(sum(p["rss_mb"] for p in processes), 1),
+                "threads": sum(p["threads"] for p in processes),
+                "fds": sum(p["fds"] for p in processes),
+                "processes": processes,
+            }
+            record["services"][service.name] = {
+                "pid": service.process.pid,
+                "restarts": service.restarts,
+                **{key: value for key, value in service.usage.items() if key not in ("time", "processes")},
+            }
+        for pid in set(self.processes) - live:
+            del self.processes[pid]
+        if self.history_path is not None:
+            self.write_history(record)
+
+    def write_history(self, record: dict):
+        try:
+            if self.history_path.exists() and self.history_path.stat().st_size > TELEMETRY_HISTORY_MAX_BYTES:
+                os.replace(self.history_path, self.history_path.with_name(self.history_path.name + ".1"))
+            with open(self.history_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.error(f"写入遥测历史失败: {e}")
+
+    # -------- 资源上限 --------
+
+    def check_limits(self):
+        for service in self.supervisor.services:
+            usage = service.usage
+            if usage is None or not service.limits:
+                continue
+            over = []
+            max_rss = service.limits.get("max_rss_mb")
+            max_cpu = service.limits.get("max_cpu_percent")
+            if max_rss and usage["rss_mb"] > max_rss:
+                over.append(f"内存 {usage['rss_mb']} MB > {max_rss} MB")
+            if max_cpu and usage["cpu_percent"] > max_cpu:
+                over.append(f"CPU {usage['cpu_percent']}% > {max_cpu}%")
+            if not over:
+                service.over_limit = 0
+                continue
+            service.over_limit += 1
+            if service.over_limit >= LIMIT_SAMPLES:
+                service.over_limit = 0
+                task = asyncio.create_task(self.supervisor.restart_service(service, "超出资源上限: " + "，".join(over)))
+                self.restarting.add(task)
+                task.add_done_callback(self.restarting.discard)
+
+    # -------- 状态快照 --------
+
+    def snapshot(self) -> dict:
+        return {
+            "time": round(time.time(), 3),
+            "supervisor_pid": os.getpid(),
+            "telemetry_interval": self.interval,
+            "services": [service.status() for service in self.supervisor.all_services],
+        }
+
+    async def handle_status(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """极简 HTTP：GET / 或 /status 返回 JSON 快照"""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5)
+            while (await asyncio.wait_for(reader.readline(), 5)).strip():
+                pass  # 忽略请求头
+            parts = request_line.decode("latin-1").split()
+            path = parts[1].split("?")[0] if len(parts) > 1 else "/"
+            if path in ("/", "/status"):
+                status, body = "200 OK", json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+            else:
+                status, body = "404 Not Found", json.dumps({"error": f"unknown path {path}"})
+            data = body.encode("utf-8")
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                         f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def supervise(services: list[Service], zygote_service: Service = None, telemetry: Telemetry = None,
+                    log_writer: LogWriter = None, startup_timeout: float = STARTUP_TIMEOUT):
+    supervisor = Supervisor(services, zygote_service, telemetry, log_writer, startup_timeout)
+    loop = asyncio.get_running_loop()
+
+    # 注册信号处理：只通知事件循环，关闭流程在 Supervisor.run 中完成
+    def request_stop(sig, frame):
+        loop.call_soon_threadsafe(supervisor.stopping.set)
+
+    signal.signal(signal.SIGINT, request_stop)
     if os.name != "nt":  # Windows 仅支持部分信号
-        signal.signal(signal.SIGTERM, lambda sig, frame: shutdown_all() or sys.exit(0))
+        signal.signal(signal.SIGTERM, request_stop)
+
+    await supervisor.run()
+    if zygote_service is not None and os.path.exists(zygote_service.cmd[-1]):
+        os.unlink(zygote_service.cmd[-1])  # zygote 被强制杀死时遗留的 socket
 
-    launch_all()
 
-    # 主循环：检测子进程存活，自动重启
+def main():
+    base_dir = Path(__file__).resolve().parent
+
+    parser = argparse.ArgumentParser(description="一键启动并守护所有 MCP 工具脚本")
+    # 如果用户通过命令行传入服务名，则仅启动指定服务
+    parser.add_argument("services", nargs="*", help="只启动这些服务（默认 SERVICE_SCRIPTS）")
+    parser.add_argument("--gateway", action="store_true", help="网关模式：所有工具共用一个 mcp_pipe 进程")
+    parser.add_argument("--zygote", action="store_true", help="从预导入依赖的 zygote fork 服务（仅 Linux）")
+    parser.add_argument("--startup-timeout", type=float, default=STARTUP_TIMEOUT, metavar="SECONDS",
+                        help=f"启动期限，到期汇报仍未就绪的服务（默认 {STARTUP_TIMEOUT}）")
+    parser.add_argument("--telemetry-interval", type=float, default=TELEMETRY_INTERVAL, metavar="SECONDS",
+                        help=f"资源采样间隔，0 关闭（默认 {TELEMETRY_INTERVAL}）")
+    parser.add_argument("--history", default=TELEMETRY_HISTORY, metavar="PATH",
+                        help=f"资源历史文件，空字符串表示不写（默认 {TELEMETRY_HISTORY}）")
+    parser.add_argument("--status-port", type=int, metavar="PORT", help="在 127.0.0.1:PORT 提供 HTTP 状态快照")
+    parser.add_argument("--status-socket", metavar="PATH", help="在 UNIX socket 上提供 HTTP 状态快照（非 Windows）")
+    parser.add_argument("--log-max-mb", type=float, default=LOG_MAX_BYTES / 2 ** 20, metavar="MB",
+                        help=f"单个日志文件上限，超过即滚动并 gzip 压缩（默认 {LOG_MAX_BYTES // 2 ** 20}）")
+    parser.add_argument("--log-backups", type=int, default=LOG_BACKUPS, metavar="N",
+                        help=f"每个服务保留的压缩旧日志份数（默认 {LOG_BACKUPS}）")
+    parser.add_argument("--max-rss", type=float, metavar="MB", help="服务内存上限（含工具子进程），超出即重启")
+    parser.add_argument("--max-cpu", type=float, metavar="PERCENT", help="服务 CPU 上限（单核 = 100），持续超出即重启")
+    args = parser.parse_args()
+    gateway = args.gateway
+    use_zygote = args.zygote
+    scripts_to_run = [f"{name if name.endswith('.py') else name + '.py'}" for name in (args.services or SERVICE_SCRIPTS)]
+
+    # 服务名 -> 启动命令；网关模式下只有一个服务
+    if gateway:
+        commands = {"mcp_gateway": build_gateway_cmd(base_dir, scripts_to_run)}
+    else:
+        commands = {script: build_cmd(base_dir, script) for script in scripts_to_run}
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [MAIN] %(levelname)s: %(message)s")
+
+    zygote_service = None
+    zygote_path = None
+    if use_zygote and os.name != "posix":
+        logger.warning("--zygote 依赖 fork()，仅支持 Linux，已忽略")
+    elif use_zygote:
+        zygote_path = os.path.join(tempfile.gettempdir(), f"mcp-zygote-{os.getpid()}.sock")
+        zygote_service = Service("zygote", build_zygote_cmd(base_dir, zygote_path), base_dir / "zygote.log")
+        os.environ[zygote.ENV_VAR] = zygote_path  # mcp_pipe 据此从 zygote fork 工具子进程
+
+    services = [Service(name, cmd, base_dir / f"{Path(name).stem}.log", zygote_path) for name, cmd in commands.items()]
+    default_limits = {"max_rss_mb": args.max_rss, "max_cpu_percent": args.max_cpu}
+    for service in services:
+        limits = {**default_limits, **SERVICE_LIMITS.get(service.name, {})}
+        service.limits = {key: value for key, value in limits.items() if value}
+
+    if args.status_socket and os.name == "nt":
+        logger.warning("--status-socket 不支持 Windows，已忽略（可改用 --status-port）")
+        args.status_socket = None
+    telemetry = None
+    if args.telemetry_interval > 0 or args.status_port is not None or args.status_socket:
+        history = base_dir / args.history if args.history else None  # 相对路径相对于本项目目录
+        telemetry = Telemetry(args.telemetry_interval, history, args.status_port, args.status_socket)
+    if args.telemetry_interval <= 0 and any(service.limits for service in services):
+        logger.warning("资源采样已关闭（--telemetry-interval 0），资源上限不会生效")
+
+    log_writer = LogWriter(int(args.log_max_mb * 2 ** 20), args.log_backups)
     try:
-        while True:
-            for script, proc in list(processes.items()):
-                retcode = proc.poll()
-                if retcode is not None:  # 已退出
-                    logger.warning(f"{script} 意外退出 (code={retcode})，5 秒后重启 …")
-                    time.sleep(5)
-                    cmd = build_cmd(base_dir, script)
-                    log_path = base_dir / f"{Path(script).stem}.log"
-                    processes[script] = start_service(cmd, log_path)
-                    logger.info(f"已重启 {script} (PID={processes[script].pid})")
-            time.sleep(3)
+        asyncio.run(supervise(services, zygote_service, telemetry, log_writer, args.startup_timeout))
     except KeyboardInterrupt:
-        # 再保险：捕获不到信号时仍能关闭
-        shutdown_all()
+        # 再保险：信号处理未能生效时也能退出
+        pass
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
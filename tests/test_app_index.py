@@ -0,0 +1,104 @@
+"""AppIndex：按目录修改时间增量扫描、索引缓存与 APP_PATHS 手工配置优先"""
+
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("APP_INDEX_PATH", "")  # 模块级索引不读写用户目录下的缓存
+
+import app_launcher  # noqa: E402
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    """Windows 风格的开始菜单与程序目录：快捷方式、可执行文件和应被忽略的卸载程序"""
+    monkeypatch.setattr(sys, "platform", "win32")  # .lnk/.exe 只在 Windows 上视为可启动程序
+    monkeypatch.setattr(app_launcher, "resolve_shortcut", lambda path: None)
+    start_menu = tmp_path / "Start Menu" / "Programs"
+    programs = tmp_path / "Program Files"
+    for path in (start_menu / "Foo Tool.lnk", start_menu / "Tools" / "Baz Viewer.lnk",
+                 programs / "Vendor" / "Bar" / "BarApp.exe", programs / "Vendor" / "Bar" / "unins000.exe",
+                 tmp_path / "custom" / "Foo.exe"):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+    return tmp_path
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    """记录被重新列出的目录"""
+    listed = []
+    scandir = os.scandir
+
+    def counting(path):
+        listed.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting)
+    return listed
+
+
+def touch_dir(path):
+    """推后目录修改时间，不依赖文件系统的时间戳精度"""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def make_index(tree, manual=None):
+    roots = [str(tree / "Start Menu"), str(tree / "Program Files")]
+    return app_launcher.AppIndex(roots, str(tree / "cache" / "app_index.json"), manual=manual)
+
+
+def test_scan_finds_shortcuts_and_executables(tree):
+    index = make_index(tree)
+    index.refresh()
+    assert index.get("foo tool")["source"] == "shortcut"
+    assert index.get("BazViewer")["shortcut"].endswith("Baz Viewer.lnk")
+    assert index.get("barapp")["path"] == str(tree / "Program Files" / "Vendor" / "Bar" / "BarApp.exe")
+    assert index.get("unins000") is None
+    assert index.lookup("bar ap")[0]["name"] == "BarApp"
+
+
+def test_cached_index_is_not_rescanned(tree, scans):
+    make_index(tree).refresh()
+    assert scans and os.path.exists(tree / "cache" / "app_index.json")
+
+    scans.clear()
+    index = make_index(tree)  # 新进程：从缓存加载
+    index.refresh()
+    assert scans == []
+    assert index.get("foo tool")["name"] == "Foo Tool"
+
+
+def test_changed_directory_is_rescanned(tree, scans):
+    index = make_index(tree)
+    index.refresh()
+    bar = tree / "Program Files" / "Vendor" / "Bar"
+    (bar / "BarTool.exe").write_bytes(b"")
+    touch_dir(bar)
+
+    scans.clear()
+    index = make_index(tree)
+    index.refresh()
+    assert scans == [str(bar)]
+    assert index.get("bartool")["source"] == "exe"
+
+    scans.clear()
+    for path in (tree / "Start Menu" / "Programs" / "Tools").iterdir():
+        path.unlink()
+    (tree / "Start Menu" / "Programs" / "Tools").rmdir()
+    touch_dir(tree / "Start Menu" / "Programs")
+    index.refresh()
+    assert scans == [str(tree / "Start Menu" / "Programs")]
+    assert index.get("baz viewer") is None
+
+
+def test_manual_paths_take_priority(tree):
+    custom = str(tree / "custom" / "Foo.exe")
+    index = make_index(tree, manual={"Foo Tool": [str(tree / "missing" / "Foo.exe"), custom]})
+    index.refresh()
+    entry = index.get("foo tool")
+    assert entry["source"] == "manual" and entry["path"] == custom
+    assert index.get("foo")["path"] == custom  # 可执行文件名也作为别名
+    assert index.get("barapp")["source"] == "exe"
@@ -0,0 +1,138 @@
+"""app_launcher：关闭进程树的计数，批量打开/关闭工具（进程与启动调用均为替身）"""
+
+import asyncio
+import os
+
+import psutil
+import pytest
+
+os.environ.setdefault("APP_INDEX_PATH", "")  # 模块级索引不读写用户目录下的缓存
+
+import app_launcher  # noqa: E402
+
+
+class FakeProcess:
+    """psutil.Process 的替身：terminate/kill/status 的行为由参数决定"""
+
+    def __init__(self, pid, exits_on=None, status_error=None, kill_error=None):
+        self.pid = pid
+        self.exits_on = exits_on  # "terminate" / "kill" / None（永不退出）
+        self.status_error = status_error
+        self.kill_error = kill_error
+        self.running = True
+
+    def terminate(self):
+        if self.exits_on == "terminate":
+            self.running = False
+
+    def kill(self):
+        if self.kill_error:
+            raise self.kill_error(self.pid)
+        if self.exits_on == "kill":
+            self.running = False
+
+    def status(self):
+        if self.status_error:
+            raise self.status_error(self.pid)
+        return psutil.STATUS_RUNNING if self.running else psutil.STATUS_ZOMBIE
+
+
+@pytest.fixture
+def fake_psutil(monkeypatch):
+    def wait_procs(procs, timeout=None):
+        return [p for p in procs if not p.running], [p for p in procs if p.running]
+
+    monkeypatch.setattr(app_launcher.psutil, "wait_procs", wait_procs)
+    monkeypatch.setattr(app_launcher.process_index, "descendants", lambda pid, refresh=True: [])
+
+
+def test_close_process_tree_counts(fake_psutil):
+    procs = [FakeProcess(900001, "terminate"), FakeProcess(900002, "kill"),
+             FakeProcess(900003, None, status_error=psutil.AccessDenied, kill_error=psutil.AccessDenied)]
+    counts = app_launcher.close_process_tree(procs)
+    # 无权查询/结束的进程不算已退出，也不算被强制结束
+    assert counts == {"processes": 3, "exited": 1, "killed": 1, "denied": 0, "remaining": 1}
+
+
+def test_vanished_process_counts_as_exited(fake_psutil):
+    proc = FakeProcess(900004, None, status_error=psutil.NoSuchProcess)
+    assert app_launcher.close_process_tree([proc])["exited"] == 1
+
+
+# ---- 批量打开 / 关闭 ----
+
+class FakeIndex:
+    def __init__(self, names):
+        self.entries = {name: {"name": name, "path": f"/opt/{name}/{name}"} for name in names}
+
+    def lookup(self, name):
+        entry = self.entries.get(name)
+        return (entry, []) if entry else (None, ["wechat"])
+
+
+@pytest.fixture
+def launcher(monkeypatch):
+    """替换索引、启动调用与启动器等待，记录实际发生的调用"""
+    calls = {"launched": [], "waited": [], "browser": []}
+    launchers_ready = {"steam": True}
+
+    async def launch_and_wait(app_name, ready=None, timeout=None):
+        calls["waited"].append(app_name)
+        await asyncio.sleep(0.01)  # 让并发的依赖方都等在同一个任务上
+        if launchers_ready[app_name]:
+            return {"success": True, "message": f"{app_name} 已就绪", "launched": True, "elapsed": 0.01}
+        return {"success": False, "message": f"{app_name} 在 60 秒内未就绪", "launched": True, "elapsed": 60}
+
+    monkeypatch.setattr(app_launcher, "app_index", FakeIndex(["wechat", "dota2", "cs2"]))
+    monkeypatch.setattr(app_launcher, "APP_DEPENDENCIES", {"dota2": "steam", "cs2": "steam"})
+    monkeypatch.setattr(app_launcher, "launch_and_wait", launch_and_wait)
+    monkeypatch.setattr(app_launcher, "launch_app", lambda entry: calls["launched"].append(entry["name"]))
+    monkeypatch.setattr(app_launcher, "open_in_browser", lambda urls: calls["browser"].append(urls))
+    return calls, launchers_ready
+
+
+def test_open_applications_shares_launcher(launcher):
+    calls, _ = launcher
+    result = asyncio.run(app_launcher.open_applications(["dota2", "cs2", "wechat"], google_queries=["mcp"],
+                                                        baidu_queries=["小智"]))
+    assert result["success"] and result["message"] == "打开 5/5 项成功"
+    assert calls["waited"] == ["steam"]  # 两个依赖 Steam 的应用只启动/等待一次
+    assert sorted(calls["launched"]) == ["cs2", "dota2", "wechat"]
+    assert len(calls["browser"]) == 1 and len(calls["browser"][0]) == 2  # 所有搜索在一次调用中打开
+    assert [(r["item"], r["action"]) for r in result["results"]] == [
+        ("dota2", "open"), ("cs2", "open"), ("wechat", "open"), ("mcp", "search_google"), ("小智", "search_baidu")]
+
+
+def test_open_applications_partial_failure(launcher):
+    calls, ready = launcher
+    ready["steam"] = False
+    result = asyncio.run(app_launcher.open_applications(["dota2", "cs2", "wechat", "nosuch"]))
+    assert not result["success"] and result["message"] == "打开 1/4 项成功"
+    assert calls["waited"] == ["steam"] and calls["launched"] == ["wechat"]
+    by_item = {r["item"]: r for r in result["results"]}
+    assert by_item["dota2"]["message"] == by_item["cs2"]["message"].replace("cs2", "dota2") \
+        == "无法打开 dota2: steam 在 60 秒内未就绪"
+    assert by_item["nosuch"] == {"item": "nosuch", "action": "open", "success": False,
+                                 "message": "找不到应用程序: nosuch，你是不是要找: wechat"}
+    assert all(set(r) >= {"item", "action", "success", "message"} for r in result["results"])
+
+
+def test_close_applications_refreshes_once(monkeypatch):
+    refreshes, lookups = [], []
+    running = {"WeChat.exe": [FakeProcess(900010, "terminate")], "chrome.exe": []}
+
+    def find_by_name(name, refresh=True):
+        lookups.append((name, refresh))
+        return running.get(name, [])
+
+    monkeypatch.setattr(app_launcher.process_index, "refresh", lambda: refreshes.append(1))
+    monkeypatch.setattr(app_launcher.process_index, "find_by_name", find_by_name)
+    monkeypatch.setattr(app_launcher, "close_process_tree", lambda roots: {
+        "processes": len(roots), "exited": len(roots), "killed": 0, "denied": 0, "remaining": 0})
+    result = asyncio.run(app_launcher.close_applications(["wechat", "chrome", "notepad"]))
+    assert refreshes == [1] and all(refresh is False for _, refresh in lookups)
+    assert not result["success"] and result["message"] == "关闭 1/3 项成功"
+    wechat, chrome, notepad = result["results"]
+    assert wechat["success"] and wechat["processes"] == 1 and wechat["action"] == "close"
+    assert chrome == {"item": "chrome", "action": "close", "success": False, "message": "未找到运行中的: chrome"}
+    assert notepad["message"] == "不支持的应用程序: notepad"
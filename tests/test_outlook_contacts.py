@@ -0,0 +1,75 @@
+"""联系人索引：精确查找、候选建议与事件驱动的增量更新（OUTLOOK_BACKEND=fake）"""
+
+import asyncio
+import os
+
+import pytest
+
+os.environ["OUTLOOK_BACKEND"] = "fake"
+os.environ.setdefault("OUTLOOK_MIRROR_PATH", "")
+
+import outlook_manager as om  # noqa: E402
+from outlook_fake import OL_CONTACT_ITEM, OL_FOLDER_CONTACTS, FakeBackend  # noqa: E402
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = FakeBackend()
+    backend.add(OL_CONTACT_ITEM, FullName="张三", Email1Address="zhangsan@example.com", NickName="老张")
+    backend.add(OL_CONTACT_ITEM, FullName="Li Na", Email1Address="lina@example.com",
+                Email2Address="na.li@example.org", FileAs="Li, Na")
+    backend.add(OL_CONTACT_ITEM, FullName="Lina", Email1Address="lina.w@example.com")
+    worker = om.OutlookWorker(backend)
+    monkeypatch.setattr(om, "outlook", worker)
+    monkeypatch.setattr(om, "calendar_mirror", None)
+    monkeypatch.setattr(om, "contact_index", om.ContactIndex())
+    yield backend
+    worker.stop()
+
+
+def contacts(backend):
+    return sorted(item.get("FullName") for item in backend.store.folders[OL_FOLDER_CONTACTS])
+
+
+def test_delete_matches_name_or_primary_email_only(backend):
+    assert asyncio.run(om.delete_outlook_contact("LINA"))["message"] == "已删除 1 个联系人"
+    assert contacts(backend) == ["Li Na", "张三"]  # "Li Na" 去掉空格后相同，但不是同一个名字
+
+    for alias in ("老张", "na.li@example.org", "Li, Na"):
+        result = asyncio.run(om.delete_outlook_contact(alias))
+        assert not result["success"] and result["suggestions"], alias
+    assert contacts(backend) == ["Li Na", "张三"]
+
+    assert asyncio.run(om.delete_outlook_contact("ZhangSan@Example.com"))["success"]
+    assert contacts(backend) == ["Li Na"]
+
+
+def test_suggestions_use_aliases(backend):
+    result = asyncio.run(om.update_outlook_contact("老张", company="赛搏"))
+    assert result["suggestions"] == ["张三 <zhangsan@example.com>"]
+    result = asyncio.run(om.delete_outlook_contact("张山"))
+    assert result["suggestions"][0] == "张三 <zhangsan@example.com>"
+    assert asyncio.run(om.delete_outlook_contact("nobody-at-all"))["suggestions"] == []
+
+
+def test_index_follows_folder_events(backend):
+    assert asyncio.run(om.update_outlook_contact("张三", job_title="经理"))["success"]
+    index = om.contact_index
+    assert index.built and index.watcher is not None
+
+    added = backend.add(OL_CONTACT_ITEM, FullName="王五", Email1Address="wangwu@example.com")
+    assert index.dirty  # 外部新增触发事件，下次查找前做增量检查
+    assert asyncio.run(om.update_outlook_contact("wangwu@example.com", phone="123"))["success"]
+    assert added.get("BusinessTelephoneNumber") == "123"
+
+    added.FullName = "王六"
+    added.Save()
+    assert not asyncio.run(om.update_outlook_contact("王五", phone="456"))["success"]
+    assert asyncio.run(om.update_outlook_contact("王六", phone="456"))["success"]
+
+    added.Delete()  # 外部删除：数量核对发现后重建
+    assert not asyncio.run(om.delete_outlook_contact("王六"))["success"]
+    assert "王六" not in {entry["name"] for entry in index.entries.values()}
+
+    assert asyncio.run(om.update_outlook_contact("张三", name="张三丰"))["success"]
+    assert index.lookup("张三") == [] and len(index.lookup("张三丰")) == 1
@@ -0,0 +1,181 @@
+"""日历镜像与批量删除：在 OUTLOOK_BACKEND=fake 下对照 Outlook（替身）路径验证"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+os.environ["OUTLOOK_BACKEND"] = "fake"
+os.environ.setdefault("OUTLOOK_MIRROR_PATH", "")  # 测试各自创建镜像，不写用户目录
+
+import outlook_manager as om  # noqa: E402
+from outlook_fake import OL_APPOINTMENT_ITEM, OL_FOLDER_CALENDAR, FakeBackend  # noqa: E402
+
+FIELDS = list(om.EVENT_COLUMNS)
+TODAY = datetime.combine(datetime.now().date(), datetime.min.time())
+BASE = TODAY + timedelta(days=2, hours=9)
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    backend = FakeBackend()
+    worker = om.OutlookWorker(backend)
+    monkeypatch.setattr(om, "outlook", worker)
+    monkeypatch.setattr(om, "calendar_mirror", om.CalendarMirror(str(tmp_path / "calendar.db")))
+    monkeypatch.setattr(om, "contact_index", om.ContactIndex())
+    yield backend
+    worker.stop()
+
+
+def add_event(backend, subject, start, hours=1):
+    return backend.add(OL_APPOINTMENT_ITEM, Subject=subject, Start=start, End=start + timedelta(hours=hours),
+                       Location="会议室", Organizer="张三")
+
+
+def seed(backend):
+    for index in range(30):
+        add_event(backend, f"例会 {index}", BASE + timedelta(hours=7 * index))
+    backend.add_recurring(timedelta(days=7), 10, Subject="周会", Start=BASE + timedelta(minutes=30),
+                          End=BASE + timedelta(hours=1, minutes=30))
+    backend.add_recurring(timedelta(days=1), 5, Subject="站会", Start=BASE - timedelta(hours=1),
+                          End=BASE - timedelta(minutes=45))
+
+
+def sync():
+    asyncio.run(om.outlook.run(om.calendar_mirror.sync))
+
+
+def list_all(limit=7, **kwargs):
+    """按 next_cursor 读完所有分页，返回事件与各页来源"""
+    events, sources, cursor = [], set(), ""
+    while True:
+        result = asyncio.run(om.list_outlook_events(fields=FIELDS, limit=limit, cursor=cursor, **kwargs))
+        assert result["success"], result["message"]
+        events += result["message"]
+        sources.add(result["source"])
+        cursor = result["next_cursor"]
+        if not cursor:
+            return events, sources
+
+
+def list_from_outlook(monkeypatch, **kwargs):
+    with monkeypatch.context() as patch:
+        patch.setattr(om, "calendar_mirror", None)
+        events, sources = list_all(**kwargs)
+    assert sources == {"outlook"}
+    return events
+
+
+def assert_mirror_matches(monkeypatch, **kwargs):
+    events, sources = list_all(**kwargs)
+    assert sources == {"mirror"}
+    assert events == list_from_outlook(monkeypatch, **kwargs)
+    return events
+
+
+RANGE = {"start_date": TODAY.strftime("%Y-%m-%d"), "end_date": (TODAY + timedelta(days=90)).strftime("%Y-%m-%d")}
+
+
+def test_mirror_pages_match_outlook(backend, monkeypatch):
+    seed(backend)
+    sync()
+    events = assert_mirror_matches(monkeypatch, **RANGE)
+    assert len(events) == 30 + 10 + 5
+    assert sum(event["subject"] == "周会" for event in events) == 10
+    assert [event["start"] for event in events] == sorted(event["start"] for event in events)
+
+
+def test_write_through(backend, monkeypatch):
+    seed(backend)
+    sync()
+    start = BASE + timedelta(days=3, minutes=15)
+    assert asyncio.run(om.add_outlook_event("评审", start.strftime("%Y-%m-%d %H:%M")))["success"]
+    events = assert_mirror_matches(monkeypatch, **RANGE)
+    assert any(event["subject"] == "评审" for event in events)
+
+    assert asyncio.run(om.delete_outlook_event("评审", start.strftime("%Y-%m-%d %H:%M")))["success"]
+    occurrence = BASE + timedelta(days=14, minutes=30)
+    assert asyncio.run(om.delete_outlook_event("周会", occurrence.strftime("%Y-%m-%d %H:%M")))["success"]
+    events = assert_mirror_matches(monkeypatch, **RANGE)
+    assert not any(event["subject"] == "评审" for event in events)
+    assert sum(event["subject"] == "周会" for event in events) == 9
+
+
+def test_external_changes_are_synced(backend, monkeypatch):
+    seed(backend)
+    sync()
+    calendar = backend.store.folders[OL_FOLDER_CALENDAR]
+    add_event(backend, "外部新增", BASE + timedelta(days=5))
+    changed = calendar[3]
+    changed.Subject = "外部修改"
+    changed.Start = changed.Start + timedelta(hours=2)
+    changed.End = changed.End + timedelta(hours=2)
+    changed.Save()
+    calendar[7].Delete()
+    master = next(item for item in calendar if item.get("Subject") == "站会")
+    master.occurrences()[2].Delete()
+
+    sync()
+    events = assert_mirror_matches(monkeypatch, **RANGE)
+    subjects = [event["subject"] for event in events]
+    assert "外部新增" in subjects and "外部修改" in subjects and "例会 7" not in subjects
+    assert subjects.count("站会") == 4
+
+
+def test_delete_events_in_batches(backend, monkeypatch):
+    seed(backend)
+    for index in range(120):
+        add_event(backend, f"同步会 {index}", BASE + timedelta(days=1, minutes=30 * index))
+    sync()
+    last_day = (BASE + timedelta(days=90)).strftime("%Y-%m-%d")
+
+    preview = asyncio.run(om.delete_outlook_events("会", BASE.strftime("%Y-%m-%d"), last_day, dry_run=True))
+    assert preview["matched"] == 30 + 10 + 5 + 120 and len(preview["preview"]) == om.DELETE_PREVIEW
+    assert len(backend.store.folders[OL_FOLDER_CALENDAR]) == 30 + 2 + 120
+
+    result = asyncio.run(om.delete_outlook_events("同步会"))
+    assert result == {"success": True, "message": "已删除 120 条事件", "matched": 120, "deleted": 120, "failed": 0}
+
+    result = asyncio.run(om.delete_outlook_events("周会", BASE.strftime("%Y-%m-%d"), last_day))
+    assert result["deleted"] == result["matched"] == 10
+    events = assert_mirror_matches(monkeypatch, **RANGE)
+    assert len(events) == 30 + 5
+
+
+def test_idle_sync_does_not_launch_outlook(backend, monkeypatch):
+    seed(backend)
+    backend.running = False
+    monkeypatch.setattr(om, "MIRROR_RETRY_INTERVAL", 0.2)
+    om.outlook.idle_tasks.append(om.calendar_mirror)
+    om.outlook.start()
+    time.sleep(0.5)
+    assert not om.calendar_mirror.ready and backend.dispatches == 0
+
+    backend.running = True  # 用户打开了 Outlook：空闲同步连接它，但不会自己启动
+    deadline = time.monotonic() + 5
+    while not om.calendar_mirror.ready and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert om.calendar_mirror.ready and backend.dispatches == 0
+
+
+def test_subject_keyword_is_literal(backend):
+    for subject in ("发布 v1_2", "发布 v102", "完成 100%", "完成 1000", "[草稿] 周报", "草稿周报"):
+        add_event(backend, subject, BASE)
+    for keyword, expected in (("_", ["发布 v1_2"]), ("v1_2", ["发布 v1_2"]), ("100%", ["完成 100%"]),
+                              ("[草稿]", ["[草稿] 周报"]), ("V1_", ["发布 v1_2"])):
+        result = asyncio.run(om.delete_outlook_events(keyword, dry_run=True))
+        assert [event["subject"] for event in result["preview"]] == expected, keyword
+
+    assert asyncio.run(om.delete_outlook_events("_"))["deleted"] == 1
+    assert len(backend.store.folders[OL_FOLDER_CALENDAR]) == 5
+
+
+def test_delete_terminates_when_items_stay(backend):
+    """Delete 成功但条目仍留在结果中（如周期事件主约会）时，批量删除也要结束"""
+    for index in range(60):
+        item = add_event(backend, f"顽固 {index}", BASE + timedelta(minutes=index))
+        item.__dict__["Delete"] = lambda: None
+    result = asyncio.run(asyncio.wait_for(om.delete_outlook_events("顽固"), 5))
+    assert result["deleted"] == result["matched"] == 60
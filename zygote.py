@@ -0,0 +1,394 @@
+"""
+Zygote (pre-fork) launcher for the MCP services. Linux / POSIX only.
+Version: 0.1.0
+
+Usage:
+
+python zygote.py <socket_path>
+
+The zygote imports the dependencies shared by mcp_pipe.py and the tool scripts once
+(websockets, dotenv, mcp/FastMCP, pydantic, anyio, psutil), freezes its heap and then
+serves spawn requests on a UNIX socket: each request forks a child that runs a script
+as `__main__`, with the requester's argv, cwd, environment and stdio file descriptors.
+Children start with everything already imported and share the zygote's memory pages
+copy-on-write. A `{"op": "children"}` request (no descriptors) lists the running
+children with the PID of whoever requested them, so a supervisor can attribute tool
+processes forked on behalf of a pipe to that pipe.
+
+`python start_all_services.py --zygote` starts a zygote, launches the pipes from it
+and sets MCP_ZYGOTE so mcp_pipe.py forks its tool scripts from it as well. Anything
+that cannot reach the zygote falls back to a normal cold start.
+"""
+
+import asyncio
+import gc
+import importlib
+import json
+import logging
+import os
+import runpy
+import selectors
+import signal
+import socket
+import sys
+import time
+import traceback
+
+logger = logging.getLogger('MCP_ZYGOTE')
+
+# Imported once in the zygote; missing ones are skipped (e.g. psutil on a minimal install)
+PRELOAD_MODULES = [
+    "asyncio",
+    "json",
+    "websockets",
+    "websockets.asyncio.client",
+    "dotenv",
+    "anyio",
+    "pydantic",
+    "mcp",
+    "mcp.types",
+    "mcp.server.fastmcp",
+    "mcp.server.stdio",
+    "psutil",
+    "dateparser",
+]
+REQUEST_LIMIT = 1024 * 1024  # bytes of JSON per spawn request (argv + environment)
+ENV_VAR = "MCP_ZYGOTE"  # socket path handed to services started from the zygote
+POLL_INTERVAL = 0.5  # seconds between liveness checks of a child whose zygote went away
+
+# ---------------------------------------------------------------------
+# Server side
+# ---------------------------------------------------------------------
+
+def preload():
+    """Import the shared dependency set; returns (imported, skipped)"""
+    imported, skipped = [], []
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+            imported.append(name)
+        except Exception:
+            skipped.append(name)
+    return imported, skipped
+
+def read_request(conn):
+    """Read one JSON request line and the stdio descriptors sent with it (three for a spawn request)"""
+    data, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk or len(data) > REQUEST_LIMIT:
+            raise ValueError("incomplete spawn request")
+        data += chunk
+    request = json.loads(data)
+    if request.get('op', 'spawn') == 'spawn' and len(fds) != 3:
+        raise ValueError(f"expected 3 file descriptors, got {len(fds)}")
+    return request, fds
+
+def reopen_stdio():
+    """Fresh sys.stdin/stdout/stderr on fds 0-2; the zygote's objects cached facts about its own files (seekable, tty)"""
+    for name, fd, mode in (('stdin', 0, 'r'), ('stdout', 1, 'w'), ('stderr', 2, 'w')):
+        old = getattr(sys, name)
+        line_buffered = name == 'stderr' or os.isatty(fd)
+        stream = open(fd, mode, buffering=1 if line_buffered else -1, encoding=old.encoding, errors=old.errors,
+                      closefd=False)
+        setattr(sys, name, stream)
+        setattr(sys, f'__{name}__', stream)
+
+def run_child(request, fds):
+    """Body of a forked child: become `python <argv...>` and never return"""
+    code = 1
+    try:
+        signal.set_wakeup_fd(-1)
+        logging.root.handlers.clear()  # Let the script configure logging as if freshly started
+        logging.root.setLevel(logging.WARNING)
+        for sig in (signal.SIGCHLD, signal.SIGTERM, signal.SIGPIPE):
+            signal.signal(sig, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+        for fd in set(fds):
+            if fd > 2:
+                os.close(fd)
+        reopen_stdio()
+        os.chdir(request.get("cwd") or os.getcwd())
+        os.environ.clear()
+        os.environ.update(request.get("env") or {})
+        argv = request["argv"]
+        sys.argv = list(argv)
+        sys.path[0] = os.path.dirname(os.path.abspath(argv[0]))
+        runpy.run_path(argv[0], run_name="__main__")
+        code = 0
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            sys.stderr.write(f"{e.code}\n")
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+def serve(path):
+    """Accept spawn requests on `path` until SIGTERM/SIGINT"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    start = time.perf_counter()
+    imported, skipped = preload()
+    # Objects that exist now are never collected: keeps the GC from touching (and un-sharing) their pages
+    gc.freeze()
+    logger.info(f"Preloaded {len(imported)} modules in {time.perf_counter() - start:.2f} seconds"
+                + (f" (not installed: {', '.join(skipped)})" if skipped else ""))
+
+    if os.path.exists(path):
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    os.chmod(path, 0o600)
+    listener.listen(64)
+    listener.setblocking(False)
+
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_r, False)
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    stopping = []
+    signal.signal(signal.SIGCHLD, lambda sig, frame: None)
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda sig, frame: stopping.append(sig))
+
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ, 'accept')
+    selector.register(wakeup_r, selectors.EVENT_READ, 'signal')
+    children = {}  # pid -> (requester connection, told the exit code; {'parent', 'script'})
+    logger.info(f"Zygote ready on {path} (PID={os.getpid()})")
+
+    while not stopping:
+        for key, _ in selector.select():
+            if key.data == 'accept':
+                try:
+                    conn, _ = listener.accept()
+                except BlockingIOError:
+                    continue
+                spawn(conn, selector, children, (listener, wakeup_r, wakeup_w))
+            elif key.data == 'signal':
+                try:
+                    os.read(wakeup_r, 4096)
+                except BlockingIOError:
+                    pass
+                reap(children)
+
+    logger.info(f"Zygote stopping, {len(children)} children still running")
+    for conn, _ in children.values():
+        conn.close()
+    listener.close()
+    os.unlink(path)
+
+def spawn(conn, selector, children, inherited):
+    """Fork a child for the request on `conn` and tell the requester its PID
+
+    `inherited` holds the zygote's own descriptors (listening socket, signal pipe ends),
+    which the child must not keep.
+    """
+    conn.setblocking(True)
+    fds = []
+    try:
+        request, fds = read_request(conn)
+        if request.get('op') == 'children':
+            listing = {pid: info for pid, (_, info) in children.items()}
+            conn.sendall(json.dumps(listing).encode() + b"\n")
+            conn.close()
+            return
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            # Drop the zygote's own descriptors: listener, signal pipe, other requesters
+            signal.set_wakeup_fd(-1)
+            selector.close()
+            listener, wakeup_r, wakeup_w = inherited
+            listener.close()
+            os.close(wakeup_r)
+            os.close(wakeup_w)
+            for other, _ in children.values():
+                other.close()
+            conn.close()
+            run_child(request, fds)
+        children[pid] = (conn, {'parent': request.get('parent'), 'script': os.path.basename(request['argv'][0])})
+        conn.sendall(json.dumps({'pid': pid}).encode() + b"\n")
+        logger.info(f"Forked {os.path.basename(request['argv'][0])} (PID={pid})")
+    except Exception as e:
+        logger.error(f"Spawn request failed: {e}")
+        try:
+            conn.sendall(json.dumps({'error': str(e)}).encode() + b"\n")
+        except OSError:
+            pass
+        conn.close()
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+def reap(children):
+    """Collect exited children and report their exit codes to whoever spawned them"""
+    while True:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        conn, _ = children.pop(pid, (None, None))
+        if conn is None:
+            continue
+        try:
+            conn.sendall(json.dumps({'exit': os.waitstatus_to_exitcode(status)}).encode() + b"\n")
+        except OSError:
+            pass  # The requester is gone
+        conn.close()
+
+# ---------------------------------------------------------------------
+# Client side: an asyncio.subprocess.Process look-alike
+# ---------------------------------------------------------------------
+
+class ZygoteProcess:
+    """A child forked by the zygote, driven like ``asyncio.subprocess.Process``.
+
+    The child belongs to the zygote, which reports its exit code over the request
+    connection; if the zygote dies first, the child is polled until it is gone.
+    """
+
+    def __init__(self, pid, reader, writer, stdin=None, stdout=None, stderr=None):
+        self.pid = pid
+        self.stdin = stdin
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+        self._reader = reader
+        self._writer = writer
+        self._exited = asyncio.get_running_loop().create_future()
+        self._watcher = asyncio.create_task(self._watch())
+
+    async def _watch(self):
+        code = None
+        try:
+            line = await self._reader.readline()
+            if line:
+                code = json.loads(line).get('exit')
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._writer.close()
+        while code is None:
+            try:
+                os.kill(self.pid, 0)
+            except ProcessLookupError:
+                code = 255  # Exit status was lost with the zygote
+                break
+            await asyncio.sleep(POLL_INTERVAL)
+        self.returncode = code
+        self._exited.set_result(code)
+
+    async def wait(self):
+        return await asyncio.shield(self._exited)
+
+    def send_signal(self, sig):
+        if self.returncode is None:
+            os.kill(self.pid, sig)
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+async def create_subprocess(path, argv, stdin=None, stdout=None, stderr=None, limit=2 ** 16, cwd=None, env=None):
+    """Fork `python argv[0] argv[1:]` from the zygote listening on `path`.
+
+    `stdin`/`stdout`/`stderr` take ``asyncio.subprocess.PIPE``, ``asyncio.subprocess.STDOUT``
+    (stderr only), a file descriptor or file object, or None to share ours, like
+    ``asyncio.create_subprocess_exec``. Raises OSError if the zygote cannot be reached.
+    """
+    loop = asyncio.get_running_loop()
+    child_fds, parent_fds, close_after = [], [], []
+    try:
+        for index, spec in enumerate((stdin, stdout, stderr)):
+            if spec == asyncio.subprocess.PIPE:
+                r, w = os.pipe()
+                child, parent = (r, w) if index == 0 else (w, r)
+                child_fds.append(child)
+                parent_fds.append(parent)
+                close_after.append(child)
+            elif spec == asyncio.subprocess.STDOUT and index == 2:
+                child_fds.append(child_fds[1])
+                parent_fds.append(None)
+            elif spec == asyncio.subprocess.DEVNULL:
+                fd = os.open(os.devnull, os.O_RDWR)
+                child_fds.append(fd)
+                parent_fds.append(None)
+                close_after.append(fd)
+            else:
+                child_fds.append(index if spec is None else spec if isinstance(spec, int) else spec.fileno())
+                parent_fds.append(None)
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+            request = {'argv': list(argv), 'cwd': cwd or os.getcwd(), 'env': dict(os.environ if env is None else env),
+                       'parent': os.getpid()}
+            socket.send_fds(sock, [json.dumps(request).encode() + b"\n"], child_fds)
+        except OSError:
+            sock.close()
+            raise
+        reader, writer = await asyncio.open_unix_connection(sock=sock)
+        reply = json.loads(await reader.readline() or b'{"error": "zygote closed the connection"}')
+        if 'pid' not in reply:
+            writer.close()
+            raise OSError(f"zygote could not start {argv[0]}: {reply.get('error')}")
+    except BaseException:
+        for fd in parent_fds:
+            if fd is not None:
+                os.close(fd)
+        raise
+    finally:
+        for fd in close_after:
+            os.close(fd)
+
+    streams = [None, None, None]
+    if parent_fds[0] is not None:
+        protocol = asyncio.StreamReaderProtocol(asyncio.StreamReader(limit=limit))
+        transport, _ = await loop.connect_write_pipe(lambda: protocol, os.fdopen(parent_fds[0], 'wb', 0))
+        streams[0] = asyncio.StreamWriter(transport, protocol, None, loop)
+    for index in (1, 2):
+        if parent_fds[index] is not None:
+            stream = asyncio.StreamReader(limit=limit)
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(stream), os.fdopen(parent_fds[index], 'rb', 0))
+            streams[index] = stream
+    return ZygoteProcess(reply['pid'], reader, writer, *streams)
+
+def children(path, timeout=5):
+    """PIDs of the zygote's running children -> {'parent': requester PID, 'script': file name}; blocking"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps({'op': 'children'}).encode() + b"\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                raise OSError("zygote closed the connection")
+            data += chunk
+    return {int(pid): info for pid, info in json.loads(data).items()}
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python zygote.py <socket_path>", file=sys.stderr)
+        sys.exit(2)
+    if os.name != "posix":
+        print("The zygote needs fork(); it only runs on Linux/POSIX", file=sys.stderr)
+        sys.exit(1)
+    serve(sys.argv[1])